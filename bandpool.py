@@ -0,0 +1,47 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 행 띠 계산을 나눠 돌리는 스레드 풀 (pointops, threshold, blurs, warps)
+# 모듈마다 따로 풀을 두므로 편집기 작업이 한 모듈의 풀을 채우고 있어도 다른 모듈의 미리보기는 기다리지 않는다.
+# fork 로 만든 작업 프로세스는 부모의 풀 객체만 물려받고 스레드는 없으므로 자식에서는 풀을 새로 만든다.
+# 배치/타일 작업 프로세스는 코어를 프로세스 풀이 나눠 쓰므로 single_thread() 를 부르면 띠를 차례로 계산한다.
+
+_pools = {}
+_lock = threading.Lock()
+_serial = False  # True 면 스레드 풀 없이 호출한 스레드에서 계산
+
+
+def _get_pool(name):
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix=name)
+            _pools[name] = pool
+        return pool
+
+
+def _reset():
+    global _lock
+    _pools.clear()
+    _lock = threading.Lock()  # fork 할 때 다른 스레드가 잡고 있었을 수 있음
+
+
+os.register_at_fork(after_in_child=_reset)
+
+
+def single_thread():
+    """이 프로세스에서는 띠를 나눠 돌리지 않음 (작업 프로세스의 initializer 에서 호출)"""
+    global _serial
+    _serial = True
+
+
+def map_bands(name, func, items, parallel=True):
+    """
+    items 마다 func 를 실행한 결과를 차례로 내는 반복자 (pool.map 과 같음)
+    parallel 이 거짓이거나 항목이 하나뿐이거나 single_thread() 를 불렀으면 호출한 스레드에서 하나씩 계산한다.
+    """
+    if not parallel or _serial or len(items) < 2:
+        return map(func, items)
+    return _get_pool(name).map(func, items)
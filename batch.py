@@ -0,0 +1,143 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+import bandpool
+import export
+import imageops
+
+
+# 편집기와 같은 처리 함수를 GUI 없이 폴더 단위로 실행하는 배치 처리
+# 사용 예)
+#   python batch.py 입력폴더 출력폴더 -o grayscale -o "blur:ksize=25" -o "rotate:angle=-45"
+#   python batch.py 입력폴더 출력폴더 -o grayscale --ext jpg --jpeg-quality 85 --progressive
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def find_images(input_dir, recursive=False):
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def output_path_for(path, input_dir, output_dir, ext=None):
+    rel = os.path.relpath(path, input_dir)
+    if ext:
+        rel = os.path.splitext(rel)[0] + "." + ext.lstrip(".")
+    return os.path.join(output_dir, rel)
+
+
+def _init_worker():
+    # 프로세스마다 OpenCV 내부 스레드와 띠 계산 스레드를 1개로 제한 (코어는 프로세스 풀이 나눠 씀)
+    cv2.setNumThreads(1)
+    bandpool.single_thread()
+
+
+def process_file(path, out_path, chain, options=None):
+    """(경로, 성공 여부, 메시지, 전체 시간, 인코딩+쓰기 시간, 출력 크기)"""
+    start = time.perf_counter()
+    image = imageops.read_image(path)
+    if image is None:
+        return path, False, "이미지를 불러올 수 없습니다.", 0.0, 0.0, 0
+    result = imageops.apply_chain(image, chain)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    saved = export.export(result, export.ExportTarget(out_path, options))
+    if not saved.ok:
+        return path, False, f"이미지를 저장할 수 없습니다. ({saved.error})", 0.0, 0.0, 0
+    return path, True, "", time.perf_counter() - start, saved.encode_s + saved.write_s, saved.nbytes
+
+
+def run_batch(input_dir, output_dir, chain, workers=None, recursive=False, ext=None, quiet=False, options=None):
+    paths = find_images(input_dir, recursive)
+    if not paths:
+        return 0, 0
+    workers = workers or os.cpu_count() or 1
+    done = failed = 0
+    encode_total = 0.0
+    size_total = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(process_file, p, output_path_for(p, input_dir, output_dir, ext), chain, options)
+            for p in paths
+        ]
+        for future in as_completed(futures):
+            path, ok, message, elapsed, encode_s, nbytes = future.result()
+            if ok:
+                done += 1
+                encode_total += encode_s
+                size_total += nbytes
+            else:
+                failed += 1
+                print(f"실패: {path} ({message})", file=sys.stderr)
+            if not quiet:
+                print(f"[{done + failed}/{len(paths)}] {os.path.basename(path)} {elapsed * 1000:.0f}ms "
+                      f"(저장 {encode_s * 1000:.0f}ms, {nbytes / 1024:,.0f}KB)")
+    total = time.perf_counter() - start
+    if not quiet:
+        rate = len(paths) / total * 3600 if total > 0 else 0
+        print(f"완료 {done}개, 실패 {failed}개, {total:.1f}s (시간당 약 {rate:.0f}장, 프로세스 {workers}개)")
+        print(f"저장 시간 합계 {encode_total:.1f}s, 출력 크기 합계 {size_total / 1024 ** 2:,.1f}MB")
+    return done, failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="이미지 편집기 배치 처리")
+    parser.add_argument("input_dir", help="입력 이미지 폴더")
+    parser.add_argument("output_dir", help="결과를 저장할 폴더")
+    parser.add_argument("-o", "--op", action="append", default=[], dest="ops",
+                        help="적용할 작업 (순서대로 적용). 예) grayscale, blur:ksize=25, "
+                             "사용 가능: " + ", ".join(imageops.OPERATIONS))
+    parser.add_argument("-j", "--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="하위 폴더 포함")
+    parser.add_argument("--ext", default=None, help="출력 확장자 (기본: 입력과 동일)")
+    parser.add_argument("--png-compression", type=int, default=export.DEFAULT_OPTIONS["png_compression"],
+                        help="PNG 압축 수준 0~9 (높을수록 느리고 작음)")
+    parser.add_argument("--png-strategy", choices=list(export.PNG_STRATEGY),
+                        default=export.DEFAULT_OPTIONS["png_strategy"], help="PNG 압축 전략 (사진은 rle 가 빠르고 작음)")
+    parser.add_argument("--jpeg-quality", type=int, default=export.DEFAULT_OPTIONS["jpeg_quality"],
+                        help="JPEG 품질 1~100")
+    parser.add_argument("--progressive", action="store_true", help="프로그레시브 JPEG")
+    parser.add_argument("--webp-quality", type=int, default=export.DEFAULT_OPTIONS["webp_quality"],
+                        help="WebP 품질 1~100 (101 이면 무손실)")
+    parser.add_argument("--tiff-compression", choices=list(export.TIFF_COMPRESSION),
+                        default=export.DEFAULT_OPTIONS["tiff_compression"], help="TIFF 압축 방식")
+    parser.add_argument("-q", "--quiet", action="store_true", help="진행 상황 출력 안 함")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.ops:
+        print("적용할 작업을 -o 로 지정하세요.", file=sys.stderr)
+        return 2
+    try:
+        chain = [imageops.parse_operation(spec) for spec in args.ops]
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    options = {
+        "png_compression": args.png_compression,
+        "png_strategy": args.png_strategy,
+        "jpeg_quality": args.jpeg_quality,
+        "jpeg_progressive": args.progressive,
+        "webp_quality": args.webp_quality,
+        "tiff_compression": args.tiff_compression,
+    }
+    done, failed = run_batch(args.input_dir, args.output_dir, chain, args.workers,
+                             args.recursive, args.ext, args.quiet, options)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import blurs
+import docscan
+import export
+import imageops
+import threshold
+
+
+# 편집기 작업 성능 측정
+# GUI 없이 imageops 의 함수를 여러 해상도의 합성 이미지(와 선택적으로 실제 이미지)로 실행하고
+# 지연 시간 백분위수, 처리량(MP/s), 최대 메모리 할당량을 보고한다.
+# 기준값(baseline)을 저장해 두고 비교하면 느려진 작업이 있을 때 종료 코드 1로 실패한다.
+#
+# 사용 예)
+#   python benchmarks.py --resolutions vga,hd --save-baseline bench_baseline.json
+#   python benchmarks.py --resolutions vga,hd --baseline bench_baseline.json --threshold 1.25
+
+RESOLUTIONS = {
+    "vga": (640, 480),
+    "hd": (1280, 720),
+    "fhd": (1920, 1080),
+    "12mp": (4000, 3000),
+    "24mp": (6000, 4000),
+    "50mp": (8660, 5774),
+}
+
+
+def synthetic_image(width, height, seed=0):
+    # 어두운 배경 위의 밝은 문서(사각형) + 그라데이션 + 잡음 + 선 그림
+    rng = np.random.default_rng(seed)
+    gx = np.linspace(40, 90, width, dtype=np.float32)
+    gy = np.linspace(30, 70, height, dtype=np.float32)[:, None]
+    image = np.empty((height, width, 3), np.uint8)
+    image[..., 0] = (gx + gy).astype(np.uint8)
+    image[..., 1] = (gx * 0.8 + gy).astype(np.uint8)
+    image[..., 2] = (gx + gy * 0.6).astype(np.uint8)
+    page = np.array([[width * 0.18, height * 0.12], [width * 0.85, height * 0.08],
+                     [width * 0.9, height * 0.9], [width * 0.12, height * 0.85]], np.int32)
+    cv2.fillConvexPoly(image, page, (235, 235, 240))
+    for i in range(20):
+        y = int(height * (0.2 + i * 0.03))
+        cv2.line(image, (int(width * 0.25), y), (int(width * 0.75), y), (40, 40, 40), max(1, height // 400))
+    cv2.circle(image, (width // 2, height // 2), min(width, height) // 8, (30, 90, 200), -1)
+    noise = rng.integers(0, 6, (height, width, 3), dtype=np.uint8)
+    cv2.add(image, noise, dst=image)
+    return image
+
+
+def _center_roi(image, fraction):
+    h, w = image.shape[:2]
+    rw, rh = max(1, int(w * fraction)), max(1, int(h * fraction))
+    return (w - rw) // 2, (h - rh) // 2, rw, rh
+
+
+def _apply_separately(image, chain):
+    for name, params in chain:
+        image = imageops.apply_operation(image, name, params)
+    return image
+
+
+def _seamless_clone(dst, src, center):
+    # 예전 합성 방식: src 크기 그대로 전체 dst 에 cv2.seamlessClone (결과는 이미지 전체 사본)
+    return cv2.seamlessClone(src, dst, np.full(src.shape[:2], 255, np.uint8), center, cv2.NORMAL_CLONE)
+
+
+def _encode(image, ext, options):
+    return cv2.imencode(ext, image, export.encode_params(export.FORMATS[ext], options))
+
+
+def build_cases(image):
+    """작업 이름 -> 인자 없이 호출할 함수. 입력 준비(ROI 히스토그램, HSV 등)는 측정에서 뺀다."""
+    h, w = image.shape[:2]
+    roi = _center_roi(image, 0.5)
+    small_roi = _center_roi(image, 0.05)
+    hist_roi = imageops.roi_histogram(image, small_roi)
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    src = cv2.resize(image, (max(2, w // 4), max(2, h // 4)), interpolation=cv2.INTER_AREA)
+    composite_roi = ((w - src.shape[1]) // 2, (h - src.shape[0]) // 2, src.shape[1], src.shape[0])
+    radius = imageops.default_lens_radius(image)
+    color_chain = [imageops.parse_operation(s) for s in ("grayscale", "contrast:factor=1.3", "invert")]
+    projector = imageops.BackProjector()
+    scratch = image.copy()
+    projector.prepare(image, 0)  # 같은 이미지에서 ROI 만 바꿔 역투영하는 경우
+    # 문서 사각형(고정)으로 원근 변환 -> 캔버스를 넓혀 회전 -> 렌즈 (warps 로 합친 것과 작업마다 따로 보간한 것)
+    quad = [[w * 0.05, h * 0.05], [w * 0.95, h * 0.08], [w * 0.92, h * 0.95], [w * 0.04, h * 0.9]]
+    warp_chain = [("perspective", {"quad": quad}), ("rotate", {"angle": 7, "expand": 1}),
+                  ("lens", {"center_x": w // 2, "center_y": h // 2, "distortion_type": "convex",
+                            "radius": radius, "exp": 2})]
+    threshold_engine = threshold.ThresholdEngine()
+    threshold_engine.prepare(image, 0)  # 같은 이미지에서 슬라이더만 움직이는 경우
+    blur_engine = blurs.BlurEngine()
+    blur_engine.prepare(image, 0, (0, 0, w, h))
+    blur_engine.render("box", 3)  # 적분 영상은 영역을 고를 때 한 번만 만듦
+    preview_step = max(1, max(w, h) // 900)
+    return {
+        "blur": lambda: imageops.blur(image, roi, 15),
+        # 큰 반지름 블러: OpenCV 가우시안 / 상자 3번 근사, 양방향은 원래 해상도 대신 줄여서 계산
+        "blur_gaussian_cv": lambda: cv2.GaussianBlur(image, (101, 101), 0),
+        "blur_gaussian": lambda: imageops.blur(image, None, 101, "gaussian"),
+        "blur_bilateral": lambda: imageops.blur(image, None, 101, "bilateral"),
+        # 캐시된 적분 영상으로 반지름과 관계없이, 그리고 화면 크기 간격으로만 계산한 미리보기
+        "blur_box_cached": lambda: blur_engine.render("box", 101),
+        "blur_box_preview": lambda: blur_engine.render("box", 101, preview_step),
+        "perspective": lambda: imageops.perspective_transform(image),
+        "document_detect": lambda: docscan.find_document(image),
+        "grayscale": lambda: imageops.grayscale(image),
+        "invert": lambda: imageops.invert(image),
+        # 색 연산 여러 개를 이어서 적용 (fused 는 pointops 로 한 번에, separate 는 작업마다 새 이미지)
+        "color_chain_fused": lambda: imageops.apply_chain(image, color_chain),
+        "color_chain_separate": lambda: _apply_separately(image, color_chain),
+        "rotate": lambda: imageops.rotate(image, 45),
+        "rotate_expand": lambda: imageops.rotate(image, 30, expand=True),
+        "warp_chain_fused": lambda: imageops.apply_chain(image, warp_chain),
+        "warp_chain_separate": lambda: _apply_separately(image, warp_chain),
+        # 보간 없이 픽셀만 옮기는 90도 회전 / 뒤집기
+        "rotate90": lambda: imageops.rotate90(image, 1),
+        "flip": lambda: imageops.flip(image, "horizontal"),
+        "lens": lambda: imageops.lens_distortion(image, w // 2, h // 2, "convex", radius),
+        "auto_correction": lambda: imageops.auto_correction(image),
+        "backproject_manual": lambda: imageops.back_project_manual(hist_roi, hsv, image),
+        "backproject_engine": lambda: projector.project(image, 0, small_roi),
+        "backproject_cv": lambda: imageops.back_project_cv(hist_roi, hsv, image),
+        # 합성: 같은 ROI 를 OpenCV 풀이와 DST 풀이로, 큰 원본(전체 이미지)을 ROI 에 맞춰 넣는 경우
+        "composite_seamlessclone": lambda: _seamless_clone(image, src, (w // 2, h // 2)),
+        "composite_roi": lambda: imageops.composite_patch(image, src, composite_roi),
+        "composite_roi_large_src": lambda: imageops.composite_patch(image, image, composite_roi),
+        "threshold": lambda: imageops.adaptive_threshold(image, 11, 10),
+        # 캐시된 흑백/적분 영상으로 전체 해상도, 그리고 화면 크기(긴 변 약 900px) 간격으로만 계산한 미리보기
+        "threshold_cached": lambda: threshold_engine.render(51, 10),
+        "threshold_preview": lambda: threshold_engine.render(51, 10, step=preview_step),
+        "flood_fill": lambda: imageops.flood_fill(image, (w // 2, int(h * 0.15)), (0, 0, 255)),
+        # 편집기처럼 제자리에서 그림 (글자 영역만 계산하므로 해상도와 관계없이 비용이 같아야 함)
+        "text": lambda: imageops.draw_text(scratch, "Hello", (w // 4, h // 4), 40, (0, 0, 0), out=scratch),
+        "text_hangul": lambda: imageops.draw_text(scratch, "안녕하세요", (w // 4, h // 3), 40, (0, 0, 0),
+                                                  out=scratch),
+        # 내보내기 인코딩 (파일 쓰기 제외). 설정별 파일 크기는 편집기의 '내보내기 기록' 이나 batch.py 출력으로 확인
+        "encode_png_1": lambda: _encode(image, ".png", {"png_compression": 1}),
+        "encode_png_6": lambda: _encode(image, ".png", {"png_compression": 6, "png_strategy": "default"}),
+        "encode_jpeg_95": lambda: _encode(image, ".jpg", {"jpeg_quality": 95}),
+        "encode_jpeg_85_progressive": lambda: _encode(image, ".jpg", {"jpeg_quality": 85,
+                                                                      "jpeg_progressive": True}),
+        "encode_webp_90": lambda: _encode(image, ".webp", {"webp_quality": 90}),
+        "encode_tiff_lzw": lambda: _encode(image, ".tif", {"tiff_compression": "lzw"}),
+    }
+
+
+def measure(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # 메모리는 따로 한 번 더 실행해 측정 (tracemalloc 이 시간 측정에 영향을 주지 않도록)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.array(times), peak
+
+
+def run(resolutions, ops=None, repeat=5, images=(), quiet=False):
+    results = {}
+    sources = [("synthetic", None)] + [(os.path.basename(p), p) for p in images]
+    for res_name in resolutions:
+        width, height = RESOLUTIONS[res_name]
+        for source_name, path in sources:
+            if path is None:
+                image = synthetic_image(width, height)
+            else:
+                image = imageops.read_image(path)
+                if image is None:
+                    print(f"이미지를 불러올 수 없습니다: {path}", file=sys.stderr)
+                    continue
+                image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            megapixels = width * height / 1e6
+            for op_name, func in build_cases(image).items():
+                if ops and op_name not in ops:
+                    continue
+                times, peak = measure(func, repeat)
+                key = f"{op_name}@{res_name}" + ("" if path is None else f"[{source_name}]")
+                p50 = float(np.percentile(times, 50))
+                results[key] = {
+                    "p50_ms": p50 * 1000,
+                    "p90_ms": float(np.percentile(times, 90)) * 1000,
+                    "p99_ms": float(np.percentile(times, 99)) * 1000,
+                    "mp_per_s": megapixels / p50 if p50 > 0 else float("inf"),
+                    "peak_alloc_mb": peak / 1024 ** 2,
+                }
+                if not quiet:
+                    r = results[key]
+                    print(f"{key:40s} p50 {r['p50_ms']:9.2f}ms  p90 {r['p90_ms']:9.2f}ms  "
+                          f"p99 {r['p99_ms']:9.2f}ms  {r['mp_per_s']:8.1f} MP/s  "
+                          f"peak {r['peak_alloc_mb']:8.1f}MB")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """기준값보다 threshold 배 이상 느려진 항목 목록"""
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = r["p50_ms"] / base["p50_ms"] if base["p50_ms"] > 0 else 1.0
+        if ratio > threshold:
+            regressions.append((key, base["p50_ms"], r["p50_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이미지 편집기 작업 성능 측정")
+    parser.add_argument("--resolutions", default=",".join(RESOLUTIONS),
+                        help="측정할 해상도 (쉼표 구분): " + ", ".join(RESOLUTIONS))
+    parser.add_argument("--ops", default=None, help="측정할 작업 (쉼표 구분, 기본: 전체)")
+    parser.add_argument("--repeat", type=int, default=5, help="작업당 반복 횟수")
+    parser.add_argument("--images", nargs="*", default=[], help="함께 측정할 실제 이미지 파일")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일")
+    parser.add_argument("--baseline", default=None, help="비교할 기준값 JSON 파일")
+    parser.add_argument("--save-baseline", default=None, help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="기준값 대비 p50 이 이 배수를 넘으면 실패 (기본 1.25)")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    resolutions = [r.strip() for r in args.resolutions.split(",") if r.strip()]
+    unknown = [r for r in resolutions if r not in RESOLUTIONS]
+    if unknown:
+        print(f"알 수 없는 해상도: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    ops = set(args.ops.split(",")) if args.ops else None
+
+    results = run(resolutions, ops, args.repeat, args.images, args.quiet)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for key, base_ms, now_ms, ratio in regressions:
+            print(f"성능 저하: {key} {base_ms:.2f}ms -> {now_ms:.2f}ms ({ratio:.2f}배)", file=sys.stderr)
+        if regressions:
+            return 1
+        if not args.quiet:
+            print(f"기준값 대비 성능 저하 없음 (허용 {args.threshold:.2f}배)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
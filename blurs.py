@@ -0,0 +1,228 @@
+import math
+
+import cv2
+import numpy as np
+
+import bandpool
+
+
+# 블러 (상자, 가우시안, 양방향)
+# 선택 영역 주변을 PAD 만큼 이미지에서 함께 읽고, 이미지 밖은 cv2.blur 기본값과 같이 가장자리 반사(BORDER_REFLECT_101)로 채운다.
+# 그래서 영역 경계에서도 영역 밖 픽셀을 이웃으로 써 이미지 전체를 블러한 결과와 같다.
+#
+# 상자 블러는 늘린 영역의 적분 영상(summed-area table)을 한 번 만들어 두면 픽셀마다 4곳만 읽어 블록 합을 구하므로
+# 반지름과 관계없이 같은 시간이 걸리고, 슬라이더를 움직일 때는 화면에 보이는 간격의 픽셀만 읽는다 (cv2.blur 와 픽셀 단위로 같음).
+# 가우시안은 큰 커널이면 넓이를 맞춘 상자 블러 3번으로 근사한다 (상자를 여러 번 겹치면 가우시안에 가까워짐).
+# cv2.blur 는 이동 합이라 이것도 반지름과 관계없다.
+# 양방향 필터는 비용이 지름의 제곱에 비례하므로 반지름이 BILATERAL_MAX_RADIUS 보다 크면 줄인 이미지에서 계산해 다시 키운다.
+# 상자 외의 방식은 행 띠마다 주변(halo)을 붙여 스레드 풀에서 나눠 계산한다.
+
+MAX_RADIUS = 100  # 슬라이더로 고를 수 있는 가장 큰 반지름 (커널 크기 2 * MAX_RADIUS + 1)
+MAX_KSIZE = 2 * MAX_RADIUS + 1
+BAND_ROWS = 256  # 스레드 하나가 맡는 행 수
+GAUSSIAN_EXACT = 31  # 이 크기까지는 cv2.GaussianBlur 를 그대로 씀
+BILATERAL_MAX_RADIUS = 5  # 양방향 필터를 원래 해상도에서 계산하는 가장 큰 반지름
+BILATERAL_SIGMA_COLOR = 40  # 양방향 필터가 같은 면으로 보는 색 차이
+MODES = ("box", "gaussian", "bilateral")
+
+def gaussian_sigma(ksize):
+    # cv2.GaussianBlur 에 sigma 를 주지 않았을 때와 같은 값
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+
+def box_sizes(sigma, n=3):
+    """n 번 겹쳐서 표준편차 sigma 의 가우시안에 가장 가까운 홀수 상자 크기들"""
+    ideal = math.sqrt(12 * sigma * sigma / n + 1)
+    lo = int(ideal)
+    if lo % 2 == 0:
+        lo -= 1
+    lo = max(1, lo)
+    # 분산 합이 12 sigma² 가 되도록 lo 와 lo + 2 를 섞음
+    m = round((12 * sigma * sigma - n * lo * lo - 4 * n * lo - 3 * n) / (-4 * lo - 4))
+    return [lo if i < m else lo + 2 for i in range(n)]
+
+
+def reduction(mode, ksize):
+    # 계산할 해상도의 축소 배율 (양방향 필터의 큰 반지름만 줄여서 계산)
+    if mode != "bilateral":
+        return 1
+    return max(1, -(-(ksize // 2) // BILATERAL_MAX_RADIUS))
+
+
+def halo(mode, ksize):
+    """결과가 영역 밖 이미지와 같은 블러가 되도록 함께 읽어야 하는 주변 픽셀 수"""
+    if mode == "gaussian" and ksize > GAUSSIAN_EXACT:
+        return sum(k // 2 for k in box_sizes(gaussian_sigma(ksize)))
+    return ksize // 2 + reduction(mode, ksize)
+
+
+PAD = max(halo(mode, MAX_KSIZE) for mode in MODES)
+
+
+def _check(mode, ksize):
+    if mode not in MODES:
+        raise ValueError(f"알 수 없는 방식: {mode} (사용 가능: {', '.join(MODES)})")
+    if ksize < 1:
+        raise ValueError(f"커널 크기는 1 이상이어야 합니다: {ksize}")
+
+
+def pad_region(image, roi, pad):
+    """roi (x, y, w, h) 를 사방으로 pad 만큼 늘린 조각. 이미지 안이면 이미지 픽셀, 밖이면 가장자리 반사"""
+    h, w = image.shape[:2]
+    x, y, rw, rh = roi
+    x0, y0 = max(0, x - pad), max(0, y - pad)
+    x1, y1 = min(w, x + rw + pad), min(h, y + rh + pad)
+    return cv2.copyMakeBorder(image[y0:y1, x0:x1], pad - (y - y0), pad - (y1 - y - rh),
+                              pad - (x - x0), pad - (x1 - x - rw), cv2.BORDER_REFLECT_101)
+
+
+def _filter(src, mode, ksize):
+    # 조각 전체에 블러 (조각 가장자리 halo 만큼은 쓰지 않는 값)
+    if mode == "box":
+        return cv2.blur(src, (ksize, ksize))
+    if mode == "gaussian":
+        if ksize <= GAUSSIAN_EXACT:
+            return cv2.GaussianBlur(src, (ksize | 1, ksize | 1), 0)
+        for k in box_sizes(gaussian_sigma(ksize)):
+            src = cv2.blur(src, (k, k))
+        return src
+    d = 2 * (ksize // 2) + 1
+    return cv2.bilateralFilter(src, d, BILATERAL_SIGMA_COLOR, max(1, d / 4))
+
+
+def filter_bands(src, mode, ksize, progress=None):
+    """
+    src 전체에 블러를 행 띠마다 나눠 적용 (띠마다 위아래 halo 행을 붙여 계산)
+    progress: 띠가 끝날 때마다 진행률 (0 ~ 1) 로 호출할 함수. 예외를 내면 남은 띠는 계산하지 않는다 (작업 취소).
+    """
+    out = np.empty_like(src)
+    rows = src.shape[0]
+    extra = halo(mode, ksize)
+
+    def band(y0):
+        y1 = min(rows, y0 + BAND_ROWS)
+        a, b = max(0, y0 - extra), min(rows, y1 + extra)
+        out[y0:y1] = _filter(src[a:b], mode, ksize)[y0 - a:y1 - a]
+
+    starts = range(0, rows, BAND_ROWS)
+    results = bandpool.map_bands("blurs", band, starts)
+    for i, _ in enumerate(results, 1):
+        if progress is not None:
+            progress(i / len(starts))
+    return out
+
+
+def _reduced(padded, mode, ksize, factor, size, progress=None):
+    # padded 를 factor 배 줄여 블러한 뒤 size (w, h) 로 다시 키운 결과
+    ph, pw = padded.shape[:2]
+    small = cv2.resize(padded, (max(1, round(pw / factor)), max(1, round(ph / factor))),
+                       interpolation=cv2.INTER_AREA)
+    result = filter_bands(small, mode, max(1, ksize // factor) | 1, progress)
+    return cv2.resize(result, size, interpolation=cv2.INTER_LINEAR)
+
+
+def _blur_padded(padded, mode, ksize, pad, progress=None):
+    # 사방으로 pad 만큼 늘린 조각을 블러하고 늘린 부분을 잘라냄
+    h, w = padded.shape[0] - 2 * pad, padded.shape[1] - 2 * pad
+    factor = reduction(mode, ksize)
+    if factor > 1:
+        result = _reduced(padded, mode, ksize, factor, padded.shape[1::-1], progress)
+    else:
+        result = filter_bands(padded, mode, ksize, progress)
+    return result[pad:pad + h, pad:pad + w]
+
+
+def blur_region(image, roi, ksize, mode="box", progress=None):
+    """image 의 roi (x, y, w, h) 부분을 블러한 조각 (영역 밖 픽셀도 이웃으로 씀). progress 는 filter_bands 와 같음"""
+    _check(mode, ksize)
+    pad = halo(mode, ksize)
+    return _blur_padded(pad_region(image, roi, pad), mode, ksize, pad, progress)
+
+
+class BlurEngine:
+    """
+    선택 영역 하나를 여러 반지름/방식으로 블러할 때 쓰는 캐시
+    이미지 버전과 영역마다 늘린 조각과 (상자 블러용) 적분 영상을 한 번만 만든다.
+    """
+
+    def __init__(self):
+        self._key = None
+        self.roi = None
+        self.padded = None
+        self._integral = None  # 늘린 조각의 int32 적분 영상 (상자 블러를 처음 쓸 때 만듦)
+        self._levels = {}  # 축소 배율 -> 줄인 조각
+
+    def prepare(self, image, version, roi):
+        key = (version, image.shape, tuple(roi))
+        if key == self._key:
+            return
+        self.roi = tuple(roi)
+        self.padded = pad_region(image, roi, PAD)
+        self._integral = None
+        self._levels = {}
+        self._key = key
+
+    def _box(self, ksize, step):
+        if self._integral is None:
+            # 합이 int32 를 넘어도 2의 보수로 감기므로 블록 합 (항상 int32 범위) 은 정확히 나옴
+            self._integral = cv2.integral(self.padded, sdepth=cv2.CV_32S)
+        integral = self._integral
+        _, _, w, h = self.roi
+        cols = slice(0, w, step)
+        rows_out = len(range(0, h, step))
+        out = np.empty((rows_out, len(range(0, w, step))) + self.padded.shape[2:], np.uint8)
+        # 조각의 (i, j) 블록 합은 적분 영상의 (i + lo, j + lo) ~ (i + hi, j + hi) 네 모서리로 구함 (cv2.blur 와 같은 기준점)
+        lo = PAD - ksize // 2
+        hi = lo + ksize
+        scale = 1.0 / (ksize * ksize)
+
+        def band(k, y0, y1):
+            s = integral[y0 + hi:y1 + hi:step, cols.start + hi:cols.stop + hi:step] \
+                - integral[y0 + lo:y1 + lo:step, cols.start + hi:cols.stop + hi:step]
+            s -= integral[y0 + hi:y1 + hi:step, cols.start + lo:cols.stop + lo:step]
+            s += integral[y0 + lo:y1 + lo:step, cols.start + lo:cols.stop + lo:step]
+            cv2.convertScaleAbs(s, dst=out[k:k + len(s)], alpha=scale)
+
+        # step 간격을 지키도록 띠 경계를 step 의 배수로 맞춤
+        rows_per_band = max(1, BAND_ROWS // step) * step
+        bands = [(y0 // step, y0, min(h, y0 + rows_per_band)) for y0 in range(0, h, rows_per_band)]
+        list(bandpool.map_bands("blurs", lambda b: band(*b), bands))
+        return out
+
+    def _level(self, factor):
+        small = self._levels.get(factor)
+        if small is None:
+            ph, pw = self.padded.shape[:2]
+            small = cv2.resize(self.padded, (max(1, round(pw / factor)), max(1, round(ph / factor))),
+                               interpolation=cv2.INTER_AREA)
+            self._levels = {factor: small}  # 미리보기 배율 하나만 기억
+        return small
+
+    def render(self, mode, ksize, step=1):
+        """
+        선택 영역의 블러 결과 (step 을 주면 그 간격으로 줄인 미리보기)
+        상자 블러는 간격마다 원래 해상도의 값을 그대로 읽고, 나머지는 줄인 조각에서 계산한다.
+        """
+        _check(mode, ksize)
+        if ksize > MAX_KSIZE:
+            raise ValueError(f"커널 크기는 {MAX_KSIZE} 이하여야 합니다: {ksize}")
+        if mode == "box":
+            return self._box(ksize, step)
+        _, _, w, h = self.roi
+        if step == 1:
+            pad = halo(mode, ksize)
+            return _blur_padded(self.padded[PAD - pad:PAD + h + pad, PAD - pad:PAD + w + pad], mode, ksize, pad)
+        # 미리보기: 화면 간격과 양방향 축소 배율 중 큰 쪽으로 줄여 계산
+        factor = max(step, reduction(mode, ksize))
+        result = filter_bands(self._level(factor), mode, max(1, ksize // factor) | 1)
+        o = round(PAD / factor)
+        result = result[o:o + max(1, round(h / factor)), o:o + max(1, round(w / factor))]
+        size = (len(range(0, w, step)), len(range(0, h, step)))
+        if result.shape[1::-1] != size:
+            result = cv2.resize(result, size, interpolation=cv2.INTER_LINEAR)
+        return result
+
+    def clear(self):
+        self._key = None
+        self.roi = self.padded = self._integral = None
+        self._levels = {}
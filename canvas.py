@@ -0,0 +1,310 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QRect, QTimer
+from PyQt5.QtGui import QImage, QPainter, QGuiApplication
+from PyQt5.QtWidgets import QWidget
+
+import profiling
+from pyramid import DisplayPyramid
+
+
+# 편집 캔버스 위젯
+# 원본 해상도 이미지는 그대로 두고, 화면에는 다중 해상도 피라미드로 만든 표시용 프록시를 그린다.
+# 바뀐 영역(dirty rect)만 프록시에서 다시 만들고, 여러 번의 변경은 화면 한 프레임에 한 번의 repaint 로 합쳐진다.
+# 확대/축소와 이동은 화면에 보이는 영역(뷰포트)만 피라미드에서 다시 그리는 표시 변환이라 이미지 데이터는 바뀌지 않는다.
+
+VIEW_SIZE = (900, 700)  # 이미지를 맞춰 보여줄 화면 영역 크기 (w, h)
+MAX_SCALE = 16.0  # 가장 크게 확대했을 때 원본 1px 이 차지하는 화면 px
+
+
+class Canvas(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pyramid = None
+        self._display = None  # 뷰포트에 보이는 부분만 담은 표시용 배열
+        self._qimage = None
+        self.fit_scale = 1.0  # 이미지 전체가 화면에 들어가는 배율
+        self.zoom = 1.0  # fit_scale 대비 확대 배율
+        self.scale = 1.0  # 원본 대비 화면 배율 (fit_scale * zoom)
+        self.origin = (0, 0)  # 뷰포트 왼쪽 위에 해당하는 배율 적용 이미지 좌표
+        self._view_changed = False
+        self._pan_last = None
+        self._stroke = None  # 진행 중인 획의 프록시 표시 상태 (마지막 점, 대기 중인 점들, 색, 굵기)
+        self._dirty = QRect()
+        self._overlay = None  # 미리보기용 (화면 x, y, 배열, QImage)
+        self._pending_since = None  # 아직 화면에 반영되지 않은 첫 변경 시각
+        self.latencies = deque(maxlen=2000)  # 입력 -> 화면 반영까지 걸린 시간(s)
+        self.repaint_pixels = 0
+
+        rate = 60.0
+        screen = QGuiApplication.primaryScreen()
+        if screen is not None and screen.refreshRate() > 0:
+            rate = screen.refreshRate()
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setInterval(max(1, int(1000 / rate)))
+        self._frame_timer.timeout.connect(self._flush)
+
+    def set_image(self, array):
+        # 배열 전체가 바뀌었을 때 (새 배열이거나 전체가 수정됨). 크기가 같으면 확대/이동 상태는 유지
+        if not array.flags["C_CONTIGUOUS"]:
+            array = np.ascontiguousarray(array)
+        same_size = self._pyramid is not None and self._pyramid.image.shape[:2] == array.shape[:2]
+        self._pyramid = DisplayPyramid(array)
+        height, width = array.shape[:2]
+        self.fit_scale = min(1.0, VIEW_SIZE[0] / width, VIEW_SIZE[1] / height)
+        if not same_size:
+            self.zoom = 1.0
+            self.origin = (0, 0)
+        self._overlay = None
+        self._dirty = QRect()
+        self._frame_timer.stop()
+        self._pending_since = None
+        self._render_view()
+        self.update()
+
+    def _clamp_view(self):
+        # 배율을 갱신하고 뷰포트가 이미지 밖으로 나가지 않도록 위치를 제한. 뷰포트 크기 (w, h) 를 반환
+        height, width = self._pyramid.image.shape[:2]
+        self.scale = self.fit_scale * self.zoom
+        full_w = max(1, int(round(width * self.scale)))
+        full_h = max(1, int(round(height * self.scale)))
+        view_w, view_h = min(VIEW_SIZE[0], full_w), min(VIEW_SIZE[1], full_h)
+        ox = min(max(0, self.origin[0]), full_w - view_w)
+        oy = min(max(0, self.origin[1]), full_h - view_h)
+        self.origin = (ox, oy)
+        return view_w, view_h
+
+    def _render_view(self):
+        # 현재 배율/위치로 뷰포트 전체를 피라미드에서 다시 그림
+        view_w, view_h = self._clamp_view()
+        if self._display is None or self._display.shape[:2] != (view_h, view_w):
+            self._display = np.empty((view_h, view_w) + self._pyramid.image.shape[2:], np.uint8)
+            self._wrap_display()
+        self._pyramid.render(self.scale, out=self._display, origin=self.origin, size=(view_w, view_h))
+        self._view_changed = False
+
+    def _wrap_display(self):
+        d = self._display
+        self._qimage = QImage(d.data, d.shape[1], d.shape[0], d.strides[0], QImage.Format_BGR888)
+
+    def display_array(self):
+        """화면 표시용 프록시 배열 (대화형 도구의 미리보기/임시 그리기에 사용)"""
+        return self._display
+
+    def map_to_image(self, x, y):
+        # 화면 좌표 -> 원본 이미지 좌표
+        return int((x + self.origin[0]) / self.scale), int((y + self.origin[1]) / self.scale)
+
+    def map_to_display(self, x, y):
+        # 원본 이미지 좌표 -> 화면 좌표
+        return (int(round(x * self.scale)) - self.origin[0],
+                int(round(y * self.scale)) - self.origin[1])
+
+    def zoom_at(self, factor, x, y):
+        """화면 좌표 (x, y) 아래의 지점을 고정한 채 확대/축소 (다음 화면 프레임에 다시 그림)"""
+        if self._pyramid is None:
+            return
+        zoom = min(max(1.0, self.zoom * factor), MAX_SCALE / self.fit_scale)
+        if zoom == self.zoom:
+            return
+        ratio = zoom / self.zoom
+        ox, oy = self.origin
+        self.origin = (int(round((ox + x) * ratio - x)), int(round((oy + y) * ratio - y)))
+        self.zoom = zoom
+        self._schedule_view()
+
+    def pan_by(self, dx, dy):
+        # 화면 px 단위로 뷰포트 이동 (이미지 경계 안으로 제한)
+        if self._pyramid is None:
+            return
+        self.origin = (self.origin[0] - int(dx), self.origin[1] - int(dy))
+        self._schedule_view()
+
+    def begin_pan(self, x, y):
+        self._pan_last = (x, y)
+
+    def pan_to(self, x, y):
+        if self._pan_last is None:
+            return
+        self.pan_by(x - self._pan_last[0], y - self._pan_last[1])
+        self._pan_last = (x, y)
+
+    def end_pan(self):
+        self._pan_last = None
+
+    def is_panning(self):
+        return self._pan_last is not None
+
+    def reset_view(self):
+        self.zoom = 1.0
+        self.origin = (0, 0)
+        self._schedule_view()
+
+    def _schedule_view(self):
+        # 휠/드래그 이벤트가 여러 번 와도 화면 프레임마다 한 번만 다시 그림
+        # (좌표 변환은 바로 새 배율/위치를 따름)
+        self._clamp_view()
+        self._view_changed = True
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoom_at(1.1 ** steps, event.pos().x(), event.pos().y())
+        event.accept()
+
+    def set_overlay(self, x, y, patch):
+        # 화면 좌표 (x, y) 에 미리보기 조각을 겹쳐 그림 (이미지 데이터는 바꾸지 않음)
+        self.clear_overlay()
+        patch = np.ascontiguousarray(patch)
+        h, w = patch.shape[:2]
+        qimage = QImage(patch.data, w, h, patch.strides[0], QImage.Format_BGR888)
+        self._overlay = (int(x), int(y), patch, qimage)
+        self.mark_display_dirty(x, y, x + w - 1, y + h - 1)
+
+    def clear_overlay(self):
+        if self._overlay is None:
+            return
+        x, y, patch, _ = self._overlay
+        self._overlay = None
+        self.mark_display_dirty(x, y, x + patch.shape[1] - 1, y + patch.shape[0] - 1)
+
+    def has_overlay(self):
+        return self._overlay is not None
+
+    def begin_proxy_stroke(self, point, color, thickness):
+        """
+        원본 좌표 point 에서 시작하는 획을 표시용 프록시에 그리기 시작 (원본은 획이 끝날 때 한 번에 반영)
+        thickness 는 화면 픽셀 단위
+        """
+        self._stroke = [self.map_to_display(*point), [], color, thickness]
+
+    def add_proxy_point(self, point):
+        # 점은 모아 두었다가 다음 화면 프레임에 polyline 한 번으로 그림
+        if self._stroke is None or self._display is None:
+            return
+        self._stroke[1].append(self.map_to_display(*point))
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter()
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def end_proxy_stroke(self):
+        self._render_pending_stroke()
+        self._stroke = None
+
+    def _render_pending_stroke(self):
+        if self._stroke is None or not self._stroke[1] or self._view_changed:
+            return
+        last, pending, color, thickness = self._stroke
+        points = np.array([last] + pending, dtype=np.int32)
+        cv2.polylines(self._display, [points.reshape(-1, 1, 2)], False, color, thickness)
+        self._stroke[0] = pending[-1]
+        self._stroke[1] = []
+        r = thickness // 2 + 2
+        x0, y0 = points.min(axis=0) - r
+        x1, y1 = points.max(axis=0) + r
+        self.mark_display_dirty(x0, y0, x1, y1)
+
+    def mark_dirty(self, x0, y0, x1, y1, timestamp=None):
+        """원본의 (x0, y0) ~ (x1, y1) 영역이 바뀌었음을 알림. 피라미드와 프록시의 해당 부분만 다시 만든다."""
+        if self._pyramid is None:
+            return
+        h, w = self._pyramid.image.shape[:2]
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(w - 1, int(x1)), min(h - 1, int(y1))
+        if x1 < x0 or y1 < y0:
+            return
+        self._pyramid.update_region(x0, y0, x1 + 1, y1 + 1)
+        if self._view_changed:
+            return  # 다음 프레임에 뷰포트 전체를 다시 그림
+        s = self.scale
+        ox, oy = self.origin
+        dx0, dy0 = int(np.floor(x0 * s)) - 1 - ox, int(np.floor(y0 * s)) - 1 - oy
+        dx1, dy1 = int(np.ceil((x1 + 1) * s)) + 1 - ox, int(np.ceil((y1 + 1) * s)) + 1 - oy
+        self._pyramid.render(s, out=self._display, region=(dx0, dy0, dx1, dy1), origin=self.origin,
+                             size=self._display.shape[1::-1])
+        self.mark_display_dirty(dx0, dy0, dx1, dy1, timestamp)
+
+    def mark_display_dirty(self, x0, y0, x1, y1, timestamp=None):
+        # 화면 좌표 영역을 다음 화면 프레임에 다시 그리도록 예약
+        if self._qimage is None:
+            return
+        rect = QRect(int(x0), int(y0), int(x1 - x0) + 1, int(y1 - y0) + 1).intersected(self._qimage.rect())
+        if rect.isEmpty():
+            return
+        self._dirty = self._dirty.united(rect)
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter() if timestamp is None else timestamp
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def _flush(self):
+        self._render_pending_stroke()
+        if self._view_changed:
+            self._overlay = None  # 미리보기는 화면 좌표 기준이라 보기가 바뀌면 지움
+            self._render_view()
+            self._dirty = QRect()
+            self.repaint()
+            return
+        if not self._dirty.isEmpty():
+            rect = self._dirty
+            self._dirty = QRect()
+            self.repaint(rect)
+
+    def paintEvent(self, event):
+        if self._qimage is None:
+            return
+        painter = QPainter(self)
+        rect = event.rect().intersected(self._qimage.rect())
+        if not rect.isEmpty():
+            painter.drawImage(rect, self._qimage, rect)
+            self.repaint_pixels += rect.width() * rect.height()
+            if self._overlay is not None:
+                x, y, _, qimage = self._overlay
+                target = QRect(x, y, qimage.width(), qimage.height()).intersected(rect)
+                if not target.isEmpty():
+                    painter.drawImage(target, qimage, target.translated(-x, -y))
+        painter.end()
+        if self._pending_since is not None:
+            self.latencies.append(time.perf_counter() - self._pending_since)
+            self._pending_since = None
+
+    def reset_latency(self):
+        self.latencies.clear()
+        self.repaint_pixels = 0
+
+    def latency_stats(self):
+        """브러쉬 입력에서 화면 반영까지의 지연 시간 통계 (ms)"""
+        if not self.latencies:
+            return None
+        values = np.array(self.latencies) * 1000
+        return {
+            "count": len(values),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "max": float(values.max()),
+            "repaint_pixels": self.repaint_pixels,
+        }
+
+    def sizeHint(self):
+        if self._qimage is None:
+            return super().sizeHint()
+        return self._qimage.size()
+
+
+def _view_args(canvas):
+    if canvas._display is None:
+        return None
+    h, w = canvas._display.shape[:2]
+    return {"view": f"{w}x{h}", "zoom": round(canvas.zoom, 3)}
+
+
+# 화면 갱신 구간 측정 (profiling.PROFILER 가 꺼져 있으면 플래그만 확인)
+profiling.instrument(Canvas, ["paintEvent", "_flush", "_render_view", "set_image"], "canvas", _view_args)
@@ -0,0 +1,130 @@
+import heapq
+
+import cv2
+import numpy as np
+
+
+# 문서 윤곽 찾기 (원근 변환용)
+# 긴 변이 DETECT_SIDE 이하가 되도록 정수 배율로 줄인 흑백 이미지에서 가장자리와 윤곽선을 찾아 문서 사각형 후보를 고르고,
+# 원본 해상도에서는 후보 꼭짓점 주변의 작은 조각만 흑백으로 바꿔 cornerSubPix 로 위치를 다듬는다.
+# 따라서 24MP 사진에서도 전체 해상도로 처리하는 것은 꼭짓점 4개 주변과 마지막 warpPerspective 뿐이다.
+# 꼭짓점은 좌상단부터 시계 방향으로 정렬하고, 결과 크기는 사각형 변의 길이로 정해 문서 비율을 유지한다.
+
+DETECT_SIDE = 1024  # 윤곽을 찾는 축소 이미지의 긴 변
+MIN_AREA = 0.1  # 문서로 볼 최소 넓이 (축소 이미지 넓이에 대한 비율)
+CANDIDATES = 5  # 넓이가 큰 윤곽선부터 이 개수만 사각형인지 확인
+_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+_SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+
+
+def detection_level(image):
+    """윤곽을 찾을 축소 흑백 이미지와 축소 배율 (정수)"""
+    factor = max(1, -(-max(image.shape[:2]) // DETECT_SIDE))
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if factor > 1:
+        # 정수 배율의 INTER_AREA 는 factor x factor 블록 평균이라 임의 배율보다 몇 배 빠름
+        gray = cv2.resize(gray, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+    return gray, factor
+
+
+def find_quad(gray):
+    # 넓이가 큰 윤곽선 중 볼록한 사각형으로 근사되는 첫 번째 (없으면 None)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.dilate(cv2.Canny(blurred, 50, 150), _KERNEL)  # 끊긴 가장자리를 이어 줌
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = MIN_AREA * gray.shape[0] * gray.shape[1]
+    for cnt in heapq.nlargest(CANDIDATES, contours, key=cv2.contourArea):
+        if cv2.contourArea(cnt) < min_area:
+            break
+        approx = cv2.approxPolyDP(cnt, 0.02 * cv2.arcLength(cnt, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return approx.reshape(4, 2).astype(np.float32)
+    return None
+
+
+def order_corners(points):
+    """꼭짓점 4개를 좌상단, 우상단, 우하단, 좌하단 순서로 정렬"""
+    points = np.asarray(points, np.float32).reshape(4, 2)
+    center = points.mean(axis=0)
+    # 화면 좌표(y 가 아래로 증가)에서 각도가 커지는 방향이 시계 방향
+    angles = np.arctan2(points[:, 1] - center[1], points[:, 0] - center[0])
+    points = points[np.argsort(angles)]
+    return np.roll(points, -int(np.argmin(points.sum(axis=1))), axis=0)
+
+
+def refine_corners(image, quad, factor):
+    """
+    원본 해상도에서 각 꼭짓점 주변 조각만 cornerSubPix 로 다듬음
+    축소 배율만큼 생기는 오차를 덮을 만큼만 보며, 다듬은 점이 창 밖으로 벗어나면 원래 점을 쓴다.
+    """
+    h, w = image.shape[:2]
+    half = 2 * factor + 4  # cornerSubPix 창의 반 크기 (축소 이미지의 2px + 여유)
+    refined = quad.copy()
+    for i, (x, y) in enumerate(quad):
+        x0, y0 = max(0, int(x) - 2 * half), max(0, int(y) - 2 * half)
+        x1, y1 = min(w, int(x) + 2 * half + 1), min(h, int(y) + 2 * half + 1)
+        if x1 - x0 < 2 * half + 3 or y1 - y0 < 2 * half + 3:
+            continue  # 이미지 가장자리에 붙은 꼭짓점은 창을 만들 수 없음
+        patch = image[y0:y1, x0:x1]
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        point = np.array([[[x - x0, y - y0]]], np.float32)
+        cv2.cornerSubPix(patch, point, (half, half), (-1, -1), _SUBPIX_CRITERIA)
+        px, py = point[0, 0]
+        if abs(px + x0 - x) <= half and abs(py + y0 - y) <= half:
+            refined[i] = (px + x0, py + y0)
+    return refined
+
+
+def find_document(image, refine=True):
+    """원본 좌표의 문서 꼭짓점 (4, 2) float32, 좌상단부터 시계 방향 (찾지 못하면 None)"""
+    gray, factor = detection_level(image)
+    quad = find_quad(gray)
+    if quad is None:
+        return None
+    # 축소 이미지의 픽셀 u 는 원본의 [u * factor, (u + 1) * factor) 블록
+    quad = order_corners((quad + 0.5) * factor - 0.5)
+    if refine and factor > 1:
+        quad = refine_corners(image, quad, factor)
+    return quad
+
+
+def output_size(quad):
+    """사각형의 마주 보는 변 중 긴 쪽으로 정한 결과 크기 (w, h)"""
+    tl, tr, br, bl = np.asarray(quad, np.float32)
+    width = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+    height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+    return max(1, int(round(width))), max(1, int(round(height)))
+
+
+def warp_matrix(quad, size=None):
+    """quad 를 size (기본: output_size) 의 직사각형으로 펼치는 3x3 행렬과 결과 크기 (w, h)"""
+    quad = order_corners(quad)
+    width, height = size or output_size(quad)
+    dst = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], np.float32)
+    return cv2.getPerspectiveTransform(quad, dst), (width, height)
+
+
+def warp(image, quad, size=None, interpolation=cv2.INTER_LINEAR):
+    """quad 를 size (기본: output_size) 의 직사각형으로 펼침"""
+    matrix, size = warp_matrix(quad, size)
+    return cv2.warpPerspective(image, matrix, size, flags=interpolation)
+
+
+class DocumentDetector:
+    """이미지 버전마다 찾은 사각형을 기억해 같은 이미지에서 다시 찾지 않음"""
+
+    def __init__(self):
+        self.version = None
+        self.shape = None
+        self.quad = None
+
+    def detect(self, image, version):
+        if version != self.version or image.shape != self.shape:
+            self.quad = find_document(image)
+            self.version = version
+            self.shape = image.shape
+        return None if self.quad is None else self.quad.copy()
+
+    def clear(self):
+        self.version = self.shape = self.quad = None
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+
+# 이미지 내보내기 (형식별 인코딩 설정과 백그라운드 인코딩 큐)
+# 인코딩은 OpenCV 안에서 GIL 을 놓고 실행되므로 여러 형식/크기로 내보낼 때 스레드마다 하나씩 동시에 인코딩한다.
+# 내보낼 이미지는 제출할 때 한 번 복사해 두므로 인코딩이 끝나기를 기다리지 않고 계속 편집할 수 있다.
+# 내보낼 때마다 크기 조정/인코딩/쓰기 시간과 파일 크기를 기록해 설정별로 시간과 용량을 비교할 수 있게 한다.
+
+FORMATS = {
+    ".png": "png",
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".webp": "webp",
+    ".tif": "tiff",
+    ".tiff": "tiff",
+    ".bmp": "bmp",
+}
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp", "tiff": ".tif", "bmp": ".bmp"}
+
+# zlib 압축 전략. 압축 수준을 직접 주면 OpenCV 는 기본 전략(rle) 대신 default 를 쓰므로 함께 지정한다.
+# 잡음이 있는 사진은 rle 가 빠르고 작으며, 단색 면이 많은 그림은 default/filtered 에 높은 수준이 더 작다.
+PNG_STRATEGY = {
+    "rle": cv2.IMWRITE_PNG_STRATEGY_RLE,
+    "default": cv2.IMWRITE_PNG_STRATEGY_DEFAULT,
+    "filtered": cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+}
+
+# libtiff 압축 코드 (OpenCV 버전에 따라 IMWRITE_TIFF_COMPRESSION_* 상수가 없을 수 있어 값으로 씀)
+TIFF_COMPRESSION = {"none": 1, "lzw": 5, "deflate": 8, "packbits": 32773}
+
+DEFAULT_OPTIONS = {
+    "png_compression": 1,  # 0 (빠르고 큼) ~ 9 (느리고 작음). 1 + rle 가 OpenCV 기본값
+    "png_strategy": "rle",
+    "jpeg_quality": 95,
+    "jpeg_progressive": False,
+    "jpeg_optimize": False,  # 허프만 테이블 최적화 (조금 느리고 조금 작음)
+    "webp_quality": 90,  # 100 을 넘으면 무손실
+    "tiff_compression": "lzw",
+}
+
+
+def format_of(path):
+    """확장자로 본 형식 이름 (지원하지 않으면 None)"""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def encode_params(fmt, options=None):
+    # 형식별 cv2.imencode 인자. options 에 없는 항목은 DEFAULT_OPTIONS 를 씀
+    o = dict(DEFAULT_OPTIONS)
+    o.update(options or {})
+    if fmt == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(o["png_compression"]),
+                cv2.IMWRITE_PNG_STRATEGY, PNG_STRATEGY[o["png_strategy"]]]
+    if fmt == "jpeg":
+        return [cv2.IMWRITE_JPEG_QUALITY, int(o["jpeg_quality"]),
+                cv2.IMWRITE_JPEG_PROGRESSIVE, int(bool(o["jpeg_progressive"])),
+                cv2.IMWRITE_JPEG_OPTIMIZE, int(bool(o["jpeg_optimize"]))]
+    if fmt == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(o["webp_quality"])]
+    if fmt == "tiff":
+        return [cv2.IMWRITE_TIFF_COMPRESSION, TIFF_COMPRESSION[o["tiff_compression"]]]
+    return []
+
+
+def scaled(image, scale):
+    if scale == 1:
+        return image
+    h, w = image.shape[:2]
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+
+
+class ExportTarget:
+    """내보낼 파일 하나 (경로, 인코딩 설정, 크기 배율)"""
+    __slots__ = ("path", "options", "scale")
+
+    def __init__(self, path, options=None, scale=1.0):
+        self.path = path
+        self.options = dict(options or {})
+        self.scale = float(scale)
+
+
+class ExportResult:
+    __slots__ = ("path", "ok", "error", "shape", "nbytes", "resize_s", "encode_s", "write_s")
+
+    def __init__(self, path):
+        self.path = path
+        self.ok = False
+        self.error = ""
+        self.shape = None
+        self.nbytes = 0
+        self.resize_s = self.encode_s = self.write_s = 0.0
+
+    @property
+    def total_s(self):
+        return self.resize_s + self.encode_s + self.write_s
+
+    def describe(self):
+        name = os.path.basename(self.path)
+        if not self.ok:
+            return f"{name}: 실패 ({self.error})"
+        h, w = self.shape[:2]
+        return (f"{name}: {w}x{h}, {self.nbytes / 1024:,.0f}KB, "
+                f"인코딩 {self.encode_s * 1000:.0f}ms / 쓰기 {self.write_s * 1000:.0f}ms"
+                + (f" / 크기 조정 {self.resize_s * 1000:.0f}ms" if self.resize_s else ""))
+
+
+def export(image, target):
+    """image 를 target 에 맞게 인코딩해 저장하고 ExportResult 를 반환 (예외를 던지지 않음)"""
+    result = ExportResult(target.path)
+    fmt = format_of(target.path)
+    if fmt is None:
+        result.error = "지원하지 않는 형식"
+        return result
+    start = time.perf_counter()
+    image = scaled(image, target.scale)
+    encode_start = time.perf_counter()
+    ok, buf = cv2.imencode(os.path.splitext(target.path)[1], image, encode_params(fmt, target.options))
+    write_start = time.perf_counter()
+    if not ok:
+        result.error = "인코딩 실패"
+        return result
+    try:
+        buf.tofile(target.path)
+    except OSError as e:
+        result.error = str(e)
+        return result
+    end = time.perf_counter()
+    result.ok = True
+    result.shape = image.shape
+    result.nbytes = buf.nbytes
+    result.resize_s = encode_start - start if target.scale != 1 else 0.0
+    result.encode_s = write_start - encode_start
+    result.write_s = end - write_start
+    return result
+
+
+class ExportQueue:
+    def __init__(self, workers=None, keep=200):
+        workers = workers or min(4, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-export")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.results = deque(maxlen=keep)  # 최근 내보내기 결과 (오래된 것부터)
+
+    def submit(self, image, targets, on_result=None):
+        """
+        image 를 복사해 두고 targets 를 각각 병렬로 내보냄. 각 대상의 Future 목록을 반환
+        on_result(result) 는 작업 스레드에서 호출되므로 UI 갱신은 시그널로 넘길 것
+        """
+        snapshot = image.copy()
+        snapshot.setflags(write=False)
+        with self._lock:
+            self._pending += len(targets)
+        return [self._pool.submit(self._run, snapshot, target, on_result) for target in targets]
+
+    def _run(self, image, target, on_result):
+        result = export(image, target)
+        with self._lock:
+            self._pending -= 1
+            self.results.append(result)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def shutdown(self, wait=True):
+        # 제출한 파일은 끝까지 씀 (중간에 끊기면 깨진 파일이 남음)
+        self._pool.shutdown(wait=wait)
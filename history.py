@@ -0,0 +1,557 @@
+import os
+import shutil
+import tempfile
+import zlib
+
+import numpy as np
+
+
+# 타일 단위 델타 히스토리
+# 각 단계는 이전 상태와 달라진 타일만 XOR 델타로 저장한다.
+# XOR 델타는 양방향으로 적용되므로 현재 상태(base) 하나만 있으면 되돌리기/다시 실행이 모두 가능하다.
+# 브러쉬 획처럼 파라미터로 다시 그릴 수 있는 편집은 픽셀 대신 기록(record)만 저장한다.
+# 연속된 기록 단계는 하나의 체크포인트를 공유하고, 되돌릴 때는 체크포인트 상태에서 앞쪽 기록을 다시 그린다.
+# 체크포인트에는 묶음 전체가 바꾼 타일의 XOR 델타 하나만 남으므로 같은 곳을 여러 번 그린 획은 픽셀 데이터를 나눠 쓴다.
+
+
+class _Tile:
+    __slots__ = ("y", "x", "shape", "payload", "compressed", "offset", "length", "key")
+
+    def __init__(self, y, x, shape, payload, compressed, length=None):
+        self.y = y
+        self.x = x
+        self.shape = shape
+        self.payload = payload  # bytes (메모리에 있을 때) 또는 None (디스크로 내보냈을 때)
+        self.compressed = compressed
+        self.offset = 0
+        self.length = len(payload) if length is None else length
+        self.key = None  # 프로젝트 파일에 저장할 때 쓰는 내용 해시 (한 번만 계산)
+
+
+class _Checkpoint:
+    """
+    연속된 기록 단계 묶음이 시작된 상태 (묶음 안의 기록이 건드린 타일만)
+    묶음이 열려 있는 동안은 타일의 원래 픽셀을 저장하고,
+    묶음이 닫히면 (원래 픽셀 XOR 묶음 마지막 상태) 델타로 바꿔 둔다. 델타는 획이 지나간 곳 말고는 0 이라 잘 압축된다.
+    """
+
+    def __init__(self):
+        self.tiles = {}  # (y, x) -> _Tile
+        self.records = []  # 묶음 안의 기록 (순서대로)
+        self.owner = None  # 타일 데이터를 메모리/디스크 계산에 넣는 단계 (묶음의 첫 단계)
+        self.closed = False  # True 면 tiles 는 묶음 마지막 상태에 대한 XOR 델타
+
+
+class HistoryStep:
+    """상태 k -> k+1 전환을 담는 한 단계"""
+
+    def __init__(self, kind, tiles=None, before=None, after=None, label="", meta=None,
+                 record=None, checkpoint=None, position=0):
+        self.kind = kind  # "tiles", "full" (크기가 바뀐 경우) 또는 "record"
+        self.tiles = tiles or []
+        self.before = before  # "full" 단계일 때만 사용 (_Tile)
+        self.after = after
+        self.label = label
+        self.meta = meta  # 단계에 붙는 부가 정보 (예: 작업 그래프 노드)
+        self.record = record  # "record" 단계: apply(image) 로 다시 그릴 수 있는 편집 기록
+        self.checkpoint = checkpoint
+        self.position = position  # 체크포인트 묶음 안에서 몇 번째 기록인지
+        self.spill_path = None
+        self.mapped = None  # 프로젝트 파일에서 읽은 단계: 파일을 메모리 매핑한 버퍼 (tile.offset 은 파일 안 위치)
+
+    def _payload_tiles(self):
+        if self.kind == "full":
+            return [self.before, self.after]
+        if self.kind == "record":
+            return list(self.checkpoint.tiles.values()) if self.checkpoint.owner is self else []
+        return self.tiles
+
+    def nbytes(self):
+        size = sum(t.length for t in self._payload_tiles())
+        if self.record is not None:
+            size += self.record.nbytes()
+        return size
+
+    def in_memory(self):
+        return self.spill_path is None and self.mapped is None
+
+    def spill(self, directory, name):
+        # 타일 데이터를 하나의 파일로 내보내고 메모리에서 해제
+        path = os.path.join(directory, name)
+        offset = 0
+        with open(path, "wb") as f:
+            for t in self._payload_tiles():
+                f.write(t.payload)
+                t.offset = offset
+                offset += t.length
+                t.payload = None
+        self.spill_path = path
+
+    def raw(self, tile):
+        # 저장된 그대로의 (압축된) 타일 데이터
+        if tile.payload is not None:
+            return tile.payload
+        if self.mapped is not None:
+            return self.mapped[tile.offset:tile.offset + tile.length]
+        with open(self.spill_path, "rb") as f:
+            f.seek(tile.offset)
+            return f.read(tile.length)
+
+    def read(self, tile):
+        data = self.raw(tile)
+        if tile.compressed:
+            data = zlib.decompress(data)
+        return data
+
+    def array(self, tile, dtype):
+        return np.frombuffer(self.read(tile), dtype=dtype).reshape(tile.shape)
+
+    def discard(self):
+        # 내보낸 파일만 지움 (프로젝트 파일은 그대로 둠)
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.mapped = None
+
+
+class TileHistory:
+    """
+    변경된 타일만 저장하는 되돌리기 히스토리
+    tile_size: 타일 한 변의 크기(px)
+    compress: 델타를 zlib 으로 압축할지 여부
+    max_bytes: 메모리에 둘 단계 데이터의 상한 (None 이면 무제한)
+    spill_dir: 상한을 넘긴 오래된 단계를 내보낼 디렉터리 (None 이면 오래된 단계를 버림)
+    checkpoint_interval: 체크포인트 하나를 공유하는 최대 기록 단계 수 (되돌릴 때 다시 그리는 최대 기록 수)
+    """
+
+    def __init__(self, tile_size=128, compress=True, compress_level=1,
+                 max_bytes=256 * 1024 * 1024, spill_dir=None, checkpoint_interval=32):
+        self.tile_size = tile_size
+        self.compress = compress
+        self.compress_level = compress_level
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoint = None  # 기록 단계를 이어 붙일 현재 체크포인트
+        self._spill_tmp = None
+        self._spill_count = 0
+        self.steps = []
+        self.index = -1  # 현재 상태 번호 (steps[i] 는 상태 i -> i+1)
+        self._base = None  # 현재 상태의 사본
+        self._base_meta = None  # 가장 오래된 상태의 부가 정보
+        self.dtype = None
+
+    def __len__(self):
+        # 저장된 상태 개수
+        return len(self.steps) + 1 if self._base is not None else 0
+
+    def empty_copy(self):
+        """같은 설정의 빈 히스토리 (불러오기가 끝날 때까지 지금 히스토리를 건드리지 않을 때)"""
+        return TileHistory(self.tile_size, self.compress, self.compress_level, self.max_bytes,
+                           self.spill_dir, self.checkpoint_interval)
+
+    def clear(self):
+        for step in self.steps:
+            step.discard()
+        self.steps = []
+        self.index = -1
+        self._base = None
+        self._base_meta = None
+        self._checkpoint = None
+
+    def close(self):
+        self.clear()
+        if self._spill_tmp is not None:
+            shutil.rmtree(self._spill_tmp, ignore_errors=True)
+            self._spill_tmp = None
+
+    def can_undo(self):
+        return self.index > 0
+
+    def can_redo(self):
+        return 0 <= self.index < len(self.steps)
+
+    def _pack(self, arr):
+        data = arr.tobytes()
+        if self.compress:
+            return zlib.compress(data, self.compress_level), True
+        return data, False
+
+    def _tile_ranges(self, shape, region=None):
+        h, w = shape[:2]
+        t = self.tile_size
+        if region is None:
+            y0, y1, x0, x1 = 0, h, 0, w
+        else:
+            x, y, rw, rh = region
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(w, int(x + rw)), min(h, int(y + rh))
+            if x1 <= x0 or y1 <= y0:
+                return
+        for ty in range(y0 // t * t, y1, t):
+            for tx in range(x0 // t * t, x1, t):
+                yield ty, min(ty + t, h), tx, min(tx + t, w)
+
+    def commit(self, image, region=None, label="", meta=None):
+        """
+        현재 이미지를 새 상태로 기록
+        region: (x, y, w, h) 변경이 일어난 영역 힌트. 주어지면 그 영역의 타일만 비교한다.
+        meta: 새 상태에 붙일 부가 정보 (current_meta() 로 조회)
+        변경이 없으면 단계를 만들지 않고 False 를 반환
+        """
+        if self._base is None:
+            self._base = image.copy()
+            self._base_meta = meta
+            self.dtype = image.dtype
+            self.index = 0
+            return True
+
+        self._discard_redo()
+        self._close_checkpoint()  # 다음 기록 단계는 새 체크포인트에서 시작
+
+        if image.shape != self._base.shape or image.dtype != self._base.dtype:
+            before_data, c1 = self._pack(self._base)
+            after_data, c2 = self._pack(image)
+            step = HistoryStep(
+                "full",
+                before=_Tile(0, 0, self._base.shape, before_data, c1),
+                after=_Tile(0, 0, image.shape, after_data, c2),
+                label=label,
+                meta=meta,
+            )
+            self._base = image.copy()
+            self.dtype = image.dtype
+        else:
+            tiles = []
+            for y0, y1, x0, x1 in self._tile_ranges(image.shape, region):
+                cur = image[y0:y1, x0:x1]
+                old = self._base[y0:y1, x0:x1]
+                if np.array_equal(cur, old):
+                    continue
+                delta = np.bitwise_xor(cur, old)
+                data, compressed = self._pack(delta)
+                tiles.append(_Tile(y0, x0, delta.shape, data, compressed))
+                old[...] = cur
+            if not tiles:
+                return False
+            step = HistoryStep("tiles", tiles=tiles, label=label, meta=meta)
+
+        self.steps.append(step)
+        self.index += 1
+        self._enforce_budget()
+        return True
+
+    def commit_record(self, image, record, label="", meta=None):
+        """
+        record.apply(image) 로 그린 편집을 픽셀 대신 기록으로 저장
+        image 는 이미 record 가 그려진 상태여야 한다. record 는 apply(image) -> (x, y, w, h),
+        rect(shape) -> (x, y, w, h), nbytes() 를 제공하고 같은 입력에 항상 같은 결과를 그려야 한다.
+        """
+        if self._base is None or image.shape != self._base.shape or image.dtype != self._base.dtype:
+            return self.commit(image, label=label, meta=meta)
+        self._discard_redo()
+
+        cp = self._checkpoint
+        if cp is None or len(cp.records) >= self.checkpoint_interval:
+            self._close_checkpoint()
+            cp = self._checkpoint = _Checkpoint()
+        for y0, y1, x0, x1 in self._tile_ranges(image.shape, record.rect(image.shape)):
+            if (y0, x0) not in cp.tiles:
+                # 묶음에서 처음 건드리는 타일은 그리기 전 픽셀을 저장
+                old = self._base[y0:y1, x0:x1]
+                data, compressed = self._pack(old)
+                cp.tiles[(y0, x0)] = _Tile(y0, x0, old.shape, data, compressed)
+            self._base[y0:y1, x0:x1] = image[y0:y1, x0:x1]
+
+        step = HistoryStep("record", label=label, meta=meta, record=record,
+                           checkpoint=cp, position=len(cp.records))
+        cp.records.append(record)
+        if cp.owner is None:
+            cp.owner = step
+        self.steps.append(step)
+        self.index += 1
+        self._enforce_budget()
+        return True
+
+    def _close_checkpoint(self):
+        # 열린 체크포인트의 원래 픽셀을 현재 상태(묶음의 마지막 상태)에 대한 XOR 델타로 바꿈
+        cp = self._checkpoint
+        self._checkpoint = None
+        if cp is None:
+            return
+        for key, tile in cp.tiles.items():
+            h, w = tile.shape[:2]
+            delta = np.bitwise_xor(cp.owner.array(tile, self.dtype), self._base[tile.y:tile.y + h, tile.x:tile.x + w])
+            data, compressed = self._pack(delta)
+            cp.tiles[key] = _Tile(tile.y, tile.x, tile.shape, data, compressed)
+        cp.closed = True
+
+    def _checkpoint_start(self, cp, end):
+        """
+        닫힌 체크포인트 cp 의 묶음 시작 상태로 base 의 타일을 되돌림
+        base 는 묶음의 end 번째 기록까지 그려진 상태여야 한다.
+        뒤쪽 기록을 다시 그려 묶음 마지막 상태로 만든 뒤 XOR 델타를 적용한다.
+        """
+        for record in cp.records[end:]:
+            record.apply(self._base)
+        for tile in cp.tiles.values():
+            h, w = tile.shape[:2]
+            region = self._base[tile.y:tile.y + h, tile.x:tile.x + w]
+            np.bitwise_xor(region, cp.owner.array(tile, self.dtype), out=region)
+
+    def _reopen_checkpoint(self, cp, position):
+        # 묶음 뒤쪽 기록을 버리고 (다시 실행 단계 버리기) 남은 기록에 이어서 그릴 수 있도록 체크포인트를 다시 엶
+        current = {key: self._base[t.y:t.y + t.shape[0], t.x:t.x + t.shape[1]].copy()
+                   for key, t in cp.tiles.items()}
+        self._checkpoint_start(cp, position)
+        for key, tile in cp.tiles.items():
+            h, w = tile.shape[:2]
+            region = self._base[tile.y:tile.y + h, tile.x:tile.x + w]
+            data, compressed = self._pack(region)
+            cp.tiles[key] = _Tile(tile.y, tile.x, tile.shape, data, compressed)
+            region[...] = current[key]
+        if not cp.owner.in_memory():
+            cp.owner.discard()
+            cp.owner.spill_path = None
+        del cp.records[position:]
+        cp.closed = False
+        self._checkpoint = cp
+
+    def _discard_redo(self):
+        # 다시 실행 단계 버리기
+        redo = self.steps[self.index:]
+        if not redo:
+            return
+        self._close_checkpoint()
+        first = redo[0]
+        if first.kind == "record" and first.position > 0:
+            # 현재 상태가 기록 묶음 중간이면 그 묶음을 현재 상태까지로 줄여 다시 엶
+            self._reopen_checkpoint(first.checkpoint, first.position)
+        for step in redo:
+            step.discard()
+        del self.steps[self.index:]
+
+    def _apply(self, step, image, forward):
+        # step 을 image 와 base 에 적용 (변경된 타일만 다시 만든다)
+        if step.kind == "full":
+            tile = step.after if forward else step.before
+            self._base = step.array(tile, self.dtype).copy()
+            return self._base.copy()
+
+        if step.kind == "record":
+            return self._apply_record(step, image, forward)
+
+        if image is None or image.shape != self._base.shape:
+            image = None
+        for tile in step.tiles:
+            delta = step.array(tile, self.dtype)
+            h, w = tile.shape[:2]
+            region = self._base[tile.y:tile.y + h, tile.x:tile.x + w]
+            np.bitwise_xor(region, delta, out=region)
+            if image is not None:
+                image[tile.y:tile.y + h, tile.x:tile.x + w] = region
+        return image if image is not None else self._base.copy()
+
+    def _apply_record(self, step, image, forward):
+        if forward:
+            regions = [step.record.apply(self._base)]
+        else:
+            # 체크포인트(묶음 시작) 상태로 타일을 돌린 뒤 이 단계 앞의 기록만 다시 그림
+            cp = step.checkpoint
+            self._checkpoint_start(cp, step.position + 1)
+            for record in cp.records[:step.position]:
+                record.apply(self._base)
+            regions = [(t.x, t.y, t.shape[1], t.shape[0]) for t in cp.tiles.values()]
+
+        if image is None or image.shape != self._base.shape:
+            return self._base.copy()
+        for x, y, w, h in regions:
+            image[y:y + h, x:x + w] = self._base[y:y + h, x:x + w]
+        return image
+
+    def undo(self, image=None):
+        """한 단계 되돌린 이미지를 반환 (image 가 주어지면 해당 배열을 제자리에서 수정)"""
+        if not self.can_undo():
+            return None
+        self._close_checkpoint()
+        self.index -= 1
+        return self._apply(self.steps[self.index], image, forward=False)
+
+    def redo(self, image=None):
+        if not self.can_redo():
+            return None
+        self._close_checkpoint()
+        step = self.steps[self.index]
+        self.index += 1
+        return self._apply(step, image, forward=True)
+
+    def current(self):
+        return None if self._base is None else self._base.copy()
+
+    def current_meta(self):
+        # 현재 상태에 붙은 부가 정보
+        if self.index <= 0:
+            return self._base_meta
+        return self.steps[self.index - 1].meta
+
+    def last_step(self):
+        # 현재 상태로 오게 한 단계 (없으면 None)
+        if self.index <= 0:
+            return None
+        return self.steps[self.index - 1]
+
+    def changed_pixels(self, step):
+        """
+        "tiles" 단계에서 바뀐 픽셀 목록을 (y, x, mask) 로 반환
+        mask 는 타일 크기의 bool 배열
+        """
+        result = []
+        for tile in step.tiles:
+            delta = step.array(tile, self.dtype)
+            mask = delta.any(axis=2) if delta.ndim == 3 else delta != 0
+            result.append((tile.y, tile.x, mask))
+        return result
+
+    def memory_bytes(self):
+        return sum(s.nbytes() for s in self.steps if s.in_memory())
+
+    def _enforce_budget(self):
+        if self.max_bytes is None:
+            return
+        if self.spill_dir is None:
+            # 가장 오래된 단계부터 버림 (그 이전 상태로는 돌아갈 수 없게 됨)
+            # 단계는 앞 상태에 대한 델타라 가운데 단계만 버릴 수는 없으므로, 메모리에 없는 (프로젝트 파일에서 매핑한) 단계도 순서대로 버린다.
+            while self.memory_bytes() > self.max_bytes and len(self.steps) > 1 and self.index > 0:
+                self._drop_oldest()
+            return
+        total = self.memory_bytes()
+        i = 0
+        while total > self.max_bytes and i < len(self.steps) - 1:
+            step = self.steps[i]
+            i += 1
+            if not step.in_memory():
+                continue
+            if step.kind == "record" and (step.checkpoint.owner is not step or not step.checkpoint.closed):
+                continue  # 기록 자체는 작으므로 닫힌 체크포인트의 타일만 내보냄
+            # 오래된 단계를 디스크로 내보냄
+            if self._spill_tmp is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._spill_tmp = tempfile.mkdtemp(prefix="history_", dir=self.spill_dir)
+            self._spill_count += 1
+            step.spill(self._spill_tmp, "step_%06d.bin" % self._spill_count)
+            total = self.memory_bytes()
+
+    def _drop_oldest(self):
+        step = self.steps.pop(0)
+        self.index -= 1
+        self._base_meta = step.meta  # 남은 가장 오래된 상태는 버린 단계가 만든 상태
+        step.discard()
+        if step.kind == "record" and step.checkpoint.owner is step:
+            # 같은 묶음의 뒤쪽 기록을 되돌릴 때 체크포인트가 계속 필요하므로 다음 단계에 넘김
+            following = self.steps[0]
+            if following.checkpoint is step.checkpoint:
+                step.checkpoint.owner = following
+
+    def memory_report(self):
+        """단계별 메모리 사용량 목록"""
+        report = []
+        for i, step in enumerate(self.steps):
+            report.append({
+                "step": i + 1,
+                "label": step.label,
+                "kind": step.kind,
+                "tiles": len(step._payload_tiles()) if step.kind != "full" else 1,
+                "bytes": step.nbytes(),
+                "location": "memory" if step.in_memory() else "disk",
+            })
+        return report
+
+    def dump(self, store):
+        """
+        히스토리를 프로젝트 파일에 저장할 수 있는 상태(JSON 호환 dict)로 변환
+        타일 데이터는 store.tile(step, tile) -> 참조, 기록은 store.record(record) -> dict 로 넘긴다.
+        현재 상태 이미지(current())는 따로 저장해야 한다.
+        """
+        self._close_checkpoint()
+        checkpoints = []
+        numbers = {}
+        steps = []
+        for step in self.steps:
+            entry = {"kind": step.kind, "label": step.label}
+            if step.kind == "full":
+                entry["before"] = store.tile(step, step.before)
+                entry["after"] = store.tile(step, step.after)
+            elif step.kind == "tiles":
+                entry["tiles"] = [store.tile(step, t) for t in step.tiles]
+            else:
+                cp = step.checkpoint
+                if id(cp) not in numbers:
+                    numbers[id(cp)] = len(checkpoints)
+                    checkpoints.append({
+                        "tiles": [store.tile(cp.owner, t) for t in cp.tiles.values()],
+                        "records": [store.record(r) for r in cp.records],
+                    })
+                entry["checkpoint"] = numbers[id(cp)]
+                entry["position"] = step.position
+                entry["owner"] = cp.owner is step
+            steps.append(entry)
+        return {
+            "tile_size": self.tile_size,
+            "dtype": None if self.dtype is None else np.dtype(self.dtype).str,
+            "index": self.index,
+            "steps": steps,
+            "checkpoints": checkpoints,
+        }
+
+    def load(self, state, base, store):
+        """
+        dump() 로 저장한 상태와 현재 상태 이미지 base 로 히스토리를 복원
+        store.tile(ref) -> _Tile 인자, store.record(dict) -> 기록, store.mapped -> 타일 데이터를 읽을 버퍼
+        타일 데이터는 읽지 않고 위치만 기억해 두었다가 되돌릴 때 필요한 것만 읽는다.
+        """
+        self.clear()
+        self.tile_size = state["tile_size"]
+        self.dtype = np.dtype(state["dtype"]) if state["dtype"] else base.dtype
+        self._base = base.copy()
+
+        def tile(ref):
+            y, x, shape, compressed, offset, length = store.tile(ref)
+            t = _Tile(y, x, tuple(shape), None, compressed, length)
+            t.offset = offset
+            t.key = ref["key"]
+            return t
+
+        checkpoints = []
+        for c in state["checkpoints"]:
+            cp = _Checkpoint()
+            cp.closed = True
+            cp.records = [store.record(r) for r in c["records"]]
+            cp.tiles = {(t.y, t.x): t for t in map(tile, c["tiles"])}
+            checkpoints.append(cp)
+        for entry in state["steps"]:
+            kind = entry["kind"]
+            if kind == "full":
+                step = HistoryStep(kind, before=tile(entry["before"]), after=tile(entry["after"]),
+                                   label=entry["label"])
+            elif kind == "tiles":
+                step = HistoryStep(kind, tiles=[tile(t) for t in entry["tiles"]], label=entry["label"])
+            else:
+                cp = checkpoints[entry["checkpoint"]]
+                step = HistoryStep(kind, label=entry["label"], record=cp.records[entry["position"]],
+                                   checkpoint=cp, position=entry["position"])
+                if entry["owner"]:
+                    cp.owner = step
+            step.mapped = store.mapped
+            self.steps.append(step)
+        self.index = state["index"]
+
+    def summary(self):
+        base_bytes = 0 if self._base is None else self._base.nbytes
+        report = self.memory_report()
+        return {
+            "states": len(self),
+            "index": self.index,
+            "base_bytes": base_bytes,
+            "memory_bytes": self.memory_bytes(),
+            "disk_bytes": sum(r["bytes"] for r in report if r["location"] == "disk"),
+            "steps": report,
+        }
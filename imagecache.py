@@ -0,0 +1,169 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from PIL import Image
+
+import imageops
+
+
+# 이미지 파일 읽기 캐시
+# 디코딩한 이미지를 (경로, 수정 시각, 크기, 축소 배율) 로 구분해 메모리 상한 안에서 LRU 로 보관한다.
+# 같은 폴더의 앞뒤 이미지는 백그라운드 스레드에서 미리 디코딩해 두므로 이전/다음 이미지로 넘길 때 바로 열린다.
+# 미리보기만 필요하면 JPEG 의 DCT 축소 디코딩(IMREAD_REDUCED_*)으로 1/2 ~ 1/8 크기만 디코딩한다.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def image_size(path):
+    """디코딩하지 않고 파일 헤더에서 (w, h) 를 읽음 (읽을 수 없으면 None)"""
+    try:
+        with Image.open(path) as im:
+            return im.size
+    except (OSError, ValueError):
+        return None
+
+
+def preview_factor(path, max_side):
+    # 긴 변이 max_side 이상으로 남는 가장 큰 축소 배율 (1, 2, 4, 8)
+    size = image_size(path)
+    if size is None:
+        return 1
+    factor = 1
+    while factor < 8 and max(size) // (factor * 2) >= max_side:
+        factor *= 2
+    return factor
+
+
+def read_reduced(path, factor):
+    """1/factor 크기로 디코딩 (JPEG 은 디코더가 직접 축소하므로 전체 디코딩보다 훨씬 빠름)"""
+    return imageops.read_image(path, _REDUCED_FLAGS[factor])
+
+
+def read_preview(path, max_side):
+    """긴 변이 max_side 정도인 미리보기"""
+    image = read_reduced(path, preview_factor(path, max_side))
+    if image is not None and max(image.shape[:2]) > max_side * 2:
+        scale = max_side / max(image.shape[:2])
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def sibling_images(path):
+    """path 와 같은 폴더의 이미지 파일 목록 (이름순)"""
+    folder = os.path.dirname(os.path.abspath(path))
+    try:
+        names = sorted(os.listdir(folder), key=str.lower)
+    except OSError:
+        return [path]
+    return [os.path.join(folder, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def neighbour(path, step):
+    # 같은 폴더에서 step 만큼 앞/뒤의 이미지 (끝에서는 반대쪽으로 넘어감)
+    files = sibling_images(path)
+    if not files:
+        return None
+    target = os.path.abspath(path)
+    try:
+        i = [os.path.abspath(f) for f in files].index(target)
+    except ValueError:
+        return files[0]
+    return files[(i + step) % len(files)]
+
+
+class ImageCache:
+    def __init__(self, max_bytes=512 * 1024 * 1024, workers=1):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._pending = {}  # 디코딩 중인 키 -> Future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+
+    @staticmethod
+    def _key(path, factor):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return os.path.abspath(path), st.st_mtime_ns, st.st_size, factor
+
+    def contains(self, path, factor=1):
+        key = self._key(path, factor)
+        with self._lock:
+            return key in self._items
+
+    def get(self, path, factor=1, copy=True):
+        """
+        디코딩한 이미지 (읽을 수 없으면 None)
+        캐시된 배열은 읽기 전용이므로 편집할 이미지는 copy=True (기본) 로 받을 것
+        """
+        key = self._key(path, factor)
+        if key is None:
+            return None
+        with self._lock:
+            image = self._items.get(key)
+            future = self._pending.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            elif future is None:
+                self.misses += 1
+        if image is None:
+            # 미리 읽는 중이면 그 결과를 기다림 (같은 파일을 두 번 디코딩하지 않음)
+            image = future.result() if future is not None else self._load(key, path, factor)
+        if image is None:
+            return None
+        return image.copy() if copy else image
+
+    def _load(self, key, path, factor):
+        try:
+            image = read_reduced(path, factor)
+        except OSError:
+            image = None
+        with self._lock:
+            self._pending.pop(key, None)
+            if image is not None and image.nbytes <= self.max_bytes:
+                image.setflags(write=False)
+                if key not in self._items:
+                    self._items[key] = image
+                    self.nbytes += image.nbytes
+                while self.nbytes > self.max_bytes:
+                    _, old = self._items.popitem(last=False)
+                    self.nbytes -= old.nbytes
+        return image
+
+    def prefetch(self, paths, factor=1):
+        # 캐시에 없는 파일을 백그라운드에서 디코딩
+        for path in paths:
+            key = self._key(path, factor)
+            if key is None:
+                continue
+            with self._lock:
+                if key in self._items or key in self._pending:
+                    continue
+                self._pending[key] = self._pool.submit(self._load, key, path, factor)
+
+    def prefetch_neighbours(self, path, count=1):
+        paths = [neighbour(path, step) for k in range(1, count + 1) for step in (k, -k)]
+        self.prefetch([p for p in paths if p is not None and os.path.abspath(p) != os.path.abspath(path)])
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.clear()
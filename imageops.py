@@ -0,0 +1,714 @@
+import functools
+import os
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import blurs
+import docscan
+import pointops
+import poisson
+import warps
+
+
+# GUI 없이 사용할 수 있는 이미지 처리 함수 모음
+# 함수는 BGR uint8 배열을 받아 새 배열을 반환하며 입력 배열은 수정하지 않는다. 예외는 다음과 같다.
+# - out 인자가 있는 함수 (composite, flood_fill, draw_text) 는 out 을 주면 새 배열 대신 그 배열에 제자리에서 쓴다
+#   (out 에 입력 image 를 주면 입력이 바뀜).
+# - blend_mask 는 image 에 바로 그리고, masking 은 역투영 결과 bp 를 제자리에서 필터링한다.
+
+CANVAS_SIZE = (900, 700)  # 편집기 캔버스 크기 (w, h)
+
+
+def read_image(path, flags=cv2.IMREAD_COLOR):
+    # 한글 경로도 읽을 수 있도록 np.fromfile + imdecode 사용
+    data = np.fromfile(path, dtype=np.uint8)
+    return cv2.imdecode(data, flags)
+
+
+def write_image(path, image, params=None):
+    ext = "." + path.rsplit(".", 1)[-1].lower() if "." in path else ".png"
+    ok, buf = cv2.imencode(ext, image, params or [])
+    if not ok:
+        return False
+    buf.tofile(path)
+    return True
+
+
+# 블러 처리 (mode: box, gaussian, bilateral. 영역 밖 픽셀도 이웃으로 씀, blurs 참고)
+def blur(image, roi=None, ksize=15, mode="box"):
+    result = image.copy()
+    if roi is None:
+        roi = (0, 0, image.shape[1], image.shape[0])
+    x, y, w, h = roi
+    if w > 0 and h > 0:
+        result[y:y + h, x:x + w] = blurs.blur_region(image, roi, ksize, mode)
+    return result
+
+
+# 흑백변환
+def grayscale(image):
+    return pointops.run(image, [pointops.grayscale()])  # 흑백 유지 (3채널)
+
+
+# 색 반전
+def invert(image):
+    return pointops.run(image, [pointops.invert()])
+
+
+# 밝기 / 대비 / 감마 (픽셀 단위 조회 표)
+def brightness(image, value=30):
+    return pointops.run(image, [pointops.brightness(value)])
+
+
+def contrast(image, factor=1.2):
+    return pointops.run(image, [pointops.contrast(factor)])
+
+
+def gamma(image, value=1.2):
+    return pointops.run(image, [pointops.gamma(value)])
+
+
+# equalizeHist+CLAHE 자동 보정
+def auto_correction(image, size=None, progress=None):
+    # progress 를 주면 채널마다 진행률 (0 ~ 1) 로 호출 (예외를 내면 멈춤)
+    channels = cv2.split(image) if len(image.shape) == 3 else [image]
+    steps = 2 * len(channels)
+
+    def report(i):
+        if progress is not None:
+            progress(i / steps)
+
+    # 각 채널에 대해 개별적으로 equalizeHist() 적용
+    equalized = []
+    for c in channels:
+        equalized.append(cv2.equalizeHist(c))
+        report(len(equalized))
+
+    # CLAHE를 사용해 대비 조정
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    corrected = []
+    for c in equalized:
+        corrected.append(clahe.apply(c))
+        report(len(channels) + len(corrected))
+    result = cv2.merge(corrected) if len(image.shape) == 3 else corrected[0]
+
+    if size is not None:
+        result = cv2.resize(result, size, interpolation=cv2.INTER_CUBIC)
+    return result
+
+
+# 적응형 스레시홀드 (method: "mean" 또는 "gaussian")
+# 편집기의 슬라이더 미리보기는 같은 결과를 threshold.ThresholdEngine 의 캐시로 계산한다.
+ADAPTIVE_METHODS = {"mean": cv2.ADAPTIVE_THRESH_MEAN_C, "gaussian": cv2.ADAPTIVE_THRESH_GAUSSIAN_C}
+
+
+def adaptive_threshold(image, block_size=11, c=10, method="mean"):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    threshold_image = cv2.adaptiveThreshold(
+        gray, 255, ADAPTIVE_METHODS[method], cv2.THRESH_BINARY, block_size, c
+    )
+    return cv2.cvtColor(threshold_image, cv2.COLOR_GRAY2BGR)
+
+
+# 문서 원근 변환 (사각형을 찾지 못하면 None)
+# 윤곽은 축소 이미지에서 찾고 꼭짓점만 원본 해상도로 다듬는다 (docscan.py). 결과 크기는 문서 비율을 따른다.
+# quad: 이미 찾아 둔 꼭짓점 4개 (작업 그래프를 다시 계산할 때 같은 사각형을 씀)
+def perspective_transform(image, size=None, quad=None):
+    if quad is None:
+        quad = docscan.find_document(image)
+        if quad is None:
+            return None
+    # 결과 크기를 정했으면 그 크기로 바로 펼침 (펼친 뒤 다시 크기를 바꾸지 않으므로 보간은 한 번)
+    return docscan.warp(image, np.float32(quad), tuple(size) if size is not None else None)
+
+
+# 렌즈 왜곡
+# remap 테이블은 렌즈 반지름/강도/종류마다 한 번만 만들어 캐시하고,
+# 클릭한 위치를 중심으로 렌즈의 경계 사각형 영역만 remap 한다.
+# 테이블은 렌즈 중심 기준 좌표이므로 이미지 크기와 무관하게 재사용된다.
+@functools.lru_cache(maxsize=32)
+def lens_maps(radius, exp, distortion_type):
+    size = 2 * radius + 1
+
+    # 렌즈 중심 기준 -1~1로 정규화된 좌표
+    mapy, mapx = np.indices((size, size), dtype=np.float32)
+    mapx = (mapx - radius) / radius
+    mapy = (mapy - radius) / radius
+
+    # 직교좌표를 극 좌표로 변환
+    r, theta = cv2.cartToPolar(mapx, mapy)
+
+    # 렌즈 안쪽만 중심확대/축소 지수 적용
+    inside = r < 1
+    if distortion_type == "convex":  # 볼록 렌즈
+        r[inside] = r[inside] ** exp
+    elif distortion_type == "concave":  # 오목 렌즈
+        r[inside] = r[inside] ** (1 / exp)
+
+    # 극 좌표를 직교좌표로 변환 후 렌즈 영역 좌상단 기준으로 변경
+    mapx, mapy = cv2.polarToCart(r, theta)
+    mapx = mapx * radius + radius
+    mapy = mapy * radius + radius
+
+    # 고정소수점 테이블로 변환해 remap 속도를 높임
+    map1, map2 = cv2.convertMaps(mapx, mapy, cv2.CV_16SC2)
+    map1.setflags(write=False)
+    map2.setflags(write=False)
+    return map1, map2
+
+
+def default_lens_radius(image):
+    return max(1, min(image.shape[:2]) // 4)
+
+
+def lens_region(image, center_x, center_y, distortion_type, radius=None, exp=2):
+    """
+    렌즈 왜곡 결과 중 바뀌는 부분만 계산
+    반환값: (x0, y0, patch) - patch 는 image[y0:y0+h, x0:x0+w] 자리에 들어갈 결과 (영역이 없으면 None)
+    """
+    h, w = image.shape[:2]
+    if radius is None:
+        radius = default_lens_radius(image)
+    radius = int(radius)
+    center_x, center_y = int(center_x), int(center_y)
+
+    # 렌즈 경계 사각형 (이미지 밖은 잘라냄)
+    x0, y0 = max(0, center_x - radius), max(0, center_y - radius)
+    x1, y1 = min(w, center_x + radius + 1), min(h, center_y + radius + 1)
+    if x1 <= x0 or y1 <= y0:
+        return x0, y0, None
+
+    # 렌즈 영역을 잘라내고, 이미지 경계에 걸리면 가장자리 픽셀로 채움
+    src = image[y0:y1, x0:x1]
+    left, top = x0 - (center_x - radius), y0 - (center_y - radius)
+    right, bottom = (center_x + radius + 1) - x1, (center_y + radius + 1) - y1
+    if left or top or right or bottom:
+        src = cv2.copyMakeBorder(src, top, bottom, left, right, cv2.BORDER_REPLICATE)
+
+    map1, map2 = lens_maps(radius, exp, distortion_type)
+    distorted = cv2.remap(src, map1, map2, cv2.INTER_LINEAR)
+    patch = distorted[top:top + (y1 - y0), left:left + (x1 - x0)]
+    return x0, y0, patch
+
+
+def lens_distortion(image, center_x, center_y, distortion_type, radius=None, exp=2):
+    result = image.copy()
+    x0, y0, patch = lens_region(image, center_x, center_y, distortion_type, radius, exp)
+    if patch is not None:
+        result[y0:y0 + patch.shape[0], x0:x0 + patch.shape[1]] = patch
+    return result
+
+
+# 회전
+# 90도 단위 회전과 뒤집기는 픽셀을 옮기기만 하므로 손실이 없다.
+# 임의 각도는 한 번만 보간하며, expand 를 주면 잘리는 모서리가 없도록 캔버스를 회전한 이미지 크기로 넓힌다.
+def rotate90(image, turns=1):
+    """반시계 방향으로 90도 * turns 회전 (손실 없음)"""
+    turns %= 4
+    if turns == 0:
+        return image.copy()
+    code = {1: cv2.ROTATE_90_COUNTERCLOCKWISE, 2: cv2.ROTATE_180, 3: cv2.ROTATE_90_CLOCKWISE}[turns]
+    return cv2.rotate(image, code)
+
+
+def flip(image, axis="horizontal"):
+    """좌우 (horizontal) 또는 상하 (vertical) 뒤집기 (손실 없음)"""
+    if axis not in ("horizontal", "vertical"):
+        raise ValueError(f"알 수 없는 방향: {axis}")
+    return cv2.flip(image, 1 if axis == "horizontal" else 0)
+
+
+def rotation_matrix(shape, angle, expand=False):
+    """rotate() 가 쓰는 2x3 행렬과 결과 크기 (w, h)"""
+    rows, cols = shape[:2]
+    if not expand:
+        return cv2.getRotationMatrix2D((cols // 2, rows // 2), angle, 1.0), (cols, rows)
+    # 픽셀 중심 기준으로 돌린 뒤 넓힌 캔버스의 가운데로 옮김
+    center = ((cols - 1) / 2, (rows - 1) / 2)
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    width = int(np.ceil(cols * cos + rows * sin - 1e-2))
+    height = int(np.ceil(cols * sin + rows * cos - 1e-2))
+    matrix[0, 2] += (width - 1) / 2 - center[0]
+    matrix[1, 2] += (height - 1) / 2 - center[1]
+    return matrix, (width, height)
+
+
+def rotate(image, angle, expand=False, interpolation=cv2.INTER_CUBIC):
+    """
+    반시계 방향으로 angle 도 회전. 빈 곳은 흰색
+    expand=False 면 원래 크기 안에서 돌려 모서리가 잘리고, True 면 회전한 이미지 전체가 들어가도록 캔버스를 넓힌다.
+    """
+    if expand and angle % 90 == 0:
+        return rotate90(image, int(angle // 90))
+    matrix, size = rotation_matrix(image.shape, angle, expand)
+    return cv2.warpAffine(image, matrix, size, borderValue=(255, 255, 255), flags=interpolation)
+
+
+# 역투영
+def masking(bp, image):
+    disc = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+    cv2.filter2D(bp, -1, disc, bp)
+    _, mask = cv2.threshold(bp, 1, 255, cv2.THRESH_BINARY)
+    return cv2.bitwise_and(image, image, mask=mask)
+
+
+def roi_histogram(image, roi):
+    x, y, w, h = roi
+    hsv_roi = cv2.cvtColor(image[y:y + h, x:x + w], cv2.COLOR_BGR2HSV)
+    # H, S 채널에 대한 히스토그램 계산
+    return cv2.calcHist([hsv_roi], [0, 1], None, [180, 256], [0, 180, 0, 256])
+
+
+def backproject_table(hist_roi, hist_img):
+    """
+    back_project_manual 의 비율 계산, 1 로 자르기, min-max 정규화를 (H, S) -> uint8 표 하나로 미리 계산
+    정규화의 최소/최대는 이미지에 실제로 있는 (H, S) 칸에서만 구한다.
+    """
+    rate = np.minimum(hist_roi / (hist_img + 1), 1).astype(np.float32)
+    present = hist_img > 0
+    if not present.any():
+        return np.zeros((180, 256), np.uint8)
+    mn, mx = float(rate[present].min()), float(rate[present].max())
+    scale = 255.0 / (mx - mn) if mx > mn else 0.0
+    table = (rate.astype(np.float64) * scale - mn * scale).astype(np.float32)
+    return np.clip(table, 0, 255).astype(np.uint8)
+
+
+def hs_index(hsv_img):
+    # (H, S) 쌍을 표 인덱스 h * 256 + s 하나로 합침
+    index = hsv_img[..., 0].astype(np.uint16)
+    index <<= 8
+    index |= hsv_img[..., 1]
+    return index
+
+
+def back_project_manual(hist_roi, hsv_img, image):
+    hist_img = cv2.calcHist([hsv_img], [0, 1], None, [180, 256], [0, 180, 0, 256])
+    # 비율 -> 1 로 자르기 -> 정규화를 표 하나로 묶어 픽셀마다 한 번만 조회
+    table = backproject_table(hist_roi, hist_img)
+    bp = np.take(table.ravel(), hs_index(hsv_img))
+    return masking(bp, image)
+
+
+def back_project_cv(hist_roi, hsv_img, image):
+    bp = cv2.calcBackProject([hsv_img], [0, 1], hist_roi, [0, 180, 0, 256], 1)
+    return masking(bp, image)
+
+
+def reprojection(image, roi):
+    hist_roi = roi_histogram(image, roi)
+    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    return back_project_manual(hist_roi, hsv_image, image)
+
+
+class BackProjector:
+    """
+    같은 이미지에 여러 ROI 로 역투영할 때 쓰는 캐시
+    HSV 변환, (H, S) 인덱스, 전체 이미지 히스토그램은 이미지 버전마다 한 번만 계산하고
+    ROI 마다 ROI 히스토그램과 조회 표만 새로 만든다.
+    """
+
+    def __init__(self):
+        self._key = None
+        self.hsv = None
+        self.index = None
+        self.hist = None
+
+    def prepare(self, image, version):
+        key = (version, image.shape)
+        if key == self._key:
+            return
+        self.hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        self.index = hs_index(self.hsv)
+        self.hist = cv2.calcHist([self.hsv], [0, 1], None, [180, 256], [0, 180, 0, 256])
+        self._key = key
+
+    def roi_histogram(self, roi):
+        x, y, w, h = roi
+        return cv2.calcHist([self.hsv[y:y + h, x:x + w]], [0, 1], None, [180, 256], [0, 180, 0, 256])
+
+    def project(self, image, version, roi):
+        """reprojection(image, roi) 와 같은 결과"""
+        self.prepare(image, version)
+        table = backproject_table(self.roi_histogram(roi), self.hist)
+        return masking(np.take(table.ravel(), self.index), image)
+
+    def clear(self):
+        self._key = None
+        self.hsv = self.index = self.hist = None
+
+
+# 이미지 합성 (푸아송 합성)
+# 합성할 이미지는 선택한 ROI 안에 비율을 유지해 맞추고, 그 사각형에 경계 1px 을 더한 조각에서만 방정식을 푼다.
+# 풀이는 poisson.py 의 DST 풀이를 쓰며 결과는 cv2.seamlessClone(NORMAL_CLONE) 과 같은 방식이다.
+def fit_to_roi(src, size):
+    """src 를 size (w, h) 안에 들어가도록 비율을 유지해 크기 조정"""
+    w, h = size
+    sh, sw = src.shape[:2]
+    scale = min(w / sw, h / sh)
+    fw, fh = max(1, min(w, int(sw * scale))), max(1, min(h, int(sh * scale)))
+    if (fw, fh) == (sw, sh):
+        return src
+    return cv2.resize(src, (fw, fh), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+
+
+def composite_patch(dst, src, roi, progress=None):
+    """
+    src 를 roi 가운데에 맞춰 합성한 조각과 그 위치 (x, y, w, h). ROI 가 너무 작으면 (None, 빈 사각형)
+    dst 는 바꾸지 않으며, 반환한 조각을 그 위치에 붙이면 전체를 합성한 것과 같다.
+    progress 는 poisson.clone 에 넘긴다.
+    """
+    x, y, w, h = _clip_rect(dst.shape, *roi)
+    if w < 3 or h < 3:
+        return None, (x, y, 0, 0)
+    src = fit_to_roi(src, (w, h))
+    sh, sw = src.shape[:2]
+    # FFT 에 빠른 크기가 되도록 가운데만 남기고 가장자리를 조금 잘라냄 (변마다 최대 3%)
+    fw, fh = poisson.fast_length(sw + 2) - 2, poisson.fast_length(sh + 2) - 2
+    ox, oy = (sw - fw) // 2, (sh - fh) // 2
+    src = src[oy:oy + fh, ox:ox + fw]
+    px, py = x + (w - fw) // 2, y + (h - fh) // 2
+    ih, iw = dst.shape[:2]
+    x0, y0 = max(0, px - 1), max(0, py - 1)
+    x1, y1 = min(iw, px + fw + 1), min(ih, py + fh + 1)
+    crop = dst[y0:y1, x0:x1]
+    guide = crop.copy()
+    guide[py - y0:py - y0 + fh, px - x0:px - x0 + fw] = src
+    return poisson.clone(guide, crop, progress), (x0, y0, x1 - x0, y1 - y0)
+
+
+def composite(dst, src, roi, out=None):
+    """composite_patch 를 붙인 (결과 이미지, 바뀐 영역). out 을 주면 그 배열에 제자리에서 붙임"""
+    result = dst.copy() if out is None else out
+    patch, rect = composite_patch(dst, src, roi)
+    if patch is not None:
+        x, y, w, h = rect
+        result[y:y + h, x:x + w] = patch
+    return result, rect
+
+
+# 페인트 (floodFill). out 을 주면 그 배열을 제자리에서 채운다.
+# 반환값: (결과 이미지, 채워진 영역 사각형 (x, y, w, h))
+def flood_fill(image, seed, color, lo_diff=(3, 3, 3), up_diff=(5, 5, 5), out=None):
+    result = image.copy() if out is None else out
+    h, w = result.shape[:2]
+    mask = np.zeros((h + 2, w + 2), np.uint8)
+    _, _, _, rect = cv2.floodFill(result, mask, seed, color, loDiff=lo_diff, upDiff=up_diff)
+    return result, rect
+
+
+def has_hangul(text):
+    return any('\uac00' <= char <= '\ud7af' for char in text)
+
+
+# 한글을 그릴 수 있는 글꼴 (운영체제별 기본 위치). 환경 변수 IMAGE_EDITOR_FONT 로 직접 지정할 수도 있다.
+FONT_CANDIDATES = [
+    os.path.join(os.environ.get("WINDIR", "C:/Windows"), "Fonts", "malgun.ttf"),
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    "/System/Library/Fonts/Supplemental/AppleGothic.ttf",
+    "/Library/Fonts/AppleGothic.ttf",
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+]
+FONT_DIRS = [
+    os.path.join(os.environ.get("WINDIR", "C:/Windows"), "Fonts"),
+    os.path.expanduser("~/Library/Fonts"), "/Library/Fonts", "/System/Library/Fonts",
+    os.path.expanduser("~/.local/share/fonts"), os.path.expanduser("~/.fonts"), "/usr/share/fonts",
+    "/usr/local/share/fonts",
+]
+_FONT_NAMES = ("malgun", "applesdgothicneo", "applegothic", "nanumgothic", "notosanscjk", "notosanskr")
+
+
+@functools.lru_cache(maxsize=1)
+def find_font():
+    """한글 글꼴 파일 경로 (찾지 못하면 None). 글꼴 폴더 검색은 처음 한 번만 한다."""
+    path = os.environ.get("IMAGE_EDITOR_FONT")
+    if path and os.path.isfile(path):
+        return path
+    for path in FONT_CANDIDATES:
+        if os.path.isfile(path):
+            return path
+    for folder in FONT_DIRS:
+        if not os.path.isdir(folder):
+            continue
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                lower = name.lower()
+                if lower.endswith((".ttf", ".ttc", ".otf")) and any(n in lower for n in _FONT_NAMES):
+                    return os.path.join(root, name)
+    return None
+
+
+@functools.lru_cache(maxsize=32)
+def load_font(font_path, font_size):
+    # 글꼴 파일은 (경로, 크기) 별로 한 번만 읽음
+    if font_path is not None:
+        try:
+            return ImageFont.truetype(font_path, font_size)
+        except OSError:
+            pass
+    return ImageFont.load_default(font_size)
+
+
+@functools.lru_cache(maxsize=256)
+def text_mask(text, font_path, font_size):
+    """
+    글자열을 그린 알파 마스크 (uint8, 0~255) 와 그리기 위치 기준의 좌상단 오프셋 (dx, dy)
+    색과 무관하므로 (글꼴, 크기, 글자열) 별로 캐시한다.
+    """
+    font = load_font(font_path, font_size)
+    left, top, right, bottom = font.getbbox(text)
+    canvas = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+    ImageDraw.Draw(canvas).text((-left, -top), text, font=font, fill=255)
+    mask = np.asarray(canvas)
+    mask.flags.writeable = False
+    return mask, (left, top)
+
+
+def _clip_rect(shape, x, y, w, h):
+    ih, iw = shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(iw, x + w), min(ih, y + h)
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+
+def blend_mask(image, mask, position, color):
+    """알파 마스크를 position(마스크 좌상단) 에 color 로 합성 (겹치는 영역만 계산). 바뀐 영역을 반환"""
+    mh, mw = mask.shape
+    x, y, w, h = _clip_rect(image.shape, position[0], position[1], mw, mh)
+    if w == 0 or h == 0:
+        return x, y, 0, 0
+    mx, my = x - position[0], y - position[1]
+    alpha = mask[my:my + h, mx:mx + w]
+    roi = image[y:y + h, x:x + w]
+    a = alpha.astype(np.uint16)
+    if roi.ndim == 3:
+        a = a[..., None]
+        ink = np.array(color[:roi.shape[2]], np.uint16)
+    else:
+        ink = np.uint16(color[0])
+    # roi * (255 - a) / 255 + color * a / 255 를 반올림 (PIL 의 합성과 같은 정수 연산)
+    t = roi * (255 - a) + ink * a + 128
+    roi[...] = (t + (t >> 8)) >> 8
+    return x, y, w, h
+
+
+# 텍스트 삽입 (한글은 PIL 글꼴, 그 외는 cv2.putText). color 는 BGR
+# 글자가 들어가는 사각형 안에서만 그리므로 이미지 크기와 관계없이 비용이 같다.
+# out 을 주면 그 배열에 제자리에서 그린다. 반환값: (결과 이미지, 바뀐 영역 사각형 (x, y, w, h))
+def draw_text(image, text, position, font_size, color, font_face=cv2.FONT_HERSHEY_SIMPLEX,
+              thickness=2, font_path=None, out=None):
+    result = image.copy() if out is None else out
+    x, y = position
+    if has_hangul(text):
+        mask, (dx, dy) = text_mask(text, font_path or find_font(), font_size)
+        return result, blend_mask(result, mask, (x + dx, y + dy), tuple(int(c) for c in color))
+
+    font_scale = font_size / 20  # 글꼴 크기 비율에 맞게 font_scale 계산
+    (tw, th), baseline = cv2.getTextSize(text, font_face, font_scale, thickness)
+    # 선 굵기와 안티에일리어싱 여유에 더해, 기울어진 획이나 필기체 꼬리가 getTextSize 상자 밖으로 나가는 만큼 (글자 높이에 비례)
+    pad = thickness + 2 + th // 4
+    rect = _clip_rect(result.shape, x - pad, y - th - pad, tw + 2 * pad, th + baseline + 2 * pad)
+    rx, ry, rw, rh = rect
+    if rw > 0 and rh > 0:
+        # 사각형 부분만 잘라 그 안에 그림 (원점도 사각형 기준으로 옮김)
+        cv2.putText(result[ry:ry + rh, rx:rx + rw], text, (x - rx, y - ry), font_face, font_scale, color,
+                    thickness, cv2.LINE_AA)
+    return result, rect
+
+
+def warp_chain(image, chain):
+    """기하 변환 목록 [(이름, 파라미터), ...] 을 한 번의 보간으로 적용 (편집기에서 이어서 적용한 회전/원근 변환을 합친 작업)"""
+    return apply_chain(image, chain)
+
+
+# 배치 처리에서 이름으로 호출할 수 있는 작업 목록
+# 각 항목은 (함수, 파라미터 기본값) 이며 이미지에 따라 정해지는 값은 None
+OPERATIONS = {
+    "blur": (blur, {"ksize": 15, "mode": "box"}),
+    "grayscale": (grayscale, {}),
+    "invert": (invert, {}),
+    "brightness": (brightness, {"value": 30}),
+    "contrast": (contrast, {"factor": 1.2}),
+    "gamma": (gamma, {"value": 1.2}),
+    "auto_correction": (auto_correction, {}),
+    "threshold": (adaptive_threshold, {"block_size": 11, "c": 10, "method": "mean"}),
+    "perspective": (perspective_transform, {}),
+    "lens": (lens_distortion, {"center_x": None, "center_y": None, "distortion_type": "convex",
+                               "radius": None, "exp": 2}),
+    "rotate": (rotate, {"angle": 45, "expand": 0}),
+    "rotate90": (rotate90, {"turns": 1}),
+    "flip": (flip, {"axis": "horizontal"}),
+}
+
+# 작업 그래프에만 기록되는 작업 (배치 처리에서 이름으로 고를 수 없음)
+# warp: 편집기에서 이어서 적용한 기하 변환을 합친 작업. 파라미터 chain 은 편집기가 채운다.
+INTERNAL_OPERATIONS = {
+    "warp": warp_chain,
+}
+
+
+def parse_operation(spec):
+    """
+    "이름" 또는 "이름:키=값,키=값" 형식의 작업 지정 문자열을 (이름, 파라미터) 로 변환
+    예) "blur:ksize=25", "rotate:angle=-90", "lens:distortion_type=concave"
+    """
+    name, _, arg_text = spec.partition(":")
+    name = name.strip()
+    if name not in OPERATIONS:
+        raise ValueError(f"알 수 없는 작업: {name} (사용 가능: {', '.join(OPERATIONS)})")
+    params = dict(OPERATIONS[name][1])
+    for item in filter(None, arg_text.split(",")):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in params:
+            raise ValueError(f"{name} 작업에 없는 파라미터: {key}")
+        value = value.strip()
+        try:
+            params[key] = int(value)
+        except ValueError:
+            try:
+                params[key] = float(value)
+            except ValueError:
+                params[key] = value
+    return name, params
+
+
+def apply_operation(image, name, params):
+    func = OPERATIONS[name][0] if name in OPERATIONS else INTERNAL_OPERATIONS[name]
+    params = dict(params)
+    if name == "lens":
+        h, w = image.shape[:2]
+        if params["center_x"] is None:
+            params["center_x"] = w // 2
+        if params["center_y"] is None:
+            params["center_y"] = h // 2
+    result = func(image, **params)
+    # 원근 변환에서 사각형을 찾지 못한 경우 원본 유지
+    return image if result is None else result
+
+
+# 입력 이미지에서 찾아 둔 값 (작업 이름 -> 파라미터 이름). 입력이 바뀌면 맞지 않으므로 버리고 다시 찾는다.
+DETECTED_PARAMS = {"perspective": ("quad",)}
+
+
+def drop_detected(name, params):
+    """입력에서 찾아 둔 값을 뺀 파라미터 (합친 기하 변환은 그 안의 작업마다)"""
+    if name == "warp":
+        return dict(params, chain=[(n, drop_detected(n, p)) for n, p in params["chain"]])
+    keys = DETECTED_PARAMS.get(name, ())
+    return {k: v for k, v in params.items() if k not in keys}
+
+
+# 픽셀 단위 작업 -> pointops 단계. apply_chain 에서 연속된 작업을 한 번에 처리하는 데 사용
+POINT_OPERATIONS = {
+    "grayscale": lambda p: pointops.grayscale(),
+    "invert": lambda p: pointops.invert(),
+    "brightness": lambda p: pointops.brightness(p["value"]),
+    "contrast": lambda p: pointops.contrast(p["factor"]),
+    "gamma": lambda p: pointops.gamma(p["value"]),
+}
+
+
+# 기하 변환 작업 -> warps 단계 (입력 이미지 크기로 만듦). apply_chain 에서 연속된 기하 변환을 한 번의 보간으로 합치는 데 사용
+# 사각형을 찾아야 하는 원근 변환(quad 없음)은 입력 픽셀이 필요하므로 합치지 않는다.
+def _rotate_stage(p, shape):
+    if p.get("expand") and p["angle"] % 90 == 0:
+        return _rotate90_stage({"turns": int(p["angle"] // 90)}, shape)
+    matrix, size = rotation_matrix(shape, p["angle"], p.get("expand"))
+    return warps.Homography.forward(matrix, size, (255, 255, 255), cv2.INTER_CUBIC)
+
+
+def _rotate90_stage(p, shape):
+    h, w = shape[:2]
+    turns = p["turns"] % 4
+    # 입력 -> 출력 좌표 (cv2.rotate 와 같은 픽셀 배치)
+    matrix = {0: [[1, 0, 0], [0, 1, 0]],
+              1: [[0, 1, 0], [-1, 0, w - 1]],
+              2: [[-1, 0, w - 1], [0, -1, h - 1]],
+              3: [[0, -1, h - 1], [1, 0, 0]]}[turns]
+    size = (w, h) if turns % 2 == 0 else (h, w)
+    return warps.Homography.forward(matrix, size, interpolation=None)
+
+
+def _flip_stage(p, shape):
+    h, w = shape[:2]
+    matrix = [[-1, 0, w - 1], [0, 1, 0]] if p["axis"] == "horizontal" else [[1, 0, 0], [0, -1, h - 1]]
+    return warps.Homography.forward(matrix, (w, h), interpolation=None)
+
+
+def _perspective_stage(p, shape):
+    if p.get("quad") is None:
+        return None
+    matrix, size = docscan.warp_matrix(np.float32(p["quad"]), tuple(p["size"]) if p.get("size") else None)
+    return warps.Homography.forward(matrix, size, (0, 0, 0))
+
+
+def _lens_stage(p, shape):
+    h, w = shape[:2]
+    cx = w // 2 if p.get("center_x") is None else p["center_x"]
+    cy = h // 2 if p.get("center_y") is None else p["center_y"]
+    radius = max(1, min(h, w) // 4) if p.get("radius") is None else p["radius"]  # default_lens_radius 와 같음
+    return warps.Lens((cx, cy), radius, p.get("exp", 2), p.get("distortion_type", "convex"), (w, h))
+
+
+GEOMETRIC_OPERATIONS = {
+    "rotate": _rotate_stage,
+    "rotate90": _rotate90_stage,
+    "flip": _flip_stage,
+    "perspective": _perspective_stage,
+    "lens": _lens_stage,
+}
+
+
+def geometric_stage(name, params, shape):
+    # 합칠 수 있는 기하 변환이면 warps 단계, 아니면 None
+    make = GEOMETRIC_OPERATIONS.get(name)
+    return make(params, shape) if make is not None else None
+
+
+def apply_chain(image, chain, progress=None):
+    """
+    chain 의 작업을 차례로 적용
+    연속된 픽셀 단위 작업은 pointops 로, 연속된 기하 변환은 warps 로 합쳐 한 번에 적용한다 (중간 이미지를 만들지 않음).
+    progress 를 주면 합친 기하 변환의 띠마다 진행률 (0 ~ 1) 로 호출한다 (예외를 내면 멈춤).
+    """
+    pending = []  # 픽셀 단위 작업
+    stages, ops = [], []  # 기하 변환 단계와 그 작업 (단계는 앞 단계의 출력 크기로 만듦)
+    shape = image.shape
+
+    def flush():
+        nonlocal image, pending, stages, ops
+        if pending:
+            image = pointops.run(image, pending)
+        elif len(ops) == 1:
+            # 하나뿐이면 그 작업을 그대로 (90도 회전/뒤집기의 무손실 경로, 렌즈의 부분 계산)
+            image = apply_operation(image, *ops[0])
+        elif ops:
+            image = warps.compose(stages, image.shape).apply(image, progress=progress)
+        pending, stages, ops = [], [], []
+
+    for name, params in chain:
+        if name in POINT_OPERATIONS:
+            if ops:
+                flush()
+            pending.append(POINT_OPERATIONS[name](params))
+            continue
+        if pending:
+            flush()
+        stage = geometric_stage(name, params, shape if ops else image.shape)
+        if stage is None:
+            flush()
+            image = apply_operation(image, name, params)
+            continue
+        stages.append(stage)
+        ops.append((name, params))
+        shape = (stage.size[1], stage.size[0]) + image.shape[2:]
+    flush()
+    return image
+
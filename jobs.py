@@ -0,0 +1,142 @@
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QCoreApplication, pyqtSignal
+
+
+# 무거운 작업을 UI 스레드 밖에서 실행하는 작업 스케줄러
+# OpenCV 함수는 실행 중 GIL 을 놓으므로 작업 스레드에서 돌려도 화면이 멈추지 않고,
+# 이미지 배열을 다른 프로세스로 복사해 넘길 필요도 없다.
+# 작업이 도는 동안 이미지를 바꾸는 다른 편집은 defer() 로 미뤄 두었다가 작업 결과가 반영된 뒤 순서대로 실행한다.
+# 결과는 Qt 시그널로 UI 스레드에 전달되므로 이미지 교체와 히스토리 기록이 다른 이벤트 없이 한 번에 이루어진다.
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, label, scheduler, on_done=None, on_error=None):
+        self.id = job_id
+        self.label = label
+        self.on_done = on_done  # 결과를 받는 함수 (UI 스레드에서 호출)
+        self.on_error = on_error
+        self.progress = None  # 0 ~ 1 (알 수 없으면 None)
+        self.cancelled = False
+        self.started_at = time.perf_counter()
+        self._scheduler = scheduler
+
+    def cancel(self):
+        # 작업 함수는 다음 report() 에서 멈추고, 이미 끝났더라도 결과는 버린다.
+        self.cancelled = True
+
+    def report(self, fraction):
+        """작업 함수가 단계마다 호출해 진행률을 알림. 취소된 작업이면 JobCancelled 로 멈춘다."""
+        if self.cancelled:
+            raise JobCancelled()
+        self.progress = float(fraction)
+        self._scheduler._progress.emit(self, self.progress)
+
+
+class JobScheduler(QObject):
+    started = pyqtSignal(object)  # Job
+    progress = pyqtSignal(object, float)  # Job, 진행률
+    finished = pyqtSignal(object, str)  # Job, "done" / "cancelled" / "error"
+
+    _progress = pyqtSignal(object, float)
+    _done = pyqtSignal(object, object, object)  # Job, 결과, 예외
+
+    def __init__(self, parent=None, max_workers=1):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="editor-job")
+        self._ids = itertools.count(1)
+        self._deferred = deque()
+        self.active = None
+        # 작업 스레드에서 보낸 시그널은 UI 스레드의 이벤트 루프에서 처리됨
+        self._progress.connect(self._on_progress)
+        self._done.connect(self._on_done)
+
+    def busy(self):
+        return self.active is not None
+
+    def submit(self, label, func, *args, on_done=None, on_error=None):
+        """
+        func(job, *args) 를 작업 스레드에서 실행
+        끝나면 on_done(결과) 를, 예외가 나면 on_error(예외) 를 UI 스레드에서 호출한다.
+        작업은 한 번에 하나만 실행된다 (다음 작업은 defer 로 미룰 것).
+        """
+        job = Job(next(self._ids), label, self, on_done, on_error)
+        self.active = job
+        self.started.emit(job)
+        self._pool.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        result = error = None
+        try:
+            job.report(0)
+            result = func(job, *args)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            error = e
+        self._done.emit(job, result, error)
+
+    def _on_progress(self, job, fraction):
+        if job is self.active:
+            self.progress.emit(job, fraction)
+
+    def _on_done(self, job, result, error):
+        self.active = None
+        if job.cancelled:
+            status = "cancelled"
+        elif error is not None:
+            status = "error"
+            if job.on_error is not None:
+                job.on_error(error)
+        else:
+            status = "done"
+            if job.on_done is not None:
+                job.on_done(result)
+        self.finished.emit(job, status)
+        self._run_deferred()
+
+    def cancel(self):
+        if self.active is not None:
+            self.active.cancel()
+
+    def defer(self, func, *args):
+        # 실행 중인 작업이 없으면 바로 실행하고, 있으면 작업이 끝난 뒤에 실행
+        if self.busy():
+            self._deferred.append((func, args))
+            return False
+        func(*args)
+        return True
+
+    def _run_deferred(self):
+        # 미뤄 둔 편집을 순서대로 실행 (그중 하나가 새 작업을 시작하면 나머지는 다시 기다림)
+        while self._deferred and not self.busy():
+            func, args = self._deferred.popleft()
+            func(*args)
+
+    def pending(self):
+        return len(self._deferred)
+
+    def wait(self, timeout=None):
+        # 실행 중인 작업과 미뤄 둔 편집이 모두 끝날 때까지 이벤트를 처리하며 기다림
+        start = time.perf_counter()
+        while self.busy():
+            QCoreApplication.processEvents()
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def shutdown(self):
+        self._deferred.clear()
+        self.cancel()
+        self._pool.shutdown(wait=True)
+        # 작업 스레드가 마지막으로 보낸 결과 시그널을 처리 (취소된 작업이므로 결과는 버려짐)
+        QCoreApplication.processEvents()
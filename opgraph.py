@@ -0,0 +1,209 @@
+import itertools
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+import imageops
+
+
+# 비파괴 편집용 작업 그래프
+# 불러온 원본(source) 위에 파라미터가 있는 작업 노드를 이어 붙여 편집 내용을 기록한다.
+# 노드 결과는 필요할 때만 계산(lazy)하고 노드마다 캐시하므로,
+# 앞쪽 노드의 파라미터를 바꾸면 그 노드와 뒤쪽 노드만 다시 계산된다.
+
+_ids = itertools.count(1)
+
+
+def _freeze(value):
+    # 캐시 키에 쓸 수 있도록 파라미터 값을 해시 가능한 형태로 변환
+    if isinstance(value, np.ndarray):
+        return ("array", id(value), value.shape)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class OpNode:
+    def __init__(self, op, params=None, parent=None):
+        self.id = next(_ids)
+        self.op = op  # "source", "patch", "replace", "record" 또는 imageops.OPERATIONS / INTERNAL_OPERATIONS 의 이름
+        self.params = dict(params or {})
+        self.parent = parent
+        self.enabled = True
+
+    def own_key(self, parent_key):
+        return hash((self.op, _freeze(self.params), self.enabled, parent_key))
+
+    def key(self):
+        """노드 결과를 구분하는 키 (자신과 모든 상위 노드의 파라미터로 결정)"""
+        return chain_keys(self.chain())[-1]
+
+    def chain(self):
+        # source 부터 자신까지의 노드 목록
+        nodes = []
+        node = self
+        while node is not None:
+            nodes.append(node)
+            node = node.parent
+        return nodes[::-1]
+
+    def describe(self):
+        if self.op in ("patch", "replace", "record"):
+            return self.params.get("label") or self.op
+        shown = {k: v for k, v in self.params.items() if not isinstance(v, np.ndarray)}
+        text = self.op
+        if shown:
+            text += " (" + ", ".join(f"{k}={v}" for k, v in shown.items()) + ")"
+        if not self.enabled:
+            text += " [끔]"
+        return text
+
+
+def chain_keys(chain):
+    # source 부터 순서대로 누적해 각 노드의 키를 계산
+    keys = []
+    parent_key = None
+    for node in chain:
+        parent_key = node.own_key(parent_key)
+        keys.append(parent_key)
+    return keys
+
+
+class ResultCache:
+    """메모리 상한이 있는 LRU 결과 캐시"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if key in self._items:
+            self.nbytes -= self._items.pop(key).nbytes
+        if value.nbytes > self.max_bytes:
+            return
+        value.setflags(write=False)
+        self._items[key] = value
+        self.nbytes += value.nbytes
+        while self.nbytes > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self.nbytes -= old.nbytes
+
+    def clear(self):
+        self._items.clear()
+        self.nbytes = 0
+
+
+def pack_patch(image, changes):
+    """
+    바뀐 픽셀만 담은 patch 파라미터를 만든다.
+    changes: [(y, x, mask), ...] (history.TileHistory.changed_pixels 결과)
+    """
+    parts = []
+    for y, x, mask in changes:
+        h, w = mask.shape
+        values = image[y:y + h, x:x + w][mask]
+        parts.append((y, x, mask.shape,
+                      zlib.compress(np.packbits(mask).tobytes(), 1),
+                      zlib.compress(values.tobytes(), 1)))
+    return parts
+
+
+def apply_patch(image, parts):
+    result = image.copy()
+    ih, iw = result.shape[:2]
+    for y, x, shape, mask_data, value_data in parts:
+        h, w = shape
+        if y + h > ih or x + w > iw:
+            continue  # 앞쪽 작업으로 크기가 바뀌어 들어갈 자리가 없는 조각은 건너뜀
+        mask = np.unpackbits(np.frombuffer(zlib.decompress(mask_data), np.uint8), count=h * w)
+        mask = mask.reshape(shape).astype(bool)
+        values = np.frombuffer(zlib.decompress(value_data), dtype=result.dtype)
+        region = result[y:y + h, x:x + w]
+        region[mask] = values.reshape((-1,) + result.shape[2:])
+    return result
+
+
+class OpGraph:
+    def __init__(self, source, cache_bytes=512 * 1024 * 1024):
+        source = source.copy()
+        source.setflags(write=False)
+        self.source = OpNode("source", {"image": source})
+        self.cache = ResultCache(cache_bytes)
+
+    def add(self, op, params, parent, result=None):
+        """parent 뒤에 작업 노드를 추가. result 를 주면 계산 없이 캐시에 넣어둔다."""
+        node = OpNode(op, params, parent)
+        if result is not None:
+            self.cache.put(node.key(), result.copy())
+        return node
+
+    def branch(self, head, target, enabled=None, **params):
+        """
+        target 노드의 파라미터를 바꾼 새 가지를 만들고 새 head 를 반환
+        기존 노드는 그대로 두므로 이전 상태(되돌리기)와 target 위쪽의 캐시가 그대로 유지되고,
+        target 부터 head 까지만 새 노드가 되어 다시 계산된다.
+        입력에서 찾아 둔 파라미터는 그 입력에 대한 캐시이므로 target 아래 노드에서는 버린다.
+        """
+        chain = head.chain()
+        index = chain.index(target)
+        parent = target.parent
+        for i, node in enumerate(chain[index:]):
+            # target 아래 노드는 입력이 바뀌므로 이전 입력에서 찾아 둔 값(문서 꼭짓점 등)을 버리고 다시 찾게 함
+            kept = node.params if i == 0 else imageops.drop_detected(node.op, node.params)
+            clone = OpNode(node.op, kept, parent)
+            clone.enabled = node.enabled
+            if i == 0:
+                clone.params.update(params)
+                if enabled is not None:
+                    clone.enabled = enabled
+            parent = clone
+        return parent
+
+    def _compute(self, node, image):
+        if node.op == "source":
+            return node.params["image"]
+        if not node.enabled:
+            return image
+        if node.op == "patch":
+            return apply_patch(image, node.params["parts"])
+        if node.op == "replace":
+            return node.params["image"]
+        if node.op == "record":
+            # 획처럼 다시 그릴 수 있는 편집 기록
+            result = image.copy()
+            node.params["record"].apply(result)
+            return result
+        params = {k: v for k, v in node.params.items() if k != "label"}
+        return imageops.apply_operation(image, node.op, params)
+
+    def evaluate(self, node):
+        """node 의 결과 (읽기 전용 배열). 캐시된 가장 가까운 상위 노드부터 계산한다."""
+        chain = node.chain()
+        keys = chain_keys(chain)
+        start = 0
+        image = None
+        for i in range(len(chain) - 1, -1, -1):
+            cached = self.cache.get(keys[i])
+            if cached is not None:
+                image, start = cached, i + 1
+                break
+        for n, key in zip(chain[start:], keys[start:]):
+            image = self._compute(n, image)
+            if n.op != "source":
+                self.cache.put(key, image)
+        return image
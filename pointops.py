@@ -0,0 +1,176 @@
+import cv2
+import numpy as np
+
+import bandpool
+
+
+# 픽셀 단위(point-wise) 색 연산 파이프라인
+# 각 연산은 채널별 조회 표(LUT), 흑백 변환, 채널 혼합 행렬 중 하나로 표현한다.
+# 연속된 LUT 는 표 하나로 합치고, 남은 단계들은 행 단위 띠(band)마다 이어서 적용한다.
+# 띠는 CPU 캐시에 들어가는 크기라 여러 단계를 거쳐도 메모리는 한 번만 읽고 쓰며, 띠들은 여러 스레드에서 나눠 처리한다.
+# (OpenCV 함수는 실행 중 GIL 을 놓으므로 스레드로 병렬 처리된다)
+#
+# 사용 예)
+#   pointops.run(image, [pointops.grayscale(), pointops.invert()], out=image)  # 제자리에서 한 번에 처리
+
+BAND_BYTES = 512 * 1024  # 띠 하나의 크기 (캐시에 들어가도록)
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024  # 이보다 작은 이미지는 한 스레드에서 처리
+
+_identity = np.arange(256, dtype=np.float64)
+
+
+def _table(values):
+    return np.clip(np.round(values), 0, 255).astype(np.uint8)
+
+
+def lut(table):
+    """채널별 조회 표 단계. table: (256,) 이면 모든 채널에, (256, 3) 이면 B, G, R 채널에 각각 적용"""
+    table = np.asarray(table, dtype=np.uint8)
+    if table.ndim == 1:
+        table = np.repeat(table[:, None], 3, axis=1)
+    return ("lut", np.ascontiguousarray(table.reshape(256, 3)))
+
+
+def invert():
+    return lut(255 - np.arange(256, dtype=np.uint8))
+
+
+def brightness(value):
+    return lut(_table(_identity + value))
+
+
+def contrast(factor, center=128):
+    return lut(_table((_identity - center) * factor + center))
+
+
+def gamma(value):
+    return lut(_table(255 * (_identity / 255) ** (1.0 / value)))
+
+
+def threshold(value):
+    # 전역 스레시홀드 (밝기가 value 보다 크면 255). 흑백 변환 뒤에 쓰면 흑백 이진화가 된다.
+    return lut(np.where(_identity > value, 255, 0).astype(np.uint8))
+
+
+def grayscale():
+    # cv2.cvtColor(BGR2GRAY) 와 같은 값으로 흑백 변환 (세 채널 모두 같은 값)
+    return ("gray", None)
+
+
+def matrix(m):
+    """채널 혼합 단계. m: 3x3 또는 3x4 (마지막 열은 더할 값), BGR 순서"""
+    m = np.asarray(m, dtype=np.float32)
+    if m.shape == (3, 3):
+        m = np.hstack([m, np.zeros((3, 1), np.float32)])
+    return ("matrix", m)
+
+
+def _compose(first, second):
+    # first 표의 결과를 second 표로 다시 조회 (채널별)
+    return np.stack([second[first[:, c], c] for c in range(3)], axis=1)
+
+
+def _lut_mode(table):
+    """
+    표를 가장 빠른 방법으로 적용하기 위한 분류
+    모든 채널이 같은 표면 1채널 표를 쓰고, 반전/밝기 더하기와 같은 표면 포화 연산(SIMD)으로 바꾼다.
+    """
+    t = table[:, 0]
+    if not (table == t[:, None]).all():
+        return ("channels", table.reshape(1, 256, 3).copy())
+    if np.array_equal(t, 255 - np.arange(256)):
+        return ("invert", None)
+    offset = int(t[128]) - 128
+    if np.array_equal(t, _table(_identity + offset)):
+        return ("add", offset)
+    return ("uniform", t.copy())
+
+
+def fuse(ops):
+    """
+    연속된 LUT 는 하나로 합치고, 흑백 변환 뒤의 LUT 는 흑백 변환에 붙여 1채널에서 조회하도록 정리한 단계 목록
+    결과 단계: ("lut", 표, 적용 방법), ("gray", 표 또는 None), ("matrix", 행렬)
+    """
+    stages = []
+    for kind, value in ops:
+        prev = stages[-1] if stages else None
+        if kind == "lut":
+            if prev is not None and prev[0] == "lut":
+                stages[-1] = ("lut", _compose(prev[1], value))
+            elif prev is not None and prev[0] == "gray":
+                # 흑백 변환 결과는 세 채널이 같으므로 LUT 는 흑백 1채널에만 적용하면 됨
+                stages[-1] = ("gray", value if prev[1] is None else _compose(prev[1], value))
+            else:
+                stages.append(("lut", value))
+        elif kind == "gray" and prev is not None and prev[0] == "gray" and prev[1] is None:
+            continue  # 흑백 변환은 두 번 해도 같음
+        else:
+            stages.append((kind, value))
+
+    identity = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    result = []
+    for kind, value in stages:
+        if kind == "lut":
+            if np.array_equal(value, identity):
+                continue
+            result.append(("lut", value, _lut_mode(value)))
+        elif kind == "gray":
+            result.append(("gray", None if value is None or np.array_equal(value, identity) else value, None))
+        else:
+            result.append((kind, value, None))
+    return result
+
+
+def _apply_lut(src, mode, dst):
+    how, data = mode
+    if how == "invert":
+        cv2.bitwise_not(src, dst=dst)
+    elif how == "add":
+        if data >= 0:
+            cv2.add(src, (data, data, data, 0), dst=dst)
+        else:
+            cv2.subtract(src, (-data, -data, -data, 0), dst=dst)
+    else:
+        cv2.LUT(src, data, dst=dst)
+
+
+def _apply_stages(stages, src, dst):
+    # 띠 하나에 모든 단계를 차례로 적용 (첫 단계만 src 를 읽고 나머지는 dst 에서 제자리 처리)
+    for kind, value, mode in stages:
+        if kind == "lut":
+            _apply_lut(src, mode, dst)
+        elif kind == "gray":
+            gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+            if value is None:
+                cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=dst)
+            elif (value == value[:, :1]).all():
+                cv2.LUT(gray, value[:, 0].copy(), dst=gray)
+                cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=dst)
+            else:
+                cv2.merge([cv2.LUT(gray, value[:, c].copy()) for c in range(3)], dst=dst)
+        else:
+            cv2.transform(src, value, dst=dst)
+        src = dst
+    if not stages and src is not dst:
+        dst[...] = src
+
+
+def run(image, ops, out=None, parallel=True):
+    """
+    BGR uint8 이미지에 ops 를 한 번에 적용
+    out: 결과를 쓸 배열. image 를 주면 제자리에서 처리하고, None 이면 새 배열을 만든다.
+    """
+    if out is None:
+        out = np.empty_like(image)
+    stages = fuse(ops)
+    h, w = image.shape[:2]
+    row_bytes = max(1, image[0].nbytes)
+    rows = max(1, BAND_BYTES // row_bytes)
+    bands = [(y, min(h, y + rows)) for y in range(0, h, rows)]
+
+    def work(band):
+        y0, y1 = band
+        _apply_stages(stages, image[y0:y1], out[y0:y1])
+
+    list(bandpool.map_bands("pointops", work, bands, parallel and image.nbytes >= PARALLEL_MIN_BYTES))
+    return out
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+# 푸아송 합성 (seamless clone, NORMAL_CLONE 과 같은 방식)
+# 사각형 조각 안에서 결과 f 는 src 의 기울기를 따르고 가장자리 1px 은 dst 와 같아야 한다.
+# f = src + h 로 두면 h 는 조각 안에서 라플라스 방정식(Δh = 0)을 만족하고 가장자리 값이 dst - src 인 함수이므로,
+# 사각형 영역에서는 DST-I (이산 사인 변환) 로 라플라시안을 대각화해 FFT 몇 번으로 정확히 풀 수 있다.
+# cv2.seamlessClone 은 채널마다 기울기/발산 영상을 만들고 풀어서 같은 크기에서도 몇 배 느리다.
+# FFT 는 길이가 작은 소인수로만 이루어질 때 빠르므로 fast_length() 로 조각 크기를 조금 줄여 맞춘다.
+
+
+def _smooth(n):
+    # 2, 3, 5 외의 소인수가 없는지
+    for p in (2, 3, 5):
+        while n % p == 0:
+            n //= p
+    return n == 1
+
+
+def fast_length(n, max_shrink=0.03):
+    """
+    n 이하이면서 DST 길이 2 * (n - 1) 이 FFT 에 빠른 크기인 가장 큰 조각 길이
+    max_shrink 비율보다 많이 줄여야 하면 n 을 그대로 반환
+    """
+    for m in range(n, max(3, int(n * (1 - max_shrink))) - 1, -1):
+        if _smooth(2 * (m - 1)):
+            return m
+    return n
+
+
+def _dst_rows(x):
+    # 각 행의 DST-I (홀수 확장의 실수 FFT 허수부). 결과는 정의의 2배
+    rows, n = x.shape
+    ext = np.zeros((rows, 2 * (n + 1)), np.float32)
+    ext[:, 1:n + 1] = x
+    ext[:, n + 2:] = -x[:, ::-1]
+    return -np.fft.rfft(ext, axis=1).imag[:, 1:n + 1].astype(np.float32)
+
+
+def _dst2(x):
+    # (채널, m, n) 의 마지막 두 축에 대한 2차원 DST-I. 채널을 행으로 펼쳐 한 번에 변환
+    c, m, n = x.shape
+    x = _dst_rows(x.reshape(c * m, n)).reshape(c, m, n)
+    x = _dst_rows(np.ascontiguousarray(x.transpose(0, 2, 1)).reshape(c * n, m)).reshape(c, n, m)
+    return np.ascontiguousarray(x.transpose(0, 2, 1))
+
+
+def clone(src, dst, progress=None):
+    """
+    같은 크기의 src, dst 조각 (h, w, c) uint8 을 합성한 결과
+    가장자리 1px 은 dst 그대로이고 안쪽은 src 의 기울기를 유지하며 가장자리와 이어진다.
+    progress 를 주면 채널을 풀 때마다 진행률 (0 ~ 1) 로 호출한다 (예외를 내면 멈춤).
+    """
+    h, w = src.shape[:2]
+    out = dst.copy()
+    if h < 3 or w < 3:
+        return out
+    src_f = src.reshape(h, w, -1).astype(np.float32)
+    diff = dst.reshape(h, w, -1).astype(np.float32) - src_f
+    diff = diff.transpose(2, 0, 1)  # (c, h, w)
+    m, n = h - 2, w - 2
+
+    # 안쪽 픽셀의 방정식 4h - (이웃 합) = 0 에서 값을 아는 가장자리 이웃을 우변으로
+    rhs = np.zeros((diff.shape[0], m, n), np.float32)
+    rhs[:, 0] += diff[:, 0, 1:-1]
+    rhs[:, -1] += diff[:, -1, 1:-1]
+    rhs[:, :, 0] += diff[:, 1:-1, 0]
+    rhs[:, :, -1] += diff[:, 1:-1, -1]
+
+    ky = 2 - 2 * np.cos(np.pi * np.arange(1, m + 1) / (m + 1))
+    kx = 2 - 2 * np.cos(np.pi * np.arange(1, n + 1) / (n + 1))
+    # 2배 DST 를 두 번씩 하면 2(m+1) * 2(n+1) 배가 되므로 고윳값과 함께 나눔
+    scale = (ky[:, None] + kx[None, :]) * (4.0 * (m + 1) * (n + 1))
+    scale = scale.astype(np.float32)
+    inner = src_f[1:-1, 1:-1]
+    # FFT 중간 결과가 크므로 채널마다 따로 풀어 메모리 최대 사용량을 줄임
+    for ch in range(rhs.shape[0]):
+        inner[..., ch] += _dst2(_dst2(rhs[ch:ch + 1]) / scale)[0]
+        if progress is not None:
+            progress((ch + 1) / rhs.shape[0])
+    np.clip(inner + 0.5, 0, 255, out=inner)
+    out.reshape(h, w, -1)[1:-1, 1:-1] = inner.astype(np.uint8)
+    return out
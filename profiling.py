@@ -0,0 +1,175 @@
+import fnmatch
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+
+# 편집기 동작별 실행 시간 측정
+# 측정할 메서드는 클래스를 정의할 때 instrument() 로 감싸 둔다. 꺼져 있으면 감싼 함수는 플래그 하나만 확인하고
+# 원래 메서드를 호출하므로 비용이 거의 없다 (Qt 시그널에 이미 연결된 메서드도 같은 함수이므로 따로 바꿀 필요가 없음).
+# 켜면 호출마다 경과 시간, 이미지 크기, (메모리 추적을 켠 경우) 할당량을 기록하고,
+# 기록은 화면 오버레이용 요약이나 Chrome trace-event JSON (chrome://tracing, Perfetto 에서 열림) 으로 꺼낼 수 있다.
+#
+# 환경 변수 IMAGE_EDITOR_PROFILE=1 (메모리까지 재려면 memory) 이면 시작할 때부터 켜고,
+# IMAGE_EDITOR_TRACE=경로 를 주면 편집기를 닫을 때 그 경로에 트레이스를 저장한다.
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "cat", "args", "start", "mem_start", "outermost")
+
+    def __init__(self, profiler, name, cat, args):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        p = self.profiler
+        self.mem_start = None
+        if p.track_memory and tracemalloc.is_tracing():
+            depth = getattr(p._local, "depth", 0)
+            p._local.depth = depth + 1
+            self.outermost = depth == 0
+            if self.outermost:
+                # 최대 사용량은 전역 값이라 가장 바깥 구간에서만 초기화
+                tracemalloc.reset_peak()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        p = self.profiler
+        args = self.args
+        if self.mem_start is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            p._local.depth -= 1
+            args = dict(args or {})
+            args["alloc_bytes"] = max(0, current - self.mem_start)
+            if self.outermost:
+                args["peak_bytes"] = max(0, peak - self.mem_start)
+        p.record(self.name, self.cat, self.start, end - self.start, args)
+        return False
+
+
+class Profiler:
+    def __init__(self, capacity=50000):
+        self.enabled = False
+        self.track_memory = False
+        self.events = deque(maxlen=capacity)  # Chrome trace "X" 이벤트 (오래된 것부터)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+
+    def enable(self, track_memory=False):
+        self.track_memory = track_memory
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.track_memory = False
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+
+    def span(self, name, cat="editor", args=None):
+        """with profiler.span("이름"): ... 구간 하나를 기록 (켜져 있을 때만 쓸 것)"""
+        return _Span(self, name, cat, args)
+
+    def record(self, name, cat, start, duration, args=None):
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,  # 마이크로초
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """이름별 (이름, 횟수, 합계 ms, 평균 ms, 최대 ms, 최대 할당 바이트) 를 합계가 큰 순서로"""
+        with self._lock:
+            events = list(self.events)
+        stats = {}
+        for e in events:
+            s = stats.setdefault(e["name"], [0, 0.0, 0.0, 0])
+            s[0] += 1
+            s[1] += e["dur"] / 1000
+            s[2] = max(s[2], e["dur"] / 1000)
+            s[3] = max(s[3], e.get("args", {}).get("alloc_bytes", 0))
+        rows = [(name, n, total, total / n, worst, alloc) for name, (n, total, worst, alloc) in stats.items()]
+        return sorted(rows, key=lambda r: r[2], reverse=True)
+
+    def recent(self, count=10):
+        with self._lock:
+            return list(self.events)[-count:]
+
+    def chrome_trace(self):
+        with self._lock:
+            events = list(self.events)
+        names = {t.ident: t.name for t in threading.enumerate()}
+        meta = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                 "args": {"name": names.get(tid, str(tid))}}
+                for tid in sorted({e["tid"] for e in events})]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+
+PROFILER = Profiler()
+
+
+def traced(name, cat="editor", args=None):
+    """
+    함수를 감싸 PROFILER 가 켜져 있을 때만 구간을 기록
+    args: 첫 번째 인자(메서드면 self)를 받아 기록할 부가 정보 dict 를 반환하는 함수
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*a, **kw):
+            if not PROFILER.enabled:
+                return func(*a, **kw)
+            with PROFILER.span(name, cat, args(a[0]) if args is not None and a else None):
+                return func(*a, **kw)
+        return wrapper
+    return decorate
+
+
+def instrument(cls, patterns, cat, args=None):
+    """cls 에 직접 정의된 메서드 중 이름이 patterns (fnmatch) 와 맞는 것을 traced 로 감쌈"""
+    for attr, value in list(vars(cls).items()):
+        if callable(value) and any(fnmatch.fnmatchcase(attr, p) for p in patterns):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}", cat, args)(value))
+    return cls
+
+
+def image_args(obj):
+    # 편집기/캔버스의 현재 이미지 크기
+    image = getattr(obj, "image", None)
+    if image is None:
+        return None
+    h, w = image.shape[:2]
+    return {"image": f"{w}x{h}", "megapixels": round(w * h / 1e6, 2)}
+
+
+if os.environ.get("IMAGE_EDITOR_PROFILE"):
+    PROFILER.enable(track_memory=os.environ.get("IMAGE_EDITOR_PROFILE") == "memory")
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from regions import Fill
+from strokes import Stroke
+
+
+# 프로젝트 파일 (현재 이미지 + 되돌리기 히스토리 + 편집기 설정)
+# 파일은 압축된 데이터 조각(chunk)을 이어 붙이고 맨 끝에 목차(manifest)를 둔다.
+#   MAGIC | 조각 ... | 목차(zlib JSON) | 꼬리 (목차 위치, 목차 길이, MAGIC)
+# 조각은 내용 해시로 구분하므로 같은 파일에 다시 저장할 때는 파일에 없는 조각과 새 목차만 뒤에 덧붙인다.
+# 열 때는 파일을 메모리 매핑하고 목차와 현재 이미지만 읽는다.
+# 히스토리 타일은 위치만 기억했다가 되돌리기에 필요할 때 매핑된 버퍼에서 읽는다.
+#
+# 작업 그래프(비파괴 편집 노드)는 저장하지 않는다. 다시 열면 현재 이미지를 원본으로 새 그래프를 시작한다.
+
+MAGIC = b"IMGPROJ1"
+EXTENSION = ".imgproj"
+FORMAT_VERSION = 1
+IMAGE_TILE = 512  # 현재 이미지를 나누어 저장하는 타일 크기 (바뀐 타일만 다시 씀)
+_TRAILER = struct.Struct("<QQ8s")
+
+
+class ProjectError(Exception):
+    pass
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class _Writer:
+    """저장 중에 조각을 파일 끝에 쓰고, 이미 파일에 있는 조각은 다시 쓰지 않음"""
+
+    def __init__(self, f, offset, chunks, compress_level):
+        self.f = f
+        self.offset = offset
+        self.chunks = chunks  # 해시 -> (위치, 길이)
+        self.compress_level = compress_level
+        self.written = 0
+        self.used = {}  # 이번 목차가 가리키는 조각 (목차에는 이것만 남음)
+
+    def put(self, data, key=None):
+        key = key or _digest(data)
+        if key not in self.chunks:
+            self.f.write(data)
+            self.chunks[key] = (self.offset, len(data))
+            self.offset += len(data)
+            self.written += len(data)
+        self.used[key] = self.chunks[key]
+        return key
+
+    def tile(self, step, tile):
+        # 히스토리 타일은 이미 압축된 데이터를 그대로 저장. 해시는 타일마다 한 번만 계산
+        if tile.key is None:
+            tile.key = _digest(step.raw(tile))
+        if tile.key in self.chunks:
+            self.used[tile.key] = self.chunks[tile.key]
+        else:
+            self.put(bytes(step.raw(tile)), tile.key)
+        return {"y": tile.y, "x": tile.x, "shape": list(tile.shape), "compressed": tile.compressed,
+                "key": tile.key}
+
+    def record(self, record):
+        # 기록의 배열은 압축하지 않고 저장해 열 때 매핑된 파일을 그대로 가리키게 함
+        if isinstance(record, Stroke):
+            return {"type": "stroke", "tool": record.tool, "color": record.color, "thickness": record.thickness,
+                    "points": self.put(record.points.tobytes())}
+        if isinstance(record, Fill):
+            return {"type": "fill", "region": record.region, "color": record.color, "count": record.count,
+                    "bits": self.put(record.bits.tobytes())}
+        raise ProjectError(f"저장할 수 없는 편집 기록: {type(record).__name__}")
+
+
+class _Reader:
+    def __init__(self, mapped, chunks):
+        self.mapped = mapped
+        self.chunks = chunks
+
+    def get(self, key):
+        offset, length = self.chunks[key]
+        return self.mapped[offset:offset + length]
+
+    def array(self, key, dtype):
+        # 매핑된 파일을 그대로 가리키는 읽기 전용 배열 (읽을 때 필요한 페이지만 올라옴)
+        offset, length = self.chunks[key]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self.mapped, dtype, count=length // dtype.itemsize, offset=offset)
+
+    def tile(self, ref):
+        offset, length = self.chunks[ref["key"]]
+        return ref["y"], ref["x"], ref["shape"], ref["compressed"], offset, length
+
+    def record(self, state):
+        if state["type"] == "stroke":
+            return Stroke(state["tool"], self.array(state["points"], np.int32), state["color"], state["thickness"])
+        if state["type"] == "fill":
+            return Fill.from_bits(state["region"], self.array(state["bits"], np.uint8), state["color"],
+                                  state["count"])
+        raise ProjectError(f"알 수 없는 편집 기록: {state['type']}")
+
+
+def _image_tiles(image):
+    h, w = image.shape[:2]
+    for y in range(0, h, IMAGE_TILE):
+        for x in range(0, w, IMAGE_TILE):
+            yield y, x, image[y:y + IMAGE_TILE, x:x + IMAGE_TILE]
+
+
+class Project:
+    """
+    열려 있는 프로젝트 파일 하나
+    save() 는 같은 경로면 바뀐 조각만 덧붙이고, 다른 경로면 새 파일을 만든다.
+    """
+
+    def __init__(self, path=None, compress_level=1):
+        self.path = path
+        self.compress_level = compress_level
+        self.chunks = {}  # 파일에 있는 조각: 해시 -> (위치, 길이)
+        self.manifest = None
+        self._mapped = None
+        self._size = 0  # 마지막으로 읽거나 쓴 뒤의 파일 크기 (다른 프로그램이 바꿨는지 확인)
+        self._image_keys = {}  # 현재 이미지 타일의 원본 바이트 해시 -> 저장한 조각 해시
+
+    @classmethod
+    def open(cls, path):
+        project = cls(path)
+        project._load()
+        return project
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC) + _TRAILER.size:
+                raise ProjectError("프로젝트 파일이 아닙니다.")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ProjectError("프로젝트 파일이 아닙니다.")
+        offset, length = self._find_manifest(mapped)
+        manifest = json.loads(zlib.decompress(mapped[offset:offset + length]))
+        if manifest.get("format", 0) > FORMAT_VERSION:
+            raise ProjectError("더 새로운 버전의 프로젝트 파일입니다.")
+        self.chunks = {k: tuple(v) for k, v in manifest["chunks"].items()}
+        self.manifest = manifest
+        self._mapped = mapped
+        self._size = size
+        self._image_keys = {t[4]: t[5] for t in manifest["image"]["tiles"]}
+
+    @staticmethod
+    def _find_manifest(mapped):
+        # 맨 끝의 꼬리부터 확인하고, 저장 도중 끊긴 파일이면 앞쪽의 마지막 온전한 꼬리를 찾음
+        end = len(mapped)
+        while end >= len(MAGIC) + _TRAILER.size:
+            offset, length, magic = _TRAILER.unpack(mapped[end - _TRAILER.size:end])
+            if magic == MAGIC and offset + length == end - _TRAILER.size and offset >= len(MAGIC):
+                return offset, length
+            end = mapped.rfind(MAGIC, len(MAGIC), end - 1) + len(MAGIC)
+            if end < len(MAGIC) * 2:
+                break
+        raise ProjectError("프로젝트 파일의 목차를 찾을 수 없습니다.")
+
+    def image(self):
+        """저장된 현재 이미지"""
+        info = self.manifest["image"]
+        image = np.empty(info["shape"], np.dtype(info["dtype"]))
+        reader = _Reader(self._mapped, self.chunks)
+        for y, x, h, w, _, key in info["tiles"]:
+            data = zlib.decompress(reader.get(key))
+            image[y:y + h, x:x + w] = np.frombuffer(data, image.dtype).reshape((h, w) + image.shape[2:])
+        return image
+
+    def meta(self):
+        return dict(self.manifest.get("meta", {}))
+
+    def restore_history(self, history, image):
+        """history(TileHistory) 를 저장된 상태로 바꿈. 타일 데이터는 필요할 때 매핑된 파일에서 읽는다."""
+        history.load(self.manifest["history"], image, _Reader(self._mapped, self.chunks))
+
+    def save(self, image, history, meta=None, path=None, progress=None):
+        """
+        이미지, 히스토리, 설정을 저장하고 이번에 새로 쓴 바이트 수를 반환
+        progress: 진행률(0~1) 을 받는 함수 (작업 스레드에서 호출)
+        """
+        path = path or self.path
+        append = (path == self.path and self.manifest is not None and os.path.exists(path)
+                  and os.path.getsize(path) == self._size)
+        if append:
+            f = open(path, "r+b")
+            f.seek(self._size)
+            writer = _Writer(f, self._size, dict(self.chunks), self.compress_level)
+        else:
+            # 새 파일에 전체를 씀 (다 쓴 뒤에 원래 이름으로 바꿔 기존 파일은 끝까지 온전하게 둠)
+            target = path
+            path = path + ".tmp"
+            f = open(path, "wb")
+            f.write(MAGIC)
+            writer = _Writer(f, len(MAGIC), {}, self.compress_level)
+            self._image_keys = {}
+        try:
+            tiles = []
+            image_keys = {}
+            count = max(1, -(-image.shape[0] // IMAGE_TILE) * -(-image.shape[1] // IMAGE_TILE))
+            for i, (y, x, tile) in enumerate(_image_tiles(image)):
+                data = np.ascontiguousarray(tile).tobytes()
+                raw_key = _digest(data)
+                key = self._image_keys.get(raw_key)
+                if key is not None and key in writer.chunks:
+                    writer.used[key] = writer.chunks[key]
+                else:
+                    key = writer.put(zlib.compress(data, self.compress_level))
+                image_keys[raw_key] = key
+                tiles.append([y, x, tile.shape[0], tile.shape[1], raw_key, key])
+                if progress is not None and i % 16 == 0:
+                    progress(0.5 * i / count)
+            history_state = history.dump(writer)
+            if progress is not None:
+                progress(0.9)
+
+            manifest = {
+                "format": FORMAT_VERSION,
+                "saved_at": time.time(),
+                "image": {"shape": list(image.shape), "dtype": image.dtype.str, "tiles": tiles},
+                "history": history_state,
+                "meta": meta or {},
+                "chunks": {k: list(v) for k, v in writer.used.items()},
+            }
+            data = zlib.compress(json.dumps(manifest, ensure_ascii=False).encode("utf-8"), self.compress_level)
+            f.write(data)
+            f.write(_TRAILER.pack(writer.offset, len(data), MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        if not append:
+            os.replace(path, target)
+            path = target
+
+        self.path = path
+        self.chunks = dict(writer.used)
+        self.manifest = manifest
+        self._image_keys = image_keys
+        self._size = os.path.getsize(path)
+        # 덧붙인 부분까지 다시 매핑 (이전 매핑은 그것을 쓰는 히스토리 단계가 계속 가지고 있음)
+        with open(path, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return writer.written + len(data) + _TRAILER.size
+
+    def garbage_ratio(self):
+        """파일에서 더 이상 쓰이지 않는 부분의 비율 (다른 이름으로 저장하면 정리됨)"""
+        if not self._size:
+            return 0.0
+        used = sum(length for _, length in self.chunks.values())
+        return max(0.0, 1.0 - used / self._size)
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+
+# 화면 표시용 다중 해상도 피라미드
+# 0단계는 원본 배열 자체(복사 없음), k단계는 k-1단계의 2x2 평균이다.
+# 원본 일부가 바뀌면 그 영역에 해당하는 부분만 각 단계에서 다시 계산한다.
+
+MIN_LEVEL_SIZE = 256  # 이보다 작아지면 더 이상 단계를 만들지 않음
+
+
+def _half(src):
+    # 가장자리를 복제해 짝수 크기로 맞춘 뒤 2x2 평균
+    h, w = src.shape[:2]
+    if h % 2 or w % 2:
+        src = cv2.copyMakeBorder(src, 0, h % 2, 0, w % 2, cv2.BORDER_REPLICATE)
+    return cv2.resize(src, (src.shape[1] // 2, src.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+
+class DisplayPyramid:
+    def __init__(self, image):
+        self.levels = [image]
+        h, w = image.shape[:2]
+        while max(h, w) > MIN_LEVEL_SIZE:
+            h, w = (h + 1) // 2, (w + 1) // 2
+            self.levels.append(None)  # 필요할 때 만든다
+
+    @property
+    def image(self):
+        return self.levels[0]
+
+    def level(self, k):
+        k = min(max(0, k), len(self.levels) - 1)
+        if self.levels[k] is None:
+            self.levels[k] = _half(self.level(k - 1))
+        return self.levels[k]
+
+    def level_for_scale(self, scale):
+        """scale(원본 대비 화면 배율) 로 표시할 때 쓸 가장 작은 단계 번호 (배율 >= scale)"""
+        k = 0
+        while k + 1 < len(self.levels) and 0.5 ** (k + 1) >= scale:
+            k += 1
+        return k
+
+    def update_region(self, x0, y0, x1, y1):
+        """원본의 [x0, x1) x [y0, y1) 가 바뀌었을 때 이미 만들어진 단계만 갱신"""
+        for k in range(1, len(self.levels)):
+            if self.levels[k] is None:
+                break
+            # k단계 좌표로 변환 (바깥쪽으로 올림)
+            x0, y0 = x0 // 2, y0 // 2
+            x1, y1 = (x1 + 1) // 2, (y1 + 1) // 2
+            prev = self.levels[k - 1]
+            dst = self.levels[k]
+            x1, y1 = min(x1, dst.shape[1]), min(y1, dst.shape[0])
+            if x1 <= x0 or y1 <= y0:
+                break
+            src = prev[2 * y0:min(2 * y1, prev.shape[0]), 2 * x0:min(2 * x1, prev.shape[1])]
+            dst[y0:y1, x0:x1] = _half(src)
+
+    def render(self, scale, out=None, region=None, origin=(0, 0), size=None):
+        """
+        scale 배율의 화면용 이미지를 만든다.
+        region: (dx0, dy0, dx1, dy1) 화면 좌표 영역만 out 에 다시 그림
+        origin: 화면 (0, 0) 에 해당하는 배율 적용 이미지의 좌표 (뷰포트 이동량)
+        size: (w, h) 만들 화면 크기 (기본: 배율 적용 이미지 전체)
+        """
+        h, w = self.levels[0].shape[:2]
+        ox, oy = int(origin[0]), int(origin[1])
+        full_w, full_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        if size is None:
+            size = (full_w - ox, full_h - oy)
+        out_w, out_h = min(int(size[0]), full_w - ox), min(int(size[1]), full_h - oy)
+        k = self.level_for_scale(scale)
+        src = self.level(k)
+        f = (0.5 ** k) / scale  # 화면 1px 이 k단계에서 차지하는 크기
+
+        if out is None:
+            out = np.empty((max(1, out_h), max(1, out_w)) + src.shape[2:], dtype=src.dtype)
+            region = None
+        if region is None:
+            dx0, dy0, dx1, dy1 = 0, 0, out_w, out_h
+        else:
+            dx0, dy0 = max(0, int(region[0])), max(0, int(region[1]))
+            dx1, dy1 = min(out_w, int(region[2])), min(out_h, int(region[3]))
+        if dx1 <= dx0 or dy1 <= dy0:
+            return out
+
+        if k == 0 and scale == 1:
+            out[dy0:dy1, dx0:dx1] = src[dy0 + oy:dy1 + oy, dx0 + ox:dx1 + ox]
+            return out
+
+        # 픽셀 중심을 맞춘 역방향 매핑 (화면 -> 피라미드 단계)
+        # 확대해서 볼 때(배율 > 1)는 픽셀 경계가 보이도록 최근접 보간
+        interpolation = cv2.INTER_NEAREST if scale > 1 else cv2.INTER_LINEAR
+        matrix = np.float32([[f, 0, f * (dx0 + ox + 0.5) - 0.5],
+                             [0, f, f * (dy0 + oy + 0.5) - 0.5]])
+        cv2.warpAffine(src, matrix, (dx1 - dx0, dy1 - dy0), dst=out[dy0:dy1, dx0:dx1],
+                       flags=interpolation | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+        return out
@@ -0,0 +1,172 @@
+import cv2
+import numpy as np
+
+
+# 채우기(flood fill)용 연결 영역 색인
+# 허용 오차 t 로 채우면 상하좌우 이웃과 채널별 차이가 t 이하인 픽셀들이 한 영역이 된다 (시작점과 무관한 연결 성분).
+# 처음 클릭한 영역만 floodFill 로 찾아 라벨 맵에 기록하고, 같은 이미지 버전과 허용 오차에서는 다시 찾지 않는다.
+# 모든 영역이 하나의 floodFill 마스크를 함께 쓰므로 클릭마다 전체 크기의 마스크를 새로 만들 필요가 없다.
+# 채우기로 색이 바뀌면 그 영역에 맞닿은 이웃만 다시 살펴 새 색과 가까운 이웃 영역을 합치고, 나머지 색인은 그대로 쓴다.
+
+DEFAULT_TOLERANCE = 4
+_CROSS = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
+
+def _paint(image, mask, color):
+    # mask(uint8) 가 0 이 아닌 픽셀을 color 로 칠함 (numpy 불리언 인덱싱보다 훨씬 빠름)
+    cv2.bitwise_xor(image, image, dst=image, mask=mask)
+    cv2.add(image, tuple(color) + (0,) * (4 - len(color)), dst=image, mask=mask)
+
+
+class Fill:
+    """
+    채우기 기록. 채워진 픽셀을 영역 사각형 안의 비트마스크로 저장한다.
+    strokes.Stroke 와 같이 history.TileHistory.commit_record 로 픽셀 대신 기록만 남길 수 있다.
+    """
+    __slots__ = ("region", "bits", "color", "count")
+
+    def __init__(self, region, mask, color):
+        self.region = tuple(int(v) for v in region)  # (x, y, w, h)
+        self.bits = np.packbits(mask, axis=None)
+        self.color = tuple(int(c) for c in color)
+        self.count = int(np.count_nonzero(mask))
+
+    @classmethod
+    def from_bits(cls, region, bits, color, count):
+        # 저장해 둔 비트마스크로 다시 만듦 (project.py)
+        fill = cls.__new__(cls)
+        fill.region = tuple(int(v) for v in region)
+        fill.bits = bits
+        fill.color = tuple(int(c) for c in color)
+        fill.count = int(count)
+        return fill
+
+    def rect(self, shape=None):
+        return self.region
+
+    def mask(self):
+        x, y, w, h = self.region
+        return np.unpackbits(self.bits, count=w * h).reshape(h, w)
+
+    def apply(self, image):
+        x, y, w, h = self.region
+        _paint(image[y:y + h, x:x + w], self.mask(), self.color)
+        return self.region
+
+    def nbytes(self):
+        return self.bits.nbytes + 64
+
+    def describe(self):
+        return f"채우기 ({self.count}px)"
+
+
+class RegionIndex:
+    def __init__(self):
+        self.version = None
+        self.tolerance = None
+        self._mask = None  # floodFill 마스크 (h+2, w+2). 색인된 픽셀은 1
+        self._labels = None  # 픽셀별 영역 번호 (0 이면 아직 색인되지 않음)
+        self._rects = {}  # 영역 번호 -> (x, y, w, h)
+        self._next = 1
+
+    def sync(self, image, version, tolerance):
+        # 이미지 버전이나 허용 오차가 바뀌었으면 색인을 비움 (영역은 다시 클릭할 때 찾음)
+        h, w = image.shape[:2]
+        if version == self.version and tolerance == self.tolerance and self._labels is not None \
+                and self._labels.shape == (h, w):
+            return
+        if self._labels is None or self._labels.shape != (h, w):
+            self._mask = np.zeros((h + 2, w + 2), np.uint8)
+            self._labels = np.zeros((h, w), np.int32)
+        elif self._rects:
+            self._mask.fill(0)
+            self._labels.fill(0)
+        self._rects.clear()
+        self.version = version
+        self.tolerance = tolerance
+
+    def region(self, image, seed):
+        """seed 가 속한 영역의 (번호, 사각형, 사각형 안의 uint8 마스크)"""
+        x, y = seed
+        label = int(self._labels[y, x])
+        if label == 0:
+            diff = (self.tolerance,) * 3
+            flags = 4 | cv2.FLOODFILL_MASK_ONLY | (1 << 8)
+            # 이미 색인된 영역은 다른 연결 성분이므로 마스크에 남아 있어도 결과가 달라지지 않음
+            _, _, _, rect = cv2.floodFill(image, self._mask, (x, y), 0, diff, diff, flags)
+            rx, ry, rw, rh = rect
+            labels = self._labels[ry:ry + rh, rx:rx + rw]
+            new = (self._mask[ry + 1:ry + rh + 1, rx + 1:rx + rw + 1] != 0) & (labels == 0)
+            label = self._next
+            self._next += 1
+            labels[new] = label
+            self._rects[label] = (rx, ry, rw, rh)
+        rx, ry, rw, rh = self._rects[label]
+        mask = (self._labels[ry:ry + rh, rx:rx + rw] == label).view(np.uint8)
+        return label, (rx, ry, rw, rh), mask
+
+    def _drop(self, label):
+        rx, ry, rw, rh = self._rects.pop(label)
+        labels = self._labels[ry:ry + rh, rx:rx + rw]
+        old = labels == label
+        labels[old] = 0
+        self._mask[ry + 1:ry + rh + 1, rx + 1:rx + rw + 1][old] = 0
+
+    def _absorb(self, label, other):
+        # other 영역을 label 영역에 합침
+        ox, oy, ow, oh = self._rects.pop(other)
+        labels = self._labels[oy:oy + oh, ox:ox + ow]
+        labels[labels == other] = label
+        x, y, w, h = self._rects[label]
+        x0, y0 = min(x, ox), min(y, oy)
+        self._rects[label] = (x0, y0, max(x + w, ox + ow) - x0, max(y + h, oy + oh) - y0)
+
+    def _update(self, image, label, rect, mask, color):
+        """
+        label 영역을 color 로 칠한 뒤 색인을 고침
+        영역 안은 모두 같은 색이 되어 그대로 하나의 영역이고, 맞닿은 이웃 중 새 색과 차이가 허용 오차 이하인
+        픽셀이 있는 영역만 합쳐진다. 그런 이웃이 아직 색인되지 않았으면 영역 전체를 색인에서 지운다.
+        """
+        x, y, w, h = rect
+        ih, iw = self._labels.shape
+        x0, y0 = max(0, x - 1), max(0, y - 1)
+        x1, y1 = min(iw, x + w + 1), min(ih, y + h + 1)
+        grown = np.zeros((y1 - y0, x1 - x0), np.uint8)
+        grown[y - y0:y - y0 + h, x - x0:x - x0 + w] = mask
+        ring = cv2.dilate(grown, _CROSS)
+        ring[grown != 0] = 0
+        lower = tuple(max(0, c - self.tolerance) for c in color)
+        upper = tuple(min(255, c + self.tolerance) for c in color)
+        close = cv2.inRange(image[y0:y1, x0:x1], lower, upper)
+        touching = np.unique(self._labels[y0:y1, x0:x1][(ring != 0) & (close != 0)])
+        if touching.size and touching[0] == 0:
+            for other in touching[1:].tolist():
+                self._drop(other)
+            self._drop(label)
+            return
+        for other in touching.tolist():
+            self._absorb(label, other)
+
+    def fill(self, image, version, seed, color, tolerance=DEFAULT_TOLERANCE):
+        """
+        image 를 제자리에서 채우고 Fill 기록을 반환
+        채운 뒤에는 set_version() 으로 새 이미지 버전을 알려야 나머지 색인을 계속 쓸 수 있다.
+        """
+        self.sync(image, version, tolerance)
+        label, rect, mask = self.region(image, seed)
+        record = Fill(rect, mask, color)
+        x, y, w, h = rect
+        _paint(image[y:y + h, x:x + w], mask, record.color)
+        self._update(image, label, rect, mask, record.color)
+        return record
+
+    def set_version(self, version):
+        self.version = version
+
+    def indexed(self):
+        return len(self._rects)
+
+    def clear(self):
+        self.version = None
+        self._mask = self._labels = None
+        self._rects.clear()
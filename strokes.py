@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+
+
+# 브러쉬/지우개 획
+# 획은 픽셀이 아니라 (도구, 점 목록, 색, 굵기) 로 기록하고, 같은 파라미터로 다시 그려 결과를 재현한다.
+# 히스토리에는 획 기록만 남기므로 획 하나가 차지하는 메모리는 점 개수에 비례한다 (보통 수 KB).
+
+
+class Stroke:
+    __slots__ = ("tool", "points", "color", "thickness")
+
+    def __init__(self, tool, points, color, thickness):
+        self.tool = tool  # "brush" 또는 "eraser"
+        self.points = np.asarray(points, dtype=np.int32).reshape(-1, 2)  # 원본 이미지 좌표
+        self.color = tuple(int(c) for c in color)
+        self.thickness = max(1, int(thickness))
+
+    def rect(self, shape=None):
+        """획이 바꿀 수 있는 영역 (x, y, w, h). shape 를 주면 이미지 안으로 자른다."""
+        r = self.thickness // 2 + 2
+        x0, y0 = self.points.min(axis=0) - r
+        x1, y1 = self.points.max(axis=0) + r + 1
+        if shape is not None:
+            h, w = shape[:2]
+            x0, y0 = max(0, x0), max(0, y0)
+            x1, y1 = min(w, x1), min(h, y1)
+        return int(x0), int(y0), max(0, int(x1 - x0)), max(0, int(y1 - y0))
+
+    def apply(self, image):
+        # 획 전체를 polyline 한 번으로 그리고 바뀐 영역을 반환
+        cv2.polylines(image, [self.points.reshape(-1, 1, 2)], False, self.color, self.thickness)
+        return self.rect(image.shape)
+
+    def nbytes(self):
+        return self.points.nbytes + 64
+
+    def describe(self):
+        name = "지우개" if self.tool == "eraser" else "브러쉬"
+        return f"{name} ({len(self.points)}점, {self.thickness}px)"
@@ -0,0 +1,50 @@
+import numpy as np
+
+from history import TileHistory
+
+
+def _states(count, size=256):
+    # 단계마다 다른 타일을 바꾼 이미지들 (압축해도 줄지 않도록 난수)
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    states = [image.copy()]
+    for k in range(1, count):
+        image = image.copy()
+        y = (k * 64) % size
+        image[y:y + 64] = rng.integers(0, 255, (64, size, 3), dtype=np.uint8)
+        states.append(image)
+    return states
+
+
+def _map_step(step):
+    # 프로젝트 파일에서 읽은 단계처럼 타일 데이터를 하나의 버퍼로 옮김
+    buffer = bytearray()
+    for tile in step._payload_tiles():
+        tile.offset = len(buffer)
+        buffer += tile.payload
+        tile.payload = None
+    step.mapped = memoryview(bytes(buffer))
+
+
+def test_evict_without_spill_keeps_undo_chain_when_first_step_is_mapped():
+    states = _states(6)
+    history = TileHistory(tile_size=64, max_bytes=None)
+    for k, image in enumerate(states):
+        history.commit(image, meta=f"state {k}")
+    _map_step(history.steps[0])
+    # 메모리에 있는 단계 두 개만 남을 만큼 상한을 줄이고 새 상태를 기록
+    history.max_bytes = history.steps[-1].nbytes() * 2
+    history.commit(states[0], meta="state 6")
+
+    oldest = len(states) + 1 - len(history)
+    assert oldest > 0
+    image = history.current()
+    while history.can_undo():
+        image = history.undo(image)
+    # 남은 가장 오래된 상태로 정확히 돌아가고, 그 상태의 부가 정보도 맞아야 함
+    assert np.array_equal(image, states[oldest])
+    assert history.current_meta() == f"state {oldest}"
+    for k in range(oldest + 1, len(states)):
+        image = history.redo(image)
+        assert np.array_equal(image, states[k])
+        assert history.current_meta() == f"state {k}"
@@ -0,0 +1,115 @@
+import math
+
+import cv2
+import numpy as np
+
+import bandpool
+
+
+# 적응형 스레시홀드 (슬라이더로 조절할 때 쓰는 캐시)
+# 이미지 버전마다 흑백 이미지와, 가장자리를 MAX_BLOCK // 2 만큼 복제해 늘린 적분 영상(integral image)을 한 번만 만든다.
+# 평균 방식은 블록 크기와 관계없이 픽셀마다 적분 영상 4곳만 읽으면 블록 합을 알 수 있으므로
+# 슬라이더를 움직일 때마다 행 띠(tile) 단위로 나눠 여러 스레드에서 한 번씩만 훑는다.
+# 가우시안 방식은 적분 영상으로 구할 수 없어 블록 크기별 가우시안 평균을 몇 개까지 기억해 두고 C 만 바뀌면 비교만 다시 한다.
+# 결과는 cv2.adaptiveThreshold(THRESH_BINARY, BORDER_REPLICATE) 와 픽셀 단위로 같다.
+#
+# 블록 합 s 와 픽셀 값 v 에 대해 OpenCV 는 round(s / b²) < v + ceil(C) 이면 255 로 만든다.
+# b 가 홀수면 b² 도 홀수라 반올림 경계에 정확히 걸리지 않으므로 이 조건은 s < (v + ceil(C)) * b² - (b² - 1) / 2 와 같고,
+# 우변은 v 만의 함수이므로 256 칸 조회 표로 만들어 두면 나눗셈 없이 정수 비교 한 번으로 끝난다.
+
+MAX_BLOCK = 255  # 슬라이더로 고를 수 있는 가장 큰 블록 크기
+BAND_ROWS = 256  # 스레드 하나가 맡는 행 수
+GAUSSIAN_CACHE = 2  # 기억해 둘 가우시안 평균 영상 수
+METHODS = ("mean", "gaussian")
+
+def threshold_table(c, scale=1):
+    # v -> 블록 합(scale=b²) 또는 평균(scale=1) 이 이 값보다 작으면 255 인 기준값
+    v = np.arange(256, dtype=np.int64) + math.ceil(c)
+    limit = v * scale - (scale - 1) // 2
+    # 블록 합은 0 이상이므로 음수는 0 으로 (int32 조회 표에서 비교가 뒤집히지 않도록)
+    return np.clip(limit, 0, np.iinfo(np.int32).max).astype(np.int32)
+
+
+class ThresholdEngine:
+    def __init__(self):
+        self._key = None
+        self.gray = None
+        self.integral = None  # 복제 테두리를 더한 흑백 이미지의 int32 적분 영상 (넘침은 뺄셈에서 상쇄됨)
+        self._gaussian = {}  # 블록 크기 -> 가우시안 평균 (uint8)
+
+    def prepare(self, image, version):
+        key = (version, image.shape)
+        if key == self._key:
+            return
+        self.gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image.copy()
+        pad = MAX_BLOCK // 2
+        padded = cv2.copyMakeBorder(self.gray, pad, pad, pad, pad, cv2.BORDER_REPLICATE)
+        # 합이 int32 를 넘어도 2의 보수로 감기므로 블록 합(항상 int32 범위) 은 정확히 나옴
+        self.integral = cv2.integral(padded, sdepth=cv2.CV_32S)
+        self._gaussian = {}
+        self._key = key
+
+    def _gaussian_mean(self, block_size):
+        mean = self._gaussian.get(block_size)
+        if mean is None:
+            # uint8 GaussianBlur 의 고정소수점 결과는 adaptiveThreshold 와 조금 달라 실수로 흐린 뒤 반올림
+            mean = cv2.GaussianBlur(self.gray.astype(np.float32), (block_size, block_size), 0,
+                                    borderType=cv2.BORDER_REPLICATE)
+            mean = np.rint(mean).astype(np.uint8)
+            if len(self._gaussian) >= GAUSSIAN_CACHE:
+                self._gaussian.pop(next(iter(self._gaussian)))
+            self._gaussian[block_size] = mean
+        return mean
+
+    def render(self, block_size, c, method="mean", rect=None, step=1, progress=None):
+        """
+        흑백 결과 (uint8, 0/255)
+        rect: 계산할 원본 영역 (x, y, w, h), 기본은 전체. step 을 주면 그 간격의 픽셀만 계산 (미리보기용)
+        progress: 띠가 끝날 때마다 진행률 (0 ~ 1) 로 호출할 함수. 예외를 내면 남은 띠는 계산하지 않는다 (작업 취소).
+        """
+        if block_size % 2 == 0 or not 3 <= block_size <= MAX_BLOCK:
+            raise ValueError(f"블록 크기는 3 ~ {MAX_BLOCK} 의 홀수여야 합니다: {block_size}")
+        h, w = self.gray.shape
+        x, y, rw, rh = rect or (0, 0, w, h)
+        cols = slice(x, x + rw, step)
+        out = np.empty((len(range(y, y + rh, step)), len(range(x, x + rw, step))), np.uint8)
+
+        if method == "mean":
+            table = threshold_table(c, block_size * block_size)
+            integral = self.integral
+            # 원본 (i, j) 의 블록 합은 적분 영상의 (i + lo, j + lo) ~ (i + hi, j + hi) 네 모서리로 구함
+            lo = MAX_BLOCK // 2 - block_size // 2
+            hi = lo + block_size
+
+            def band(k, y0, y1):
+                rows = slice(y0, y1, step)
+                s = integral[rows.start + hi:rows.stop + hi:step, cols.start + hi:cols.stop + hi:step] \
+                    - integral[rows.start + lo:rows.stop + lo:step, cols.start + hi:cols.stop + hi:step]
+                s -= integral[rows.start + hi:rows.stop + hi:step, cols.start + lo:cols.stop + lo:step]
+                s += integral[rows.start + lo:rows.stop + lo:step, cols.start + lo:cols.stop + lo:step]
+                cv2.compare(s, cv2.LUT(self.gray[rows, cols], table), cv2.CMP_LT, dst=out[k:k + len(s)])
+        elif method == "gaussian":
+            table = threshold_table(c)
+            mean = self._gaussian_mean(block_size)
+
+            def band(k, y0, y1):
+                rows = slice(y0, y1, step)
+                m = mean[rows, cols].astype(np.int32)
+                cv2.compare(m, cv2.LUT(self.gray[rows, cols], table), cv2.CMP_LT, dst=out[k:k + len(m)])
+        else:
+            raise ValueError(f"알 수 없는 방식: {method} (사용 가능: {', '.join(METHODS)})")
+
+        # step 간격을 지키도록 띠 경계를 step 의 배수로 맞춤
+        rows_per_band = max(1, BAND_ROWS // step) * step
+        bands = [((y0 - y) // step, y0, min(y + rh, y0 + rows_per_band)) for y0 in range(y, y + rh, rows_per_band)]
+        results = bandpool.map_bands("threshold", lambda b: band(*b), bands)
+        for i, _ in enumerate(results, 1):
+            if progress is not None:
+                progress(i / len(bands))
+        return out
+
+    def clear(self):
+        self._key = None
+        self.gray = self.integral = None
+        self._gaussian = {}
+
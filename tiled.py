@@ -0,0 +1,237 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import bandpool
+import blurs
+import imageops
+
+
+# 메모리에 다 올릴 수 없는 큰 이미지를 타일 단위로 처리
+# 이미지는 .npy 메모리 맵 파일에 두고, 작업 프로세스들이 같은 파일을 메모리 맵으로 열어
+# 각자 맡은 타일(+ 주변 halo)만 읽고 결과 타일만 쓴다.
+# 메모리 맵 페이지는 OS 페이지 캐시를 통해 프로세스 사이에 공유되므로 타일 데이터를 복사해 주고받지 않는다.
+# 최대 메모리 사용량은 이미지 크기가 아니라 (타일 크기 + halo) x 프로세스 수로 정해진다.
+#
+# 사용 예)
+#   python tiled.py scan.npy out.npy -o grayscale -o "blur:ksize=31,mode=gaussian" --tile 2048 -j 8
+#   python tiled.py scan.npy out.png -o "backproject:roi=100;200;64;64"
+
+
+def halo_for(name, params):
+    # 타일 경계에서 결과가 전체 처리와 같도록 필요한 주변 픽셀 수
+    if name == "blur":
+        # 양방향 필터의 큰 반지름은 줄여서 계산하므로 타일 경계에서 축소 격자가 달라 아주 조금 다를 수 있음
+        return blurs.halo(params["mode"], params["ksize"])
+    if name == "threshold":
+        return params["block_size"] // 2
+    if name == "backproject":
+        return 2  # masking 의 5x5 filter2D
+    return 0
+
+
+# 타일 단위로 처리할 수 있는 지역 연산 (기본 파라미터)
+TILED_OPERATIONS = {
+    "blur": {"ksize": 15, "mode": "box"},
+    "grayscale": {},
+    "invert": {},
+    "threshold": {"block_size": 11, "c": 10, "method": "mean"},
+    "backproject": {"roi": None},
+}
+
+
+def parse_operation(spec):
+    # imageops.parse_operation 과 같은 형식. roi 는 "x;y;w;h" 로 지정
+    name, _, arg_text = spec.partition(":")
+    name = name.strip()
+    if name not in TILED_OPERATIONS:
+        raise ValueError(f"타일 처리를 지원하지 않는 작업: {name} (사용 가능: {', '.join(TILED_OPERATIONS)})")
+    params = dict(TILED_OPERATIONS[name])
+    for item in filter(None, arg_text.split(",")):
+        key, _, value = item.partition("=")
+        key, value = key.strip(), value.strip()
+        if key not in params:
+            raise ValueError(f"{name} 작업에 없는 파라미터: {key}")
+        if key == "roi":
+            params[key] = tuple(int(v) for v in value.split(";"))
+        else:
+            # 방식 이름 (method, mode) 은 문자열 그대로
+            params[key] = int(value) if isinstance(params[key], int) else value
+    if name == "backproject" and params["roi"] is None:
+        raise ValueError("backproject 작업에는 roi=x;y;w;h 가 필요합니다.")
+    return name, params
+
+
+def open_store(path):
+    # 읽기 전용 메모리 맵 (.npy)
+    return np.load(path, mmap_mode="r")
+
+
+def create_store(path, shape, dtype=np.uint8):
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+
+def import_image(path, store_path):
+    """
+    입력을 타일 저장소(.npy 메모리 맵)로 준비
+    .npy 는 그대로 메모리 맵으로 사용하고, 일반 이미지 파일은 한 번 디코딩해 저장소로 옮긴다.
+    (OpenCV 는 부분 디코딩을 지원하지 않으므로 일반 이미지 파일은 디코딩하는 동안 전체가 메모리에 올라간다)
+    """
+    if path.lower().endswith(".npy"):
+        return path
+    image = imageops.read_image(path)
+    if image is None:
+        raise ValueError(f"이미지를 불러올 수 없습니다: {path}")
+    store = create_store(store_path, image.shape, image.dtype)
+    store[:] = image
+    store.flush()
+    del store
+    return store_path
+
+
+def tile_grid(shape, tile):
+    h, w = shape[:2]
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            yield x, y, min(w, x + tile), min(h, y + tile)
+
+
+def _read_with_halo(src, rect, halo):
+    # 타일 + halo 영역을 읽음. 이미지 경계 밖은 읽지 않으므로 경계 처리는 전체 처리와 같다.
+    x0, y0, x1, y1 = rect
+    h, w = src.shape[:2]
+    hx0, hy0 = max(0, x0 - halo), max(0, y0 - halo)
+    hx1, hy1 = min(w, x1 + halo), min(h, y1 + halo)
+    return np.array(src[hy0:hy1, hx0:hx1]), (x0 - hx0, y0 - hy0)
+
+
+def _hist_tile(src_path, rect):
+    src = open_store(src_path)
+    x0, y0, x1, y1 = rect
+    hsv = cv2.cvtColor(np.array(src[y0:y1, x0:x1]), cv2.COLOR_BGR2HSV)
+    return cv2.calcHist([hsv], [0, 1], None, [180, 256], [0, 180, 0, 256])
+
+
+def _process_tile(task):
+    name, params, src_path, dst_path, rect, halo, extra = task
+    src = open_store(src_path)
+    dst = np.load(dst_path, mmap_mode="r+")
+    tile, (ox, oy) = _read_with_halo(src, rect, halo)
+
+    if name == "blur":
+        result = imageops.blur(tile, None, params["ksize"], params["mode"])
+    elif name == "grayscale":
+        result = imageops.grayscale(tile)
+    elif name == "invert":
+        result = imageops.invert(tile)
+    elif name == "threshold":
+        result = imageops.adaptive_threshold(tile, params["block_size"], params["c"], params["method"])
+    elif name == "backproject":
+        hsv = cv2.cvtColor(tile, cv2.COLOR_BGR2HSV)
+        bp = np.take(extra, imageops.hs_index(hsv))
+        result = imageops.masking(bp, tile)
+    else:
+        raise ValueError(name)
+
+    x0, y0, x1, y1 = rect
+    dst[y0:y1, x0:x1] = result[oy:oy + (y1 - y0), ox:ox + (x1 - x0)]
+    dst.flush()
+    return rect
+
+
+def _init_worker():
+    # 코어는 프로세스 풀이 나눠 쓰므로 프로세스 안에서는 한 스레드로 계산
+    cv2.setNumThreads(1)
+    bandpool.single_thread()
+
+
+def run_operation(pool, name, params, src_path, dst_path, tile):
+    src = open_store(src_path)
+    shape = src.shape
+    create_store(dst_path, shape, src.dtype).flush()
+    halo = halo_for(name, params)
+    rects = list(tile_grid(shape, tile))
+
+    extra = None
+    if name == "backproject":
+        # 1단계: 타일별 히스토그램을 모아 전체 히스토그램과 조회 표 계산
+        x, y, w, h = params["roi"]
+        hist_roi = imageops.roi_histogram(np.array(src[y:y + h, x:x + w]), (0, 0, w, h))
+        hist_img = sum(pool.map(_hist_tile, [src_path] * len(rects), rects))
+        extra = imageops.backproject_table(hist_roi, hist_img).ravel()
+
+    tasks = [(name, params, src_path, dst_path, rect, halo, extra) for rect in rects]
+    for _ in pool.map(_process_tile, tasks):
+        pass
+
+
+def run_chain(input_path, output_path, chain, tile=2048, workers=None, workdir=None, quiet=False):
+    workers = workers or os.cpu_count() or 1
+    tmp = tempfile.mkdtemp(prefix="tiled_", dir=workdir)
+    try:
+        start = time.perf_counter()
+        src_path = import_image(input_path, os.path.join(tmp, "input.npy"))
+        shape = open_store(src_path).shape
+        if not quiet:
+            halo = max([halo_for(n, p) for n, p in chain] + [0])
+            channels = shape[2] if len(shape) > 2 else 1
+            budget = workers * (tile + 2 * halo) ** 2 * channels * 4
+            print(f"{shape[1]}x{shape[0]} 타일 {tile}px, 프로세스 {workers}개, "
+                  f"타일 작업 메모리 약 {budget / 1024 ** 2:.0f}MB")
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for i, (name, params) in enumerate(chain):
+                is_last = i == len(chain) - 1
+                if is_last and output_path.lower().endswith(".npy"):
+                    dst_path = output_path
+                else:
+                    dst_path = os.path.join(tmp, f"step{i}.npy")
+                t = time.perf_counter()
+                run_operation(pool, name, params, src_path, dst_path, tile)
+                if not quiet:
+                    print(f"{name}: {time.perf_counter() - t:.2f}s")
+                src_path = dst_path
+
+        if not output_path.lower().endswith(".npy"):
+            if not imageops.write_image(output_path, open_store(src_path)):
+                raise ValueError(f"이미지를 저장할 수 없습니다: {output_path}")
+        elif src_path != output_path:
+            shutil.copyfile(src_path, output_path)
+        if not quiet:
+            print(f"완료 {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="큰 이미지 타일 처리")
+    parser.add_argument("input", help="입력 (.npy 메모리 맵 또는 이미지 파일)")
+    parser.add_argument("output", help="출력 (.npy 또는 이미지 파일)")
+    parser.add_argument("-o", "--op", action="append", default=[], dest="ops",
+                        help="적용할 작업. 사용 가능: " + ", ".join(TILED_OPERATIONS))
+    parser.add_argument("--tile", type=int, default=2048, help="타일 한 변 크기(px)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--workdir", default=None, help="중간 결과 메모리 맵을 둘 폴더")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+    if not args.ops:
+        print("적용할 작업을 -o 로 지정하세요.", file=sys.stderr)
+        return 2
+    try:
+        chain = [parse_operation(spec) for spec in args.ops]
+        run_chain(args.input, args.output, chain, args.tile, args.workers, args.workdir, args.quiet)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import bandpool
+
+
+# 기하 변환 합성 (회전, 뒤집기, 원근 변환, 렌즈 왜곡을 이어서 적용할 때)
+# 각 단계를 출력 좌표 -> 입력 좌표 역변환으로 나타내 이어 붙이면 여러 번 보간하지 않고 원본에서 한 번만 보간할 수 있다.
+# 회전/뒤집기/원근 변환은 3x3 행렬(호모그래피)이라 곱하기만 하면 되므로 렌즈가 닿지 않는 타일은 warpPerspective 한 번으로 끝나고,
+# 렌즈 영역에 걸리는 타일만 좌표를 한 점씩 따라가 만든 표로 remap 한다 (렌즈 밖은 좌표를 바꾸지 않음).
+# 중간 이미지 밖으로 나가는 좌표는 따로 나눠 처리했을 때처럼 그 단계의 빈 곳 색으로 채운다.
+# 출력은 행 띠(타일) 단위로 스레드 풀에서 나눠 계산하고 (띠는 연속된 메모리라 결과 배열에 바로 씀),
+# 렌즈/가장자리 띠의 remap 표와 빈 곳 마스크는 같은 변환 목록과 입력 크기에 다시 쓰도록 캐시한다.
+
+BAND_ROWS = 128  # 출력 띠 하나의 행 수
+CACHE_SIZE = 4  # 캐시해 둘 합성 변환 수
+
+def _box_inside(box, size):
+    # 좌표 상자가 size (w, h) 프레임의 픽셀 범위 안에 있는지
+    x0, y0, x1, y1 = box
+    return x0 >= -0.5 and y0 >= -0.5 and x1 <= size[0] - 0.5 and y1 <= size[1] - 0.5
+
+
+class Homography:
+    """
+    출력 좌표 -> 입력 좌표 역변환 행렬 (3x3) 로 나타낸 단계 (affine 이면 마지막 행이 0, 0, 1)
+    size: 출력 크기 (w, h), border: 입력 밖을 채울 색 (None 이면 입력 밖을 읽는 일이 없음)
+    interpolation: 따로 적용할 때의 보간 (None 이면 90도 회전/뒤집기처럼 픽셀 위치만 바꾸는 단계)
+    """
+
+    def __init__(self, matrix, size, border=None, interpolation=cv2.INTER_LINEAR):
+        self.matrix = np.asarray(matrix, np.float64).reshape(3, 3)
+        self.size = (int(size[0]), int(size[1]))
+        self.border = border
+        self.interpolation = interpolation
+
+    @classmethod
+    def forward(cls, matrix, size, border=None, interpolation=cv2.INTER_LINEAR):
+        # 입력 -> 출력 행렬 (warpAffine 2x3 또는 warpPerspective 3x3) 로 만들기
+        matrix = np.asarray(matrix, np.float64)
+        if matrix.shape == (2, 3):
+            matrix = np.vstack([matrix, [0, 0, 1]])
+        return cls(np.linalg.inv(matrix), size, border, interpolation)
+
+    def key(self):
+        return "homography", self.matrix.round(9).tobytes(), self.size, self.border
+
+    def map_points(self, x, y):
+        m = self.matrix
+        w = m[2, 0] * x + m[2, 1] * y + m[2, 2]
+        return (m[0, 0] * x + m[0, 1] * y + m[0, 2]) / w, (m[1, 0] * x + m[1, 1] * y + m[1, 2]) / w
+
+    def map_box(self, box):
+        x0, y0, x1, y1 = box
+        xs, ys = self.map_points(np.array([x0, x1, x1, x0], np.float64), np.array([y0, y0, y1, y1], np.float64))
+        return xs.min(), ys.min(), xs.max(), ys.max()
+
+
+class Lens:
+    """
+    렌즈 왜곡 단계 (imageops.lens_region 과 같은 변환). 렌즈 원 밖은 그대로이고 크기도 그대로이다.
+    원 안의 점은 중심에서의 거리 r (반지름으로 나눈 값) 을 r ** exp (볼록) 또는 r ** (1 / exp) (오목) 로 옮긴 곳을 읽는다.
+    """
+
+    def __init__(self, center, radius, exp, distortion_type, size):
+        self.center = (int(center[0]), int(center[1]))
+        self.radius = int(radius)
+        self.power = exp if distortion_type == "convex" else 1 / exp
+        self.size = (int(size[0]), int(size[1]))
+        cx, cy = self.center
+        self.box = (cx - self.radius, cy - self.radius, cx + self.radius, cy + self.radius)
+        self.border = None
+        self.interpolation = cv2.INTER_LINEAR
+
+    def key(self):
+        return "lens", self.center, self.radius, self.power, self.size
+
+    def touches(self, box):
+        x0, y0, x1, y1 = box
+        bx0, by0, bx1, by1 = self.box
+        return x0 <= bx1 and bx0 <= x1 and y0 <= by1 and by0 <= y1
+
+    def inside(self, x, y):
+        # 좌표가 바뀌는 (렌즈 원 안의) 점
+        cx, cy = self.center
+        return np.hypot(x - cx, y - cy) < self.radius
+
+    def map_points(self, x, y):
+        cx, cy = self.center
+        dx, dy = (x - cx) / self.radius, (y - cy) / self.radius
+        r = np.hypot(dx, dy)
+        inside = (r < 1) & (r > 0)
+        scale = np.ones_like(r)
+        scale[inside] = r[inside] ** (self.power - 1)
+        # 렌즈가 이미지 가장자리에 걸리면 가장자리 픽셀을 복제한 것처럼 읽음
+        w, h = self.size
+        return (np.clip(cx + dx * scale * self.radius, 0, w - 1),
+                np.clip(cy + dy * scale * self.radius, 0, h - 1))
+
+
+class FusedWarp:
+    """이어진 단계들을 원본에서 한 번에 계산하는 변환. compose() 로 만들 것"""
+
+    def __init__(self, stages, src_shape):
+        self.stages = list(stages)
+        self.src_size = (src_shape[1], src_shape[0])
+        self.size = self.stages[-1].size
+        # 렌즈 밖에서는 렌즈를 건너뛴 행렬 곱이 전체 변환과 같음
+        matrix = np.eye(3)
+        for stage in self.stages:
+            if isinstance(stage, Homography):
+                matrix = matrix @ stage.matrix
+        self.matrix = matrix
+        # 보간하는 단계가 모두 cubic 일 때만 cubic (따로 할 때도 linear 단계에서 이미 그만큼 흐려지므로 linear 한 번이 더 낫거나 같음)
+        modes = {s.interpolation for s in self.stages} - {None}
+        cubic = modes == {cv2.INTER_CUBIC}
+        self.interpolation = cv2.INTER_CUBIC if cubic else cv2.INTER_LINEAR
+        self.border = self.stages[0].border or (0, 0, 0)
+        self._bands = {}  # 띠 -> ((열 범위, remap 표) 또는 None, [(빈 곳 마스크, 채울 색), ...] 또는 None)
+        self._lock = threading.Lock()
+
+    def _plan(self, band):
+        # 띠 경계 상자를 뒤에서부터 역변환해 렌즈에 닿는지, 중간 이미지 밖으로 나가는지 확인
+        y0, y1 = band
+        box = (0, y0, self.size[0] - 1, y1 - 1)
+        nonlinear = outside = False
+        for k in range(len(self.stages) - 1, -1, -1):
+            stage = self.stages[k]
+            if isinstance(stage, Lens):
+                if stage.touches(box):
+                    nonlinear = True
+                    box = (min(box[0], stage.box[0]), min(box[1], stage.box[1]),
+                           max(box[2], stage.box[2]), max(box[3], stage.box[3]))
+            else:
+                box = stage.map_box(box)
+            if k > 0 and not _box_inside(box, self.stages[k - 1].size):
+                outside = True
+        return nonlinear, outside
+
+    def _maps(self, band, nonlinear):
+        """
+        띠의 모든 픽셀을 역변환해 (렌즈가 좌표를 바꾼 열 범위, 그 범위의 remap 표) 와
+        중간 이미지 밖으로 나간 픽셀을 채울 [(마스크, 색), ...] 을 구함
+        """
+        y0, y1 = band
+        y, x = np.mgrid[y0:y1, 0:self.size[0]].astype(np.float64)
+        fill = np.full(x.shape, -1, np.int16)  # 빈 곳 색을 정하는 단계 번호 (뒤쪽 단계가 우선)
+        moved = np.zeros(x.shape, bool)  # 렌즈가 좌표를 바꾼 픽셀
+        for k in range(len(self.stages) - 1, -1, -1):
+            stage = self.stages[k]
+            if isinstance(stage, Lens) and nonlinear:
+                moved |= stage.inside(x, y)
+                x, y = stage.map_points(x, y)
+            else:
+                x, y = stage.map_points(x, y)
+            if k > 0 and stage.border is not None:
+                w, h = self.stages[k - 1].size
+                out = (x < -0.5) | (y < -0.5) | (x > w - 0.5) | (y > h - 0.5)
+                fill[out & (fill < 0)] = k
+        remap = None
+        cols = np.flatnonzero(moved.any(axis=0))
+        if len(cols):
+            # 렌즈가 닿은 열만 remap 하고 나머지는 warpPerspective 결과를 그대로 씀
+            c0, c1 = cols[0], cols[-1] + 1
+            maps = cv2.convertMaps(x[:, c0:c1].astype(np.float32), y[:, c0:c1].astype(np.float32), cv2.CV_16SC2)
+            remap = (c0, c1, maps)
+        fills = [(fill == k, self.stages[k].border) for k in np.unique(fill[fill >= 0])]
+        return remap, fills or None
+
+    def _band(self, image, band, out):
+        y0, y1 = band
+        with self._lock:
+            cached = self._bands.get(band)
+        if cached is None:
+            nonlinear, outside = self._plan(band)
+            cached = self._maps(band, nonlinear) if nonlinear or outside else (None, None)
+            with self._lock:
+                self._bands[band] = cached
+        remap, fills = cached
+        # 닫힌 형태: 띠 원점만큼 옮긴 행렬로 warpPerspective
+        shift = np.array([[1, 0, 0], [0, 1, y0], [0, 0, 1]], np.float64)
+        cv2.warpPerspective(image, self.matrix @ shift, (self.size[0], y1 - y0), dst=out,
+                            flags=self.interpolation | cv2.WARP_INVERSE_MAP,
+                            borderMode=cv2.BORDER_CONSTANT, borderValue=self.border)
+        if remap is not None:
+            c0, c1, maps = remap
+            out[:, c0:c1] = cv2.remap(image, maps[0], maps[1], self.interpolation,
+                                      borderMode=cv2.BORDER_CONSTANT, borderValue=self.border)
+        for mask, color in fills or ():
+            out[mask] = color
+
+    def apply(self, image, parallel=True, progress=None):
+        """
+        원본 image 에 합친 변환을 적용한 결과
+        progress: 띠가 끝날 때마다 진행률 (0 ~ 1) 로 호출할 함수. 예외를 내면 남은 띠는 계산하지 않는다 (작업 취소).
+        """
+        w, h = self.size
+        out = np.empty((h, w) + image.shape[2:], image.dtype)
+        bands = [(y, min(h, y + BAND_ROWS)) for y in range(0, h, BAND_ROWS)]
+
+        def work(band):
+            self._band(image, band, out[band[0]:band[1]])
+
+        results = bandpool.map_bands("warps", work, bands, parallel)
+        for i, _ in enumerate(results, 1):
+            if progress is not None:
+                progress(i / len(bands))
+        return out
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compose(stages, src_shape):
+    """stages (앞에서부터 적용할 순서) 를 합친 FusedWarp. 같은 단계와 입력 크기면 캐시된 것을 반환"""
+    key = (tuple(s.key() for s in stages), tuple(src_shape[:2]))
+    with _cache_lock:
+        fused = _cache.get(key)
+        if fused is not None:
+            _cache.move_to_end(key)
+            return fused
+    fused = FusedWarp(stages, src_shape)
+    with _cache_lock:
+        _cache[key] = fused
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return fused
@@ -1,4 +1,8 @@
 import sys
+import os
+import ast
+import tempfile
+import time
 import cv2
 import numpy as np
 from PyQt5.QtWidgets import (
@@ -7,14 +11,33 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import QTranslator, QLocale, QLibraryInfo
 from PyQt5.QtGui import QPixmap, QImage, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QPoint, QRect, QTimer, pyqtSignal
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import QComboBox,QSpinBox, QLineEdit, QDialog
+from PyQt5.QtWidgets import QListWidget, QCheckBox, QProgressBar, QRubberBand
 from PyQt5.QtGui import QCursor
-from PIL import Image, ImageDraw, ImageFont
+
+import blurs
+import imageops
+import pointops
+from canvas import Canvas, VIEW_SIZE
+from history import TileHistory
+from jobs import JobScheduler
+from strokes import Stroke
+from regions import RegionIndex, DEFAULT_TOLERANCE
+from opgraph import OpGraph, pack_patch
+from project import Project, ProjectError, EXTENSION as PROJECT_EXTENSION
+from imagecache import ImageCache, neighbour, read_preview
+from docscan import DocumentDetector
+from threshold import ThresholdEngine, METHODS as THRESHOLD_METHODS, MAX_BLOCK
+import profiling
+from profiling import PROFILER
+from export import ExportQueue, ExportTarget, DEFAULT_OPTIONS as EXPORT_DEFAULTS, EXTENSIONS as EXPORT_EXTENSIONS, PNG_STRATEGY, TIFF_COMPRESSION
 
 
 class ImageEditor(QMainWindow):
+    export_finished = pyqtSignal(object)  # ExportResult (내보내기 스레드에서 UI 스레드로)
+
     def __init__(self):
         super().__init__()
         self.image = np.ones((700, 900, 3), dtype=np.uint8) * 255  # 기본 흰 캔버스
@@ -22,13 +45,20 @@ class ImageEditor(QMainWindow):
         self.brush_size = 5  # 브러쉬 크기
         self.last_point = None
         self.tool_mode = "brush"  # 기본 도구 모드
-        self.drawing_path = []  # 그리기 경로 저장
+        self.drawing_path = []  # 현재 획의 점 목록 (원본 좌표)
+        self.last_stroke_latency = None  # 마지막 획의 화면 반영 지연 시간 통계
         self.filling = False
+        self.fill_tolerance = DEFAULT_TOLERANCE  # 채우기 허용 색상 차이 (채널별)
+        self.fill_index = RegionIndex()  # 채우기 영역 색인 (이미지 버전, 허용 오차별)
         self.image_loaded = False  # 이미지 로딩 상태
-        self.history = []  # 작업 히스토리 리스트
-        self.history_index = -1  # 히스토리 인덱스 초기화
+        # 작업 히스토리 (변경된 타일만 저장, 메모리 상한을 넘으면 오래된 단계는 디스크로)
+        self.history = TileHistory(
+            tile_size=128, compress=True, max_bytes=512 * 1024 * 1024,
+            spill_dir=os.path.join(tempfile.gettempdir(), "image_editor_history"),
+        )
         self.zoom_mode = False  # 확대/축소 모드
-        self.zoom_factor = 1.1  # 확대/축소 비율
+        self.zoom_factor = 1.2  # 확대/축소 모드에서 한 번 클릭할 때의 화면 배율 변화
+        self.pan_start = None  # 화면 이동 드래그 시작 위치
         self.text_mode = False  # 텍스트 모드 상태
         self.font_face = 0  # 기본 글꼴
         self.font_size = 20  # 기본 글꼴 크기
@@ -37,26 +67,250 @@ class ImageEditor(QMainWindow):
         self.start_point = None
         self.end_point = None
         self.lens_mode = False
+        self.lens_radius = 120  # 렌즈 반지름(화면 px)
+        self.lens_strength = 2  # 렌즈 왜곡 지수
+        self.graph = None  # 비파괴 작업 그래프
+        self.graph_head = None  # 현재 이미지에 해당하는 그래프 노드
+        self.image_version = 0  # 이미지 픽셀이 바뀔 때마다 증가 (버전별 캐시의 키)
+        self.back_projector = imageops.BackProjector()  # 역투영용 HSV/히스토그램 캐시
+        self.jobs = JobScheduler(self)  # 무거운 작업을 UI 스레드 밖에서 실행
+        self.project = None  # 열거나 저장한 프로젝트 파일 (같은 파일에 다시 저장하면 바뀐 부분만 덧붙임)
+        self.image_cache = ImageCache()  # 디코딩한 이미지 캐시 (같은 폴더의 앞뒤 이미지는 미리 읽어 둠)
+        self.image_path = None  # 지금 편집 중인 이미지 파일 (이전/다음 이미지 넘기기 기준)
+        self.showing_preview = False  # 전체 디코딩이 끝나기 전 축소 미리보기를 보여주는 중
+        self.export_queue = ExportQueue()  # 저장/내보내기 인코딩 (편집을 막지 않고 백그라운드에서 실행)
+        self.export_options = dict(EXPORT_DEFAULTS)  # 형식별 인코딩 설정 (PNG 압축, JPEG 품질 등)
+        self.document_detector = DocumentDetector()  # 원근 변환용 문서 윤곽 (이미지 버전마다 한 번만 찾음)
+        self.geometry_session = None  # 이어서 적용한 기하 변환 (적용 직후 이미지 버전, 변환 전 이미지, 변환 목록)
+        self.rotation_replaces = False  # 회전 슬라이더가 직전 회전을 대신하는지 (슬라이더 각도는 그 회전 전 기준)
+        self.threshold_engine = ThresholdEngine()  # 스레시홀드용 흑백/적분 영상 캐시 (이미지 버전마다 한 번만 만듦)
+        self.threshold_settings = {"block_size": 11, "c": 10, "method": "mean"}  # 마지막으로 적용한 스레시홀드 설정
+        self.blur_engine = blurs.BlurEngine()  # 블러 미리보기용 조각/적분 영상 캐시 (화면에 보이는 선택 영역마다 한 번만 만듦)
+        self.blur_roi = None  # 캔버스에서 고른 블러 영역 (원본 좌표 x, y, w, h)
+        self.blur_drag = None  # 블러 영역을 끌기 시작한 화면 좌표
         self.initUI()
-
-    def add_to_history(self):
-        # 현재 상태를 작업 히스토리에 추가
-        if len(self.history) > self.history_index + 1:
-            self.history = self.history[:self.history_index + 1]
-        self.history.append(self.image.copy())
-        self.history_index += 1
+        self.start_graph("새 캔버스")
+
+    def add_to_history(self, region=None, label="", op=None, record=None, node=None):
+        # 현재 상태를 작업 히스토리에 추가 (변경된 타일만 저장)
+        # region: (x, y, w, h) 변경 영역을 알면 그 영역만 비교
+        # op: (작업 이름, 파라미터) 파라미터로 다시 계산할 수 있는 작업이면 작업 그래프에 노드로 기록
+        # record: 획처럼 다시 그릴 수 있는 편집이면 픽셀 대신 기록만 저장 (strokes.Stroke)
+        # node: 작업 그래프에 이미 만든 노드 (작업 수정으로 만든 새 가지의 끝). 새 노드를 더하지 않고 현재 노드로 삼음
+        # 이어서 적용할 기하 변환은 새 히스토리 단계 전의 것이므로 변환 전 이미지(원본 해상도)를 바로 놓아줌
+        # (기하 변환이면 apply_geometry 가 이 단계를 기록한 뒤 다시 정함)
+        self.geometry_session = None
+        if record is not None:
+            if not self.history.commit_record(self.image, record, label=label):
+                return
+        elif not self.history.commit(self.image, region=region, label=label):
+            return
+        step = self.history.last_step()
+        if step is None or self.graph is None:
+            return
+        if node is None:
+            node = self.graph_node(step, label, op, record)
+        self.graph_head = node
+        step.meta = (self.graph, node)
+
+    def graph_node(self, step, label, op, record):
+        # 새 히스토리 단계를 작업 그래프에 기록할 노드
+        if op is not None:
+            name, params = op
+            return self.graph.add(name, params, self.graph_head, result=self.image)
+        if record is not None:
+            return self.graph.add("record", {"label": label or record.describe(), "record": record},
+                                  self.graph_head)
+        if step.kind == "tiles":
+            # 그리기 등 파라미터가 없는 편집은 바뀐 픽셀만 patch 노드로 기록
+            parts = pack_patch(self.image, self.history.changed_pixels(step))
+            return self.graph.add("patch", {"label": label or "픽셀 편집", "parts": parts}, self.graph_head)
+        return self.graph.add("replace", {"label": label or "이미지 교체", "image": self.image.copy()},
+                              self.graph_head)
+
+    def start_graph(self, label):
+        # 현재 이미지를 원본으로 하는 새 작업 그래프 시작
+        self.graph = OpGraph(self.image)
+        self.graph_head = self.graph.source
+        self.history.commit(self.image, label=label, meta=(self.graph, self.graph_head))
+
+    def restore_graph_head(self):
+        meta = self.history.current_meta()
+        if meta is not None:
+            self.graph, self.graph_head = meta
+        else:
+            # 프로젝트 파일에서 불러온 단계에는 작업 그래프가 없으므로 현재 이미지를 원본으로 새로 시작
+            self.graph = OpGraph(self.image)
+            self.graph_head = self.graph.source
 
     def undo(self):
-        if self.history_index > 0:
-            self.history_index -= 1
-            self.image = self.history[self.history_index].copy()
+        self.geometry_session = None
+        image = self.history.undo(self.image)
+        if image is not None:
+            self.image = image
+            self.restore_graph_head()
             self.display_image()
 
     def redo(self):
-        if self.history_index < len(self.history) - 1:
-            self.history_index += 1
-            self.image = self.history[self.history_index].copy()
+        self.geometry_session = None
+        image = self.history.redo(self.image)
+        if image is not None:
+            self.image = image
+            self.restore_graph_head()
+            self.display_image()
+
+    def show_operation_graph(self):
+        # 작업 내역을 보여주고 앞쪽 작업의 파라미터를 바꾸면 뒤쪽 작업만 다시 계산
+        if self.graph_head is None:
+            return
+        chain = self.graph_head.chain()
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("작업 내역")
+        layout = QVBoxLayout()
+
+        node_list = QListWidget()
+        node_list.addItems(["원본" if n.op == "source" else n.describe() for n in chain])
+        layout.addWidget(node_list)
+
+        params_field = QLineEdit()
+        params_field.setPlaceholderText("파라미터 (예: angle=90, ksize=25)")
+        layout.addWidget(params_field)
+        enabled_check = QCheckBox("사용")
+        layout.addWidget(enabled_check)
+
+        def editable_params(node):
+            return {k: v for k, v in node.params.items()
+                    if k != "label" and not isinstance(v, (np.ndarray, list))}
+
+        def on_select(row):
+            node = chain[row]
+            editable = node.op not in ("source", "patch", "replace", "record")
+            params_field.setEnabled(editable)
+            params_field.setText(", ".join(f"{k}={v!r}" for k, v in editable_params(node).items())
+                                 if editable else "")
+            enabled_check.setEnabled(node.op != "source")
+            enabled_check.setChecked(node.enabled)
+
+        def on_apply():
+            row = node_list.currentRow()
+            if row <= 0:
+                return
+            node = chain[row]
+            params = {}
+            if params_field.isEnabled():
+                allowed = editable_params(node)
+                try:
+                    for item in ast.parse(f"dict({params_field.text()})", mode="eval").body.keywords:
+                        if item.arg not in allowed:
+                            raise ValueError(f"없는 파라미터: {item.arg}")
+                        try:
+                            params[item.arg] = ast.literal_eval(item.value)
+                        except ValueError:
+                            params[item.arg] = ast.get_source_segment(f"dict({params_field.text()})", item.value)
+                except (SyntaxError, ValueError) as e:
+                    QMessageBox.warning(dialog, "경고", f"파라미터를 해석할 수 없습니다.\n{e}")
+                    return
+            head = self.graph.branch(self.graph_head, node, enabled=enabled_check.isChecked(), **params)
+            self.image = np.array(self.graph.evaluate(head))
             self.display_image()
+            self.add_to_history(label="작업 수정", node=head)
+            dialog.accept()
+
+        node_list.currentRowChanged.connect(on_select)
+        apply_button = QPushButton("적용")
+        apply_button.clicked.connect(on_apply)
+        layout.addWidget(apply_button)
+        node_list.setCurrentRow(len(chain) - 1)
+
+        dialog.setLayout(layout)
+        dialog.exec_()
+
+    def show_history_memory(self):
+        # 단계별 히스토리 메모리 사용량 표시
+        summary = self.history.summary()
+        lines = [
+            f"상태 수: {summary['states']} (현재 {summary['index']})",
+            f"현재 이미지 사본: {summary['base_bytes'] / 1024:.1f} KB",
+            f"메모리: {summary['memory_bytes'] / 1024:.1f} KB / 디스크: {summary['disk_bytes'] / 1024:.1f} KB",
+            "",
+        ]
+        for r in summary["steps"][-20:]:
+            lines.append(f"#{r['step']} {r['label'] or r['kind']}: 타일 {r['tiles']}개, "
+                         f"{r['bytes'] / 1024:.1f} KB ({r['location']})")
+        QMessageBox.information(self, "히스토리 메모리", "\n".join(lines))
+
+    def when_idle(self, func):
+        # 이미지를 바꾸는 메뉴/버튼 동작은 실행 중인 작업이 끝난 뒤에 실행
+        return lambda *args: self.jobs.defer(func)
+
+    def editing_blocked(self):
+        # 캔버스 마우스 편집은 미루지 않고 작업이 끝날 때까지 막음
+        if self.jobs.busy():
+            self.statusBar().showMessage(f"'{self.jobs.active.label}' 작업이 끝난 뒤에 편집할 수 있습니다.", 2000)
+            return True
+        return False
+
+    def start_job(self, label, func, *args, on_done=None):
+        """
+        func(job, *args) 를 작업 스레드에서 실행하고, 끝나면 on_done(결과) 를 UI 스레드에서 호출
+        on_done 안에서 이미지 교체, 히스토리 기록, 화면 갱신을 한 번에 처리한다.
+        """
+        version = self.image_version
+        func = profiling.traced(f"작업: {label}", "job")(func)  # 작업 스레드에서 걸린 시간 (꺼져 있으면 그대로 호출)
+
+        def done(result):
+            if self.image_version != version:
+                # 작업 중에 이미지가 바뀌었다면 결과를 반영하지 않음
+                self.statusBar().showMessage(f"'{label}' 결과를 버렸습니다 (이미지가 바뀜).", 3000)
+                return
+            if on_done is not None:
+                on_done(result)
+
+        def failed(error):
+            QMessageBox.critical(self, "오류", f"{label} 중 오류가 발생했습니다.\n{error}")
+
+        return self.jobs.submit(label, func, *args, on_done=done, on_error=failed)
+
+    def on_job_started(self, job):
+        self.job_progress.setRange(0, 0)  # 진행률을 알기 전에는 바쁨 표시
+        self.job_progress.setFormat(job.label)
+        self.job_progress.show()
+        self.job_cancel_button.show()
+        self.statusBar().showMessage(f"{job.label} 중...")
+
+    def on_job_progress(self, job, fraction):
+        if fraction > 0:
+            self.job_progress.setRange(0, 100)
+            self.job_progress.setValue(int(fraction * 100))
+
+    def on_job_finished(self, job, status):
+        self.job_progress.hide()
+        self.job_cancel_button.hide()
+        elapsed = time.perf_counter() - job.started_at
+        if status != "done" and self.showing_preview:
+            # 열기가 취소되거나 실패하면 미리보기 대신 원래 이미지를 다시 표시
+            self.showing_preview = False
+            self.image_label.set_image(self.image)
+        if status != "done":
+            # 합성 등 백그라운드 작업의 미리보기 오버레이를 지움
+            self.image_label.clear_overlay()
+        if status == "done":
+            self.statusBar().showMessage(f"{job.label} 완료 ({elapsed:.2f}s)", 3000)
+        elif status == "cancelled":
+            self.statusBar().showMessage(f"{job.label} 취소됨", 3000)
+        else:
+            self.statusBar().clearMessage()
+
+    def closeEvent(self, event):
+        self.jobs.shutdown()
+        self.export_queue.shutdown()
+        trace_path = os.environ.get("IMAGE_EDITOR_TRACE")
+        if trace_path and PROFILER.events:
+            PROFILER.save(trace_path)
+        self.image_cache.shutdown()
+        self.history.close()
+        super().closeEvent(event)
 
 
     def initUI(self):
@@ -67,20 +321,56 @@ class ImageEditor(QMainWindow):
         # 메뉴바
         menubar = self.menuBar()
         file_menu = menubar.addMenu("파일")
+        edit_menu = menubar.addMenu("편집")
         help_menu = menubar.addMenu("도움말")
 
         open_action = QAction("열기", self)
-        open_action.triggered.connect(self.open_image)
+        open_action.triggered.connect(self.when_idle(self.open_image))
         file_menu.addAction(open_action)
 
+        next_image_action = QAction("다음 이미지", self)
+        next_image_action.setShortcut(QKeySequence(Qt.Key_PageDown))
+        next_image_action.triggered.connect(self.when_idle(lambda: self.browse(1)))
+        file_menu.addAction(next_image_action)
+
+        prev_image_action = QAction("이전 이미지", self)
+        prev_image_action.setShortcut(QKeySequence(Qt.Key_PageUp))
+        prev_image_action.triggered.connect(self.when_idle(lambda: self.browse(-1)))
+        file_menu.addAction(prev_image_action)
+
         save_action = QAction("다른 이름으로 저장", self)
-        save_action.triggered.connect(self.save_image)
+        save_action.triggered.connect(self.when_idle(self.save_image))
         file_menu.addAction(save_action)
 
+        export_action = QAction("여러 형식으로 내보내기", self)
+        export_action.triggered.connect(self.when_idle(self.export_multiple))
+        file_menu.addAction(export_action)
+
+        export_options_action = QAction("내보내기 설정", self)
+        export_options_action.triggered.connect(self.show_export_options)
+        file_menu.addAction(export_options_action)
+
+        open_project_action = QAction("프로젝트 열기", self)
+        open_project_action.triggered.connect(self.when_idle(self.open_project))
+        file_menu.addAction(open_project_action)
+
+        save_project_action = QAction("프로젝트 저장", self)
+        save_project_action.setShortcut(QKeySequence("Ctrl+S"))
+        save_project_action.triggered.connect(self.when_idle(self.save_project))
+        file_menu.addAction(save_project_action)
+
+        save_project_as_action = QAction("프로젝트 다른 이름으로 저장", self)
+        save_project_as_action.triggered.connect(self.when_idle(lambda: self.save_project(save_as=True)))
+        file_menu.addAction(save_project_as_action)
+
         reset_action = QAction("새 캔버스", self)
-        reset_action.triggered.connect(self.reset_canvas)
+        reset_action.triggered.connect(self.when_idle(self.reset_canvas))
         file_menu.addAction(reset_action)
 
+        graph_action = QAction("작업 내역", self)
+        graph_action.triggered.connect(self.when_idle(self.show_operation_graph))
+        edit_menu.addAction(graph_action)
+
         exit_action = QAction("종료", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -89,15 +379,46 @@ class ImageEditor(QMainWindow):
         about_action.triggered.connect(self.show_about_popup)
         help_menu.addAction(about_action)
 
+        history_memory_action = QAction("히스토리 메모리", self)
+        history_memory_action.triggered.connect(self.show_history_memory)
+        help_menu.addAction(history_memory_action)
+
+        export_log_action = QAction("내보내기 기록", self)
+        export_log_action.triggered.connect(self.show_export_log)
+        help_menu.addAction(export_log_action)
+
+        profile_menu = help_menu.addMenu("성능 측정")
+        self.profile_action = QAction("측정 켜기", self, checkable=True)
+        self.profile_action.setChecked(PROFILER.enabled)
+        self.profile_action.toggled.connect(self.toggle_profiling)
+        profile_menu.addAction(self.profile_action)
+        self.profile_memory_action = QAction("메모리 할당 측정 (느림)", self, checkable=True)
+        self.profile_memory_action.setChecked(PROFILER.track_memory)
+        self.profile_memory_action.toggled.connect(self.toggle_profiling)
+        profile_menu.addAction(self.profile_memory_action)
+        profile_overlay_action = QAction("화면에 표시", self, checkable=True)
+        profile_overlay_action.toggled.connect(self.toggle_profile_overlay)
+        profile_menu.addAction(profile_overlay_action)
+        profile_save_action = QAction("트레이스 저장 (Chrome JSON)", self)
+        profile_save_action.triggered.connect(self.save_profile_trace)
+        profile_menu.addAction(profile_save_action)
+        profile_clear_action = QAction("기록 지우기", self)
+        profile_clear_action.triggered.connect(PROFILER.clear)
+        profile_menu.addAction(profile_clear_action)
+
+        latency_action = QAction("브러쉬 지연 시간", self)
+        latency_action.triggered.connect(self.show_stroke_latency)
+        help_menu.addAction(latency_action)
+
         # Undo/Redo 단축키
         undo_action = QAction("되돌리기", self)
         undo_action.setShortcut(QKeySequence("Ctrl+Z"))
-        undo_action.triggered.connect(self.undo)
+        undo_action.triggered.connect(self.when_idle(self.undo))
         self.addAction(undo_action)
 
         redo_action = QAction("다시 실행", self)
         redo_action.setShortcut(QKeySequence("Ctrl+Y"))
-        redo_action.triggered.connect(self.redo)
+        redo_action.triggered.connect(self.when_idle(self.redo))
         self.addAction(redo_action)
 
         # 메인 레이아웃
@@ -125,11 +446,11 @@ class ImageEditor(QMainWindow):
         tool_layout.addWidget(self.paint_button, 3, 0)
 
         self.blur_button = QPushButton("블러 처리")
-        self.blur_button.clicked.connect(self.apply_blur)
+        self.blur_button.clicked.connect(self.set_blur_mode)
         tool_layout.addWidget(self.blur_button, 4, 0)
 
         self.invert_button = QPushButton("색 반전")
-        self.invert_button.clicked.connect(self.apply_color_inversion)
+        self.invert_button.clicked.connect(self.when_idle(self.apply_color_inversion))
         tool_layout.addWidget(self.invert_button, 5, 0)
 
         self.zoom_button = QPushButton("확대/축소")
@@ -149,12 +470,12 @@ class ImageEditor(QMainWindow):
         tool_layout.addWidget(self.diagram_button, 9, 0)
 
         self.perspective_button = QPushButton("원근 변환")
-        self.perspective_button.clicked.connect(self.apply_perspective_transform)
+        self.perspective_button.clicked.connect(self.when_idle(self.apply_perspective_transform))
         self.perspective_button.setEnabled(False)  # 초기에는 비활성화
         tool_layout.addWidget(self.perspective_button, 10, 0)
 
         self.grayscale_button = QPushButton("흑백 변환")
-        self.grayscale_button.clicked.connect(self.apply_grayscale)
+        self.grayscale_button.clicked.connect(self.when_idle(self.apply_grayscale))
         self.grayscale_button.setEnabled(False)  # 초기에는 비활성화
         tool_layout.addWidget(self.grayscale_button, 11, 0)
 
@@ -163,19 +484,19 @@ class ImageEditor(QMainWindow):
         tool_layout.addWidget(self.radial_distortion_button, 12, 0)
 
         self.auto_correction_button = QPushButton("자동보정")
-        self.auto_correction_button.clicked.connect(self.apply_auto_correction)
+        self.auto_correction_button.clicked.connect(self.when_idle(self.apply_auto_correction))
         tool_layout.addWidget(self.auto_correction_button, 13, 0)
 
         self.reprojection_button = QPushButton("역투영")
-        self.reprojection_button.clicked.connect(self.apply_reprojection)
+        self.reprojection_button.clicked.connect(self.when_idle(self.apply_reprojection))
         tool_layout.addWidget(self.reprojection_button, 14, 0)
 
         self.composite_button = QPushButton("합성")
-        self.composite_button.clicked.connect(self.composite_images)
+        self.composite_button.clicked.connect(self.when_idle(self.composite_images))
         tool_layout.addWidget(self.composite_button, 15, 0)
 
         self.threshold_button = QPushButton("스레시홀드", self)
-        self.threshold_button.clicked.connect(self.apply_threshold)
+        self.threshold_button.clicked.connect(self.when_idle(self.apply_threshold))
         tool_layout.addWidget(self.threshold_button, 16, 0)
 
         tool_layout.setAlignment(Qt.AlignTop)
@@ -206,6 +527,19 @@ class ImageEditor(QMainWindow):
         self.slider_layout.addWidget(self.brush_size_label)
         self.brush_size_label.setFixedHeight(23)  # 높이 고정
 
+        # 채우기 허용 오차 (채우기 모드에서만 보임)
+        self.fill_tolerance_label = QLabel("채우기 허용 오차:")
+        self.fill_tolerance_label.setFixedHeight(20)
+        self.fill_tolerance_spinbox = QSpinBox()
+        self.fill_tolerance_spinbox.setFixedHeight(23)
+        self.fill_tolerance_spinbox.setRange(0, 255)
+        self.fill_tolerance_spinbox.setValue(self.fill_tolerance)
+        self.fill_tolerance_spinbox.valueChanged.connect(self.update_fill_tolerance)
+        self.slider_layout.addWidget(self.fill_tolerance_label)
+        self.slider_layout.addWidget(self.fill_tolerance_spinbox)
+        self.fill_tolerance_label.setVisible(False)
+        self.fill_tolerance_spinbox.setVisible(False)
+
         right_layout.addLayout(self.slider_layout)
 
         # 텍스트 설정 영역 (초기에는 숨김)
@@ -243,13 +577,13 @@ class ImageEditor(QMainWindow):
 
         # 회전 설정 영역 (초기 숨김)
         self.rotate_ccw_button = QPushButton("🔄️")
-        self.rotate_ccw_button.clicked.connect(self.rotate_counter_clockwise)
+        self.rotate_ccw_button.clicked.connect(self.when_idle(self.rotate_counter_clockwise))
         self.rotate_ccw_button.setFixedWidth(30)
         self.rotate_ccw_button.setFixedHeight(23)
         self.rotate_ccw_button.setVisible(False)
 
         self.rotate_cw_button = QPushButton("🔃")
-        self.rotate_cw_button.clicked.connect(self.rotate_clockwise)
+        self.rotate_cw_button.clicked.connect(self.when_idle(self.rotate_clockwise))
         self.rotate_cw_button.setFixedWidth(30)
         self.rotate_cw_button.setFixedHeight(23)
         self.rotate_cw_button.setVisible(False)
@@ -267,11 +601,62 @@ class ImageEditor(QMainWindow):
         self.label_rotate_cw.setFixedWidth(35)
         self.label_rotate_cw.setVisible(False)
 
-        self.slider_layout.addWidget(self.label_rotate_ccw, 0)
-        self.slider_layout.addWidget(self.rotate_ccw_button, 1)
-        self.slider_layout.addWidget(self.label_separator, 2)
-        self.slider_layout.addWidget(self.label_rotate_cw, 3)
-        self.slider_layout.addWidget(self.rotate_cw_button, 4)
+        # 뒤집기 (90도 회전과 함께 손실 없음)
+        self.flip_h_button = QPushButton("↔")
+        self.flip_h_button.clicked.connect(self.when_idle(lambda: self.apply_flip("horizontal")))
+        self.flip_h_button.setFixedWidth(30)
+        self.flip_h_button.setFixedHeight(23)
+        self.flip_v_button = QPushButton("↕")
+        self.flip_v_button.clicked.connect(self.when_idle(lambda: self.apply_flip("vertical")))
+        self.flip_v_button.setFixedWidth(30)
+        self.flip_v_button.setFixedHeight(23)
+
+        # 임의 각도 (0.1도 단위). 움직이는 동안은 화면용 프록시로 미리보기만 하고 적용할 때 한 번만 보간
+        self.rotate_angle_slider = QSlider(Qt.Horizontal)
+        self.rotate_angle_slider.setRange(-1800, 1800)
+        self.rotate_angle_slider.setFixedHeight(23)
+        self.rotate_angle_slider.valueChanged.connect(self.preview_rotation)
+        self.rotate_angle_label = QLabel("0.0°")
+        self.rotate_angle_label.setFixedHeight(23)
+        self.rotate_angle_label.setFixedWidth(45)
+        self.rotate_expand_check = QCheckBox("캔버스 확장")
+        self.rotate_expand_check.setFixedHeight(23)
+        self.rotate_expand_check.toggled.connect(self.preview_rotation)
+        self.rotate_apply_button = QPushButton("적용")
+        self.rotate_apply_button.setFixedHeight(23)
+        self.rotate_apply_button.clicked.connect(
+            self.when_idle(lambda: self.apply_rotation(self.rotate_angle_slider.value() / 10)))
+
+        self.rotate_widgets = [self.label_rotate_ccw, self.rotate_ccw_button, self.label_separator,
+                               self.label_rotate_cw, self.rotate_cw_button, self.flip_h_button, self.flip_v_button,
+                               self.rotate_angle_slider, self.rotate_angle_label, self.rotate_expand_check,
+                               self.rotate_apply_button]
+        for widget in self.rotate_widgets:
+            widget.setVisible(False)
+            self.slider_layout.addWidget(widget)
+
+        # 블러 설정 영역 (초기 숨김). 캔버스에서 영역을 끌어 고른 뒤 슬라이더를 움직이면 그 영역에 바로 미리보기
+        self.blur_mode_combo = QComboBox()
+        self.blur_mode_combo.setFixedHeight(23)
+        for text, mode in zip(("상자", "가우시안", "양방향"), blurs.MODES):
+            self.blur_mode_combo.addItem(text, mode)
+        self.blur_mode_combo.currentIndexChanged.connect(self.preview_blur)
+        self.blur_radius_slider = QSlider(Qt.Horizontal)
+        self.blur_radius_slider.setRange(1, blurs.MAX_RADIUS)
+        self.blur_radius_slider.setValue(7)  # 이전의 15x15 상자 블러
+        self.blur_radius_slider.setFixedHeight(23)
+        self.blur_radius_slider.valueChanged.connect(self.preview_blur)
+        self.blur_radius_label = QLabel("7px")
+        self.blur_radius_label.setFixedHeight(23)
+        self.blur_radius_label.setFixedWidth(45)
+        self.blur_apply_button = QPushButton("적용")
+        self.blur_apply_button.setFixedHeight(23)
+        self.blur_apply_button.clicked.connect(self.when_idle(self.apply_blur))
+        self.blur_widgets = [self.blur_mode_combo, self.blur_radius_slider, self.blur_radius_label,
+                             self.blur_apply_button]
+        for widget in self.blur_widgets:
+            widget.setVisible(False)
+            self.slider_layout.addWidget(widget)
 
 
 
@@ -285,20 +670,20 @@ class ImageEditor(QMainWindow):
         self.triangle_button.setFixedHeight(23)
         self.triangle_button.setVisible(False)
 
-        self.rectangle_button.clicked.connect(lambda: self.select_shape('rectangle'))
-        self.circle_button.clicked.connect(lambda: self.select_shape('circle'))
-        self.triangle_button.clicked.connect(lambda: self.select_shape('triangle'))
+        self.rectangle_button.clicked.connect(self.when_idle(lambda: self.select_shape('rectangle')))
+        self.circle_button.clicked.connect(self.when_idle(lambda: self.select_shape('circle')))
+        self.triangle_button.clicked.connect(self.when_idle(lambda: self.select_shape('triangle')))
 
         self.slider_layout.addWidget(self.rectangle_button)
         self.slider_layout.addWidget(self.circle_button)
         self.slider_layout.addWidget(self.triangle_button)
 
-        # 캔버스 영역
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)  # 왼쪽 상단 정렬
+        # 캔버스 영역 (왼쪽 상단 기준, 바뀐 영역만 다시 그림)
+        self.image_label = Canvas()
         self.image_label.mousePressEvent = self.start_action
         self.image_label.mouseMoveEvent = self.draw
         self.image_label.mouseReleaseEvent = self.stop_action
+        self.blur_band = QRubberBand(QRubberBand.Rectangle, self.image_label)  # 블러 영역을 끄는 동안의 사각형
 
         # 캔버스를 right_layout에 추가
         right_layout.addWidget(self.image_label)
@@ -309,6 +694,31 @@ class ImageEditor(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
 
+        # 상태 표시줄: 백그라운드 작업 진행률과 취소 버튼
+        self.job_progress = QProgressBar()
+        self.job_progress.setFixedWidth(200)
+        self.job_progress.setTextVisible(True)
+        self.job_progress.hide()
+        self.job_cancel_button = QPushButton("취소")
+        self.job_cancel_button.clicked.connect(self.jobs.cancel)
+        self.job_cancel_button.hide()
+        self.statusBar().addPermanentWidget(self.job_progress)
+        self.statusBar().addPermanentWidget(self.job_cancel_button)
+        self.jobs.started.connect(self.on_job_started)
+        self.jobs.progress.connect(self.on_job_progress)
+        self.jobs.finished.connect(self.on_job_finished)
+        self.export_finished.connect(self.on_export_finished)
+
+        # 성능 측정 오버레이 (캔버스 위 반투명 글상자, 켜져 있을 때만 주기적으로 갱신)
+        self.profile_overlay = QLabel(self.image_label)
+        self.profile_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 160); color: white; font-family: monospace; padding: 4px;")
+        self.profile_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.profile_overlay.hide()
+        self.profile_timer = QTimer(self)
+        self.profile_timer.setInterval(500)
+        self.profile_timer.timeout.connect(self.update_profile_overlay)
+
         self.display_image()
 
     def set_text_mode(self):
@@ -402,31 +812,18 @@ class ImageEditor(QMainWindow):
         if not text:  # 텍스트가 없으면 기본 텍스트 삽입
             text = "Hello"
 
-        # 한글인지 영어인지 확인
-        if any('\uac00' <= char <= '\ud7af' for char in text):
-            pil_image = Image.fromarray(cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB))
-            draw = ImageDraw.Draw(pil_image)
-
-            try:
-                font_path = "C:/Windows/Fonts/malgun.ttf"
-                font = ImageFont.truetype(font_path, self.font_size)
-            except IOError:
-                font = ImageFont.load_default()
-
+        # 화면에 보이는 크기대로 원본 해상도에 맞춰 글꼴 크기 조정
+        font_size = max(1, int(round(self.font_size / self.image_label.scale)))
 
-            # 텍스트 크기 및 색상 설정
-            draw.text((position.x(), position.y()), text, font=font, fill=(self.brush_color[2], self.brush_color[1], self.brush_color[0]))
-
-            # 수정된 이미지를 다시 OpenCV 배열로 변환
-            self.image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        else:
-            # 한글이 아닐 경우 cv2.putText() 사용
-            font_scale = self.font_size / 20  # 글꼴 크기 비율에 맞게 font_scale 계산
-            cv2.putText(self.image, text, (position.x(), position.y()), self.font_face, font_scale, 
-                        (self.brush_color[2], self.brush_color[1], self.brush_color[0]), 2, cv2.LINE_AA)
-
-        self.add_to_history()
-        self.display_image()
+        thickness = max(1, int(round(2 / self.image_label.scale)))
+        # 글자가 들어가는 사각형 안에서만 제자리에 그리고, 그 영역만 히스토리 비교와 화면 갱신
+        _, rect = imageops.draw_text(self.image, text, (position.x(), position.y()), font_size,
+                                     self.brush_color, self.font_face, thickness, out=self.image)
+        x, y, w, h = rect
+        if w == 0 or h == 0:
+            return
+        self.update_canvas_region(x, y, x + w - 1, y + h - 1)
+        self.add_to_history(region=rect, label="텍스트")
 
 
     def toggle_zoom_mode(self):
@@ -435,35 +832,105 @@ class ImageEditor(QMainWindow):
     def open_image(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "이미지 열기", "", "Images (*.png *.jpg *.jpeg *.bmp)")
         if file_path:
-            data = np.fromfile(file_path, dtype=np.uint8)
-            self.image = cv2.imdecode(data, cv2.IMREAD_COLOR)
-            if self.image is None:
+            self.load_image_file(file_path)
+
+    def load_image_file(self, file_path):
+        # 캐시에 있으면 바로 열고, 없으면 축소 디코딩한 미리보기를 먼저 보여준 뒤 작업 스레드에서 전체를 디코딩
+        if self.image_cache.contains(file_path):
+            self.set_loaded_image(file_path, self.image_cache.get(file_path))
+            return
+        preview = read_preview(file_path, max(VIEW_SIZE))
+        if preview is None:
+            QMessageBox.critical(self, "오류", "이미지를 불러올 수 없습니다.")
+            return
+        self.showing_preview = True
+        self.image_label.set_image(preview)
+
+        def work(job, path):
+            # 디코딩은 나눌 수 없으므로 디코딩이 끝난 뒤 취소를 확인하고 편집할 복사본을 만듦
+            image = self.image_cache.get(path, copy=False)
+            if image is None:
+                return None
+            job.report(0.9)
+            return image.copy()
+
+        def done(image):
+            self.showing_preview = False
+            if image is None:
+                self.image_label.set_image(self.image)
                 QMessageBox.critical(self, "오류", "이미지를 불러올 수 없습니다.")
                 return
-            self.image = cv2.resize(self.image, (900, 700),interpolation=cv2.INTER_CUBIC)
-            self.image_loaded = True
-            self.perspective_button.setEnabled(True)
-            self.grayscale_button.setEnabled(True)
-            self.add_to_history()
-            self.display_image()
+            self.set_loaded_image(file_path, image)
+
+        self.start_job("열기", work, file_path, on_done=done)
+
+    def set_loaded_image(self, file_path, image):
+        # 원본 해상도 그대로 편집 (화면에는 피라미드 프록시로 표시)
+        self.image = image
+        self.image_path = file_path
+        self.project = None  # 프로젝트가 아닌 문서로 바뀌었으므로 Ctrl+S 가 이전 프로젝트 파일을 덮어쓰지 않도록
+        self.image_loaded = True
+        self.perspective_button.setEnabled(True)
+        self.grayscale_button.setEnabled(True)
+        self.start_graph("열기")
+        self.display_image()
+        self.image_cache.prefetch_neighbours(file_path)
+
+    def browse(self, step):
+        # 같은 폴더의 이전/다음 이미지 열기
+        if self.image_path is None:
+            return
+        path = neighbour(self.image_path, step)
+        if path is not None and os.path.abspath(path) != os.path.abspath(self.image_path):
+            self.load_image_file(path)
 
     def reset_canvas(self):
         self.image = np.ones((700, 900, 3), dtype=np.uint8) * 255
         self.image_loaded = False
+        self.image_path = None
+        self.project = None
         self.perspective_button.setEnabled(False)
         self.grayscale_button.setEnabled(False)
-        self.add_to_history()
+        self.start_graph("새 캔버스")
         self.display_image()
 
     def display_image(self):
         if self.image is not None:
-            height, width, channel = self.image.shape
-            bytes_per_line = channel * width
-            q_image = QImage(self.image.data, width, height, bytes_per_line, QImage.Format_BGR888)
-            pixmap = QPixmap.fromImage(q_image)
-
-            # QLabel에 이미지를 표시
-            self.image_label.setPixmap(pixmap)
+            # 캔버스에 이미지 전체를 표시 (부분 변경은 update_canvas_region 사용)
+            self.image_version += 1
+            self.image_label.set_image(self.image)
+
+    def update_canvas_region(self, x0, y0, x1, y1):
+        # 원본의 바뀐 영역만 표시용 프록시에 반영해 다음 화면 프레임에 다시 그림
+        self.image_version += 1
+        self.image_label.mark_dirty(x0, y0, x1, y1)
+
+    def select_roi(self, window_name):
+        # 지금 화면에 보이는 부분(뷰포트)에서 ROI 를 고른 뒤 원본 좌표로 변환
+        proxy = self.image_label.display_array()
+        roi = cv2.selectROI(window_name, proxy, showCrosshair=True, fromCenter=False)
+        if roi[2] == 0 or roi[3] == 0:
+            return tuple(int(v) for v in roi)
+        h, w = self.image.shape[:2]
+        x0, y0 = self.image_label.map_to_image(roi[0], roi[1])
+        x1, y1 = self.image_label.map_to_image(roi[0] + roi[2], roi[1] + roi[3])
+        x1, y1 = min(w, max(x1, x0 + 1)), min(h, max(y1, y0 + 1))
+        return x0, y0, x1 - x0, y1 - y0
+
+    def show_stroke_latency(self):
+        stats = self.last_stroke_latency
+        if stats is None:
+            QMessageBox.information(self, "브러쉬 지연 시간", "측정된 획이 없습니다.")
+            return
+        h, w = self.image.shape[:2]
+        QMessageBox.information(
+            self, "브러쉬 지연 시간",
+            f"이미지 크기: {w}x{h} ({w * h / 1e6:.1f}MP)\n"
+            f"화면 갱신 {stats['count']}회\n"
+            f"평균 {stats['mean']:.2f}ms / p50 {stats['p50']:.2f}ms / "
+            f"p95 {stats['p95']:.2f}ms / 최대 {stats['max']:.2f}ms\n"
+            f"다시 그린 픽셀: {stats['repaint_pixels']:,}"
+        )
 
 
 
@@ -472,26 +939,35 @@ class ImageEditor(QMainWindow):
         self.brush_size_label.setText(f"{value}px")
 
     def set_zoom_mode(self):
+        self.hide_blur_tools()
         self.tool_mode = "zoom"
         self.zoom_mode = True
 
     def set_lens_mode(self):
+        self.hide_blur_tools()
         self.tool_mode = "lens"
         self.lens_mode = True
+        # 마우스를 누르지 않아도 이동 이벤트를 받아 렌즈 미리보기 표시
+        self.image_label.setMouseTracking(True)
 
     def start_action(self, event):
+        if event.button() == Qt.MiddleButton or (self.zoom_mode and event.button() == Qt.LeftButton):
+            # 가운데 버튼 드래그 (확대/축소 모드에서는 왼쪽 드래그) 로 화면 이동. 이미지 데이터는 그대로
+            self.image_label.begin_pan(event.x(), event.y())
+            self.pan_start = (event.x(), event.y())
+            return
+        if self.editing_blocked():
+            return
         if self.zoom_mode:
             self.apply_zoom(event)
         elif self.text_mode:  # 텍스트 모드일 때
-            self.text_position = event.pos()
+            self.text_position = QPoint(*self.image_label.map_to_image(event.x(), event.y()))
             self.text_mode = False  # 텍스트 입력 후 텍스트 모드 해제
             self.set_cursor(QCursor(Qt.ArrowCursor))  # 기본 커서로 돌아가기
-            self.add_text(event.pos())
+            self.add_text(self.text_position)
         elif self.lens_mode:  # 렌즈 왜곡 모드일 때
-            label_pos = event.pos()
-            image_pos = self.image_label.mapTo(self.image_label, label_pos)
-
-            x, y = image_pos.x(), image_pos.y()
+            # 화면 좌표를 원본 이미지 좌표로 변환
+            x, y = self.image_label.map_to_image(event.x(), event.y())
 
             h, w, _ = self.image.shape
             if 0 <= x < w and 0 <= y < h:
@@ -499,53 +975,88 @@ class ImageEditor(QMainWindow):
                     self.apply_lens_distortion(x, y, "convex")
                 elif event.button() == Qt.RightButton:  # 오목 렌즈 효과 (오른쪽 클릭)
                     self.apply_lens_distortion(x, y, "concave")
+        elif self.tool_mode == "blur":
+            if event.button() == Qt.LeftButton:
+                self.begin_blur_selection(event.x(), event.y())
         else:
-            label_pos = event.pos()
-            image_pos = self.image_label.mapTo(self.image_label, label_pos)
-
-            x, y = image_pos.x(), image_pos.y()
+            x, y = self.image_label.map_to_image(event.x(), event.y())
 
             h, w, _ = self.image.shape
             if 0 <= x < w and 0 <= y < h:
                 if self.filling:
-                    mask = np.zeros((h + 2, w + 2), np.uint8)
-                    
-                    # 색상 차이를 설정 (낮은 값과 높은 값으로 범위를 설정)
-                    loDiff = (3, 3, 3)  # 허용되는 최소 색상 차이 (B, G, R)
-                    upDiff = (5, 5, 5)  # 허용되는 최대 색상 차이 (B, G, R)
-                    
-                    # floodFill 실행
-                    cv2.floodFill(self.image, mask, (x, y), self.brush_color, loDiff=loDiff, upDiff=upDiff)
-                    
-                    self.add_to_history()
-                    self.display_image()
+                    # 영역 색인에서 클릭한 영역을 찾아 제자리에서 채우고, 채워진 영역의 사각형만 다시 그림
+                    fill = self.fill_index.fill(self.image, self.image_version, (x, y), self.brush_color,
+                                                self.fill_tolerance)
+                    rx, ry, rw, rh = fill.rect()
+                    self.update_canvas_region(rx, ry, rx + rw - 1, ry + rh - 1)
+                    self.fill_index.set_version(self.image_version)  # 채우기로 바뀐 부분은 색인에 이미 반영됨
+                    # 히스토리에는 픽셀 대신 채운 영역(비트마스크)만 저장
+                    self.add_to_history(label="채우기", record=fill)
                 else:
-                    self.drawing_path = []
                     self.last_point = (x, y)  # 그리기 시작
-                    self.drawing_path.append(self.last_point)
-                    self.add_to_history()
+                    self.drawing_path = [self.last_point]
+                    self.image_label.reset_latency()
+                    if self.tool_mode in ("brush", "eraser"):
+                        self.image_label.begin_proxy_stroke(self.last_point, self.stroke_color(), self.brush_size)
 
     def resizeEvent(self, event):
         event.ignore()
 
     def draw(self, event):
+        if self.image_label.is_panning():
+            self.image_label.pan_to(event.x(), event.y())
+            return
+        if self.lens_mode and event.buttons() == Qt.NoButton:
+            self.preview_lens_distortion(event.x(), event.y())
+            return
+        if self.tool_mode == "blur":
+            # 끄는 동안은 사각형만 그리고, 이미 고른 영역의 미리보기는 그대로 둠
+            if self.blur_drag is not None:
+                self.blur_band.setGeometry(QRect(QPoint(*self.blur_drag), event.pos()).normalized())
+            return
+        if self.image_label.has_overlay():
+            self.image_label.clear_overlay()
+
         if event.buttons() == Qt.LeftButton and self.last_point:
-            # 마우스 좌표 그대로 사용
-            current_point = (event.x(), event.y())
+            # 화면 좌표를 원본 이미지 좌표로 변환
+            current_point = self.image_label.map_to_image(event.x(), event.y())
 
-            if self.tool_mode == "brush":
-                cv2.line(self.image, self.last_point, current_point, self.brush_color, self.brush_size)
-                self.drawing_path.append(current_point)  # 경로에 점 추가
-            elif self.tool_mode == "eraser":
-                cv2.line(self.image, self.last_point, current_point, (255, 255, 255), self.brush_size)
+            # 획 도중에는 점만 모으고, 화면용 프록시에는 프레임마다 모인 점을 한 번에 그림
+            # 원본에는 획이 끝날 때 한 번에 반영
+            if self.tool_mode in ("brush", "eraser") and current_point != self.last_point:
+                self.image_label.add_proxy_point(current_point)
+                self.drawing_path.append(current_point)
 
             self.last_point = current_point
-            self.display_image()
+
+    def stroke_color(self):
+        return (255, 255, 255) if self.tool_mode == "eraser" else self.brush_color
+
+    def stroke_thickness(self):
+        # 브러쉬 크기는 화면 픽셀 기준이므로 원본 해상도에 맞게 변환
+        return max(1, int(round(self.brush_size / self.image_label.scale)))
 
     def stop_action(self, event):
-        if self.tool_mode == "brush" and self.last_point is not None:
+        if self.image_label.is_panning():
+            self.image_label.end_pan()
+            moved = abs(event.x() - self.pan_start[0]) + abs(event.y() - self.pan_start[1])
+            if self.zoom_mode and event.button() == Qt.LeftButton and moved < 3:
+                self.apply_zoom(event)  # 끌지 않고 클릭만 했으면 확대
+            return
+        if self.tool_mode == "blur" and self.blur_drag is not None:
+            self.end_blur_selection(event.x(), event.y())
+            return
+        if self.tool_mode in ("brush", "eraser") and self.last_point is not None:
             self.last_point = None
-            self.add_to_history()
+            self.image_label.end_proxy_stroke()
+            if len(self.drawing_path) > 1:
+                # 획 전체를 원본 해상도에 한 번에 그리고, 히스토리에는 픽셀 대신 획 기록만 저장
+                stroke = Stroke(self.tool_mode, self.drawing_path, self.stroke_color(), self.stroke_thickness())
+                x, y, w, h = stroke.apply(self.image)
+                self.update_canvas_region(x, y, x + w - 1, y + h - 1)
+                self.add_to_history(record=stroke)
+            self.drawing_path = []
+            self.last_stroke_latency = self.image_label.latency_stats()
 
     def set_fill_mode(self):
         self.hide_toolbars()
@@ -559,6 +1070,12 @@ class ImageEditor(QMainWindow):
             self.tool_mode = "brush"  # 그리기 모드로 전환
             self.filling = False  # 페인트 모드 비활성화
         self.reset_ui_for_brush_mode()
+        self.fill_tolerance_label.setVisible(self.filling)
+        self.fill_tolerance_spinbox.setVisible(self.filling)
+
+    def update_fill_tolerance(self, value):
+        # 허용 오차가 바뀌면 다음 채우기에서 영역 색인을 새로 만듦
+        self.fill_tolerance = value
 
     def set_eraser_mode(self):
         self.unvisibleRotate()
@@ -576,58 +1093,113 @@ class ImageEditor(QMainWindow):
             self.color_button.setStyleSheet(f"background-color: {color.name()}; border: 1px solid black;")
 
     def apply_zoom(self, event):
+        # 화면 배율만 바꾸는 확대/축소 (이미지 데이터와 히스토리는 바뀌지 않음, 휠로도 가능)
         if self.zoom_mode and event.button() in [Qt.LeftButton, Qt.RightButton]:
-            scale_factor = 1.2 if event.button() == Qt.LeftButton else 0.8
-
-            # 클릭 위치 가져오기
-            click_x, click_y = event.pos().x(), event.pos().y()
-            label_w, label_h = self.image_label.width(), self.image_label.height()
-            img_h, img_w, _ = self.image.shape
-
-            # 캔버스에서 이미지 좌표로 변환
-            img_click_x = int(click_x * img_w / label_w)
-            img_click_y = int(click_y * img_h / label_h)
+            scale_factor = self.zoom_factor if event.button() == Qt.LeftButton else 1 / self.zoom_factor
+            self.image_label.zoom_at(scale_factor, event.x(), event.y())
 
-            # 이미지 확대/축소
-            new_w, new_h = int(img_w * scale_factor), int(img_h * scale_factor)
-            resized_image = cv2.resize(self.image, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-
-            # 확대/축소된 이미지에서 클릭 위치 중심으로 이동
-            center_x = int(img_click_x * scale_factor)
-            center_y = int(img_click_y * scale_factor)
-
-            # 캔버스 크기 설정
-            canvas_w, canvas_h = 900, 700
-            canvas = np.ones((canvas_h, canvas_w, 3), dtype=np.uint8) * 255
+    def set_blur_mode(self):
+        self.unvisibleRotate()
+        self.hide_toolbars()
+        self.text_mode = False
+        self.zoom_mode = False
+        self.lens_mode = False
+        self.filling = False
+        self.tool_mode = "blur"
+        self.image_label.setMouseTracking(False)
+        for widget in [self.brush_size_text_label, self.slider, self.brush_size_label,
+                       self.font_label, self.font_combo, self.font_size_label,
+                       self.font_size_spinbox, self.text_input_field]:
+            widget.setVisible(False)
+        for widget in self.blur_widgets:
+            widget.setVisible(True)
 
-            # 중심 위치 계산
-            start_x = max(0, center_x - canvas_w // 2)
-            start_y = max(0, center_y - canvas_h // 2)
-            end_x = min(new_w, start_x + canvas_w)
-            end_y = min(new_h, start_y + canvas_h)
+    def hide_blur_tools(self):
+        # 블러 모드를 떠나면 적용하지 않은 영역과 미리보기를 버림
+        for widget in self.blur_widgets:
+            widget.setVisible(False)
+        self.blur_band.hide()
+        self.blur_drag = None
+        if self.blur_roi is not None:
+            self.blur_roi = None
+            self.image_label.clear_overlay()
+        self.blur_engine.clear()
+
+    def begin_blur_selection(self, x, y):
+        self.image_label.clear_overlay()
+        self.blur_roi = None
+        self.blur_drag = (x, y)
+        self.blur_band.setGeometry(QRect(x, y, 0, 0))
+        self.blur_band.show()
+
+    def end_blur_selection(self, x, y):
+        # 끈 사각형 (화면 좌표) 을 원본 좌표로 옮겨 선택 영역으로
+        self.blur_band.hide()
+        (sx, sy), self.blur_drag = self.blur_drag, None
+        h, w = self.image.shape[:2]
+        x0, y0 = self.image_label.map_to_image(min(sx, x), min(sy, y))
+        x1, y1 = self.image_label.map_to_image(max(sx, x), max(sy, y))
+        x0, y0 = min(max(0, x0), w), min(max(0, y0), h)
+        x1, y1 = min(max(0, x1), w), min(max(0, y1), h)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return
+        self.blur_roi = (x0, y0, x1 - x0, y1 - y0)
+        self.preview_blur()
+
+    def preview_blur(self):
+        # 선택 영역 중 화면에 보이는 부분만 화면 1px 간격으로 블러해 오버레이로 표시 (이미지는 적용할 때만 바뀜)
+        radius = self.blur_radius_slider.value()
+        self.blur_radius_label.setText(f"{radius}px")
+        canvas = self.image_label
+        proxy = canvas.display_array()
+        if self.blur_roi is None or proxy is None:
+            return
+        view_h, view_w = proxy.shape[:2]
+        h, w = self.image.shape[:2]
+        x, y, rw, rh = self.blur_roi
+        vx0, vy0 = canvas.map_to_image(0, 0)
+        vx1, vy1 = canvas.map_to_image(view_w, view_h)
+        x0, y0 = max(x, vx0), max(y, vy0)
+        x1, y1 = min(x + rw, vx1 + 1, w), min(y + rh, vy1 + 1, h)
+        if x1 <= x0 or y1 <= y0:
+            canvas.clear_overlay()
+            return
+        dx0, dy0 = canvas.map_to_display(x0, y0)
+        dx1, dy1 = canvas.map_to_display(x1, y1)
+        dx0, dy0 = max(0, dx0), max(0, dy0)
+        dx1, dy1 = min(view_w, dx1), min(view_h, dy1)
+        if dx1 <= dx0 or dy1 <= dy0:
+            canvas.clear_overlay()
+            return
+        # 영역이 그대로면 적분 영상/축소 조각은 다시 만들지 않음
+        self.blur_engine.prepare(self.image, self.image_version, (x0, y0, x1 - x0, y1 - y0))
+        step = max(1, int(1 / canvas.scale))
+        preview = self.blur_engine.render(self.blur_mode_combo.currentData(), radius * 2 + 1, step)
+        interpolation = cv2.INTER_AREA if preview.shape[1] > dx1 - dx0 else cv2.INTER_LINEAR
+        canvas.set_overlay(dx0, dy0, cv2.resize(preview, (dx1 - dx0, dy1 - dy0), interpolation=interpolation))
 
-            # 잘라낸 이미지를 캔버스에 복사
-            cropped_image = resized_image[start_y:end_y, start_x:end_x]
-            canvas[:end_y - start_y, :end_x - start_x] = cropped_image
+    def apply_blur(self):
+        # 고른 영역을 전체 해상도로 블러 (백그라운드 작업). 미리보기는 결과가 들어올 때까지 그대로 보여 줌
+        roi = self.blur_roi
+        if self.image is None or roi is None:
+            return
+        ksize = self.blur_radius_slider.value() * 2 + 1
+        mode = self.blur_mode_combo.currentData()
 
-            self.image = canvas
-            self.display_image()
-            self.add_to_history()
+        def work(job, image):
+            # 영역 주변만 읽어 영역 크기의 조각을 반환 (이미지 전체를 복사하지 않음)
+            return blurs.blur_region(image, roi, ksize, mode, progress=job.report)
 
+        def done(patch):
+            self.image_label.clear_overlay()
+            self.blur_roi = None
+            x, y, w, h = roi
+            self.image[y:y + h, x:x + w] = patch
+            self.add_to_history(region=roi, label="블러",
+                                op=("blur", {"roi": roi, "ksize": ksize, "mode": mode}))
+            self.update_canvas_region(x, y, x + w - 1, y + h - 1)
 
-    def apply_blur(self):
-        self.unvisibleRotate()
-        self.hide_toolbars()
-        self.zoom_mode = False
-        self.lens_mode = False
-        if self.image is not None:
-            roi = cv2.selectROI("Select ROI for Blur", self.image, showCrosshair=True, fromCenter=False)
-            if roi[2] > 0 and roi[3] > 0:
-                x, y, w, h = roi
-                self.image[y:y + h, x:x + w] = cv2.blur(self.image[y:y + h, x:x + w], (15, 15))
-                self.add_to_history()
-                self.display_image()
-            cv2.destroyWindow("Select ROI for Blur")
+        self.start_job("블러", work, self.image, on_done=done)
 
     def apply_perspective_transform(self):
         self.unvisibleRotate()
@@ -635,48 +1207,30 @@ class ImageEditor(QMainWindow):
         self.zoom_mode = False
         self.lens_mode = False
         if self.image is not None:
-            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            contours = sorted(contours, key=cv2.contourArea, reverse=True)
-
-            for cnt in contours:
-                approx = cv2.approxPolyDP(cnt, 0.02 * cv2.arcLength(cnt, True), True)
-                if len(approx) == 4:
-                    points = approx.reshape(4, 2)
-                    break
-            else:
-                return
+            version = self.image_version
 
-            width, height = 800, 600
-            points_dst = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype="float32")
+            def make_op(image):
+                quad = self.document_detector.detect(image, version)
+                # 찾은 꼭짓점은 이 입력에 대한 캐시: 같은 입력을 다시 계산할 때는 그대로 쓰고, 위쪽 작업이 바뀌면 작업 그래프가 버리고 다시 찾음
+                return None if quad is None else ("perspective", {"quad": quad.tolist()})
 
-            matrix = cv2.getPerspectiveTransform(np.float32(points), points_dst)
-
-            self.image = cv2.warpPerspective(self.image, matrix, (width, height), flags=cv2.INTER_CUBIC)
-
-            self.image = cv2.flip(self.image, 1)
-
-            self.image = cv2.resize(self.image, (900, 700), interpolation=cv2.INTER_CUBIC)
-
-            self.add_to_history()
-            self.display_image()
+            self.apply_geometry("원근 변환", make_op, missing="문서 윤곽을 찾지 못했습니다.")
     
 
     # 흑백변환
     def apply_grayscale(self):
         if self.image is not None:
-            self.image = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-            self.image = cv2.cvtColor(self.image, cv2.COLOR_GRAY2BGR)  # 흑백 유지
+            # 새 배열을 만들지 않고 제자리에서 변환 (히스토리와 작업 그래프는 각자 복사본을 가짐)
+            pointops.run(self.image, [pointops.grayscale()], out=self.image)
             self.display_image()
-            self.add_to_history()
+            self.add_to_history(label="흑백 변환", op=("grayscale", {}))
 
     # 색 반전
     def apply_color_inversion(self):
         if self.image is not None:
-            self.image = cv2.bitwise_not(self.image)
+            pointops.run(self.image, [pointops.invert()], out=self.image)
             self.display_image()
-            self.add_to_history()
+            self.add_to_history(label="색 반전", op=("invert", {}))
 
     # 회전 기능
     def set_rotate_mode(self):
@@ -693,38 +1247,138 @@ class ImageEditor(QMainWindow):
             widget.setVisible(False)
         
         # 회전 UI 보이기
-        for widget in [self.label_rotate_ccw, self.label_separator, self.label_rotate_cw,
-         self.rotate_ccw_button, self.rotate_cw_button]:
+        for widget in self.rotate_widgets:
             widget.setVisible(True)
 
-    # 반시계 방향 회전
+    # 반시계 방향 90도 회전
     def rotate_counter_clockwise(self):
-        self.apply_rotation(45)
+        self.apply_rotation90(1)
 
-    # 시계 방향 회전
+    # 시계 방향 90도 회전
     def rotate_clockwise(self):
-        self.apply_rotation(-45)
+        self.apply_rotation90(-1)
+
+    # 90도 단위 회전 / 뒤집기 (혼자 적용하면 픽셀만 옮기므로 손실 없음)
+    def apply_rotation90(self, turns):
+        self.apply_geometry("회전", lambda image: ("rotate90", {"turns": turns % 4}))
+
+    def apply_flip(self, axis):
+        self.apply_geometry("뒤집기", lambda image: ("flip", {"axis": axis}))
+
+    def geometry_chain(self):
+        # 직전 편집이 기하 변환이고 그 뒤로 바뀐 것이 없다면 (변환 전 이미지, 합쳐 둔 변환 목록)
+        session = self.geometry_session
+        if session is not None and session[0] == self.image_version:
+            return session[1], session[2]
+        self.geometry_session = None  # 다른 편집이 있었으므로 변환 전 이미지를 놓아줌
+        return None, []
+
+    def trailing_rotation_angle(self):
+        # 회전 슬라이더가 대신할 직전 회전의 각도 (없으면 0)
+        _, chain = self.geometry_chain()
+        if self.rotation_replaces and chain and chain[-1][0] == "rotate":
+            return chain[-1][1]["angle"]
+        return 0.0
+
+    def apply_geometry(self, label, make_op, replaces_rotation=False, missing=None):
+        """
+        회전/뒤집기/원근 변환 적용. make_op(image) 는 작업 스레드에서 현재 이미지에 대한 (작업 이름, 파라미터) 를 반환 (없으면 None)
+        바로 앞 편집도 기하 변환이면 그 히스토리 단계를 대신해, 변환 전 픽셀에 지금까지의 변환을 합친 좌표 변환으로 한 번만 보간한다.
+        replaces_rotation: 직전 변환이 슬라이더 회전이면 새 회전으로 바꿈
+        """
+        if self.image is None:
+            return
+        base, chain = self.geometry_chain()
+        source = base if base is not None else self.image
+        replace = replaces_rotation and self.trailing_rotation_angle() != 0
+
+        def work(job, image, source):
+            op = make_op(image)
+            if op is None:
+                return None
+            ops = chain[:-1] if replace else list(chain)
+            if not (op[0] == "rotate" and op[1]["angle"] == 0):
+                ops.append(op)
+            job.report(0.2)
+            return ops, imageops.apply_chain(source, ops, lambda f: job.report(0.2 + 0.8 * f)) if ops else None
+
+        def done(result):
+            if result is None:
+                if missing:
+                    self.statusBar().showMessage(missing, 3000)
+                return
+            ops, warped = result
+            if base is not None:
+                # 앞의 기하 변환 단계를 되돌리고 합친 결과 하나로 바꿈 (화면은 아래에서 한 번만 갱신)
+                self.image = self.history.undo(self.image)
+                self.restore_graph_head()
+            if ops:
+                self.image = warped
+            self.display_image()
+            if ops:
+                op = ops[0] if len(ops) == 1 else ("warp", {"chain": ops})
+                self.add_to_history(label=label if len(ops) == 1 else f"{label} (기하 변환 {len(ops)}개 합침)", op=op)
+                self.geometry_session = (self.image_version, source, ops)
+            else:
+                self.geometry_session = None
+            if replaces_rotation:
+                self.rotation_replaces = True
+            else:
+                self.reset_rotation_angle()
 
-    # 회전 적용 함수
-    def apply_rotation(self, angle):
-        rows, cols = self.image.shape[:2]
-        center = (cols // 2, rows // 2)
-        rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-        
-        # 이미지 회전
-        self.image = cv2.warpAffine(self.image, rotation_matrix, (cols, rows), 
-                                borderValue=(255, 255, 255), 
-                                flags=cv2.INTER_CUBIC)
-        self.add_to_history()  # 작업 히스토리에 추가
-        self.display_image()
+        self.start_job(label, work, self.image, source, on_done=done)
+
+    # 임의 각도 회전 적용 함수
+    def apply_rotation(self, angle, expand=None):
+        # 슬라이더로 여러 번 적용해도 회전 전 픽셀에서 한 번만 보간 (apply_geometry 참고)
+        if self.image is None:
+            return
+        if expand is None:
+            expand = self.rotate_expand_check.isChecked()
+        self.image_label.clear_overlay()
+        if angle == 0 and self.trailing_rotation_angle() == 0:
+            return
+        self.apply_geometry("회전", lambda image: ("rotate", {"angle": angle, "expand": int(expand)}),
+                            replaces_rotation=True)
+
+    def preview_rotation(self):
+        # 화면에 보이는 프록시만 돌려 오버레이로 미리보기 (캔버스 확장이면 넓어진 결과를 화면 크기로 줄여 가운데에)
+        angle = self.rotate_angle_slider.value() / 10
+        self.rotate_angle_label.setText(f"{angle:.1f}°")
+        canvas = self.image_label
+        proxy = canvas.display_array()
+        delta = angle - self.trailing_rotation_angle()
+        if proxy is None or delta == 0:
+            canvas.clear_overlay()
+            return
+        rotated = imageops.rotate(proxy, delta, self.rotate_expand_check.isChecked(), cv2.INTER_LINEAR)
+        if rotated.shape != proxy.shape:
+            h, w = proxy.shape[:2]
+            rh, rw = rotated.shape[:2]
+            scale = min(w / rw, h / rh)
+            small = cv2.resize(rotated, (max(1, int(rw * scale)), max(1, int(rh * scale))),
+                               interpolation=cv2.INTER_AREA)
+            frame = np.full_like(proxy, 255)
+            y0, x0 = (h - small.shape[0]) // 2, (w - small.shape[1]) // 2
+            frame[y0:y0 + small.shape[0], x0:x0 + small.shape[1]] = small
+            rotated = frame
+        canvas.set_overlay(0, 0, rotated)
+
+    def reset_rotation_angle(self):
+        # 회전 기준이 바뀌었으므로 슬라이더를 0 으로 (미리보기는 그리지 않음)
+        self.rotation_replaces = False
+        self.rotate_angle_slider.blockSignals(True)
+        self.rotate_angle_slider.setValue(0)
+        self.rotate_angle_slider.blockSignals(False)
+        self.rotate_angle_label.setText("0.0°")
 
     # 회전 상단 영역 안보이게 하기
     def unvisibleRotate(self):
-        self.label_rotate_ccw.setVisible(False)
-        self.rotate_ccw_button.setVisible(False)
-        self.label_separator.setVisible(False)
-        self.label_rotate_cw.setVisible(False)
-        self.rotate_cw_button.setVisible(False)
+        for widget in self.rotate_widgets:
+            widget.setVisible(False)
+        if self.rotate_angle_slider.value() / 10 != self.trailing_rotation_angle():
+            self.image_label.clear_overlay()  # 적용하지 않은 회전 미리보기
+        self.reset_rotation_angle()
         self.update()  # UI 업데이트
 
     # 도형 모드
@@ -733,11 +1387,14 @@ class ImageEditor(QMainWindow):
         self.zoom_mode = False
         self.lens_mode = False
         self.tool_mode = "diagram"
+        self.unvisibleRotate()
+        self.hide_blur_tools()
         # 브러쉬 및 텍스트 설정 UI 숨기기
         for widget in [self.brush_size_text_label, self.slider, self.brush_size_label,
                     self.font_label, self.font_combo, self.font_size_label,
                     self.font_size_spinbox, self.text_input_field,self.label_rotate_ccw, self.label_separator,
-                     self.label_rotate_cw, self.rotate_ccw_button, self.rotate_cw_button]:
+                     self.label_rotate_cw, self.rotate_ccw_button, self.rotate_cw_button,
+                     self.fill_tolerance_label, self.fill_tolerance_spinbox]:
             widget.setVisible(False)
 
         self.rectangle_button.setVisible(True)
@@ -746,6 +1403,9 @@ class ImageEditor(QMainWindow):
 
     # 도형 모드 숨기기
     def hide_toolbars(self):
+        self.hide_blur_tools()
+        self.fill_tolerance_label.setVisible(False)
+        self.fill_tolerance_spinbox.setVisible(False)
         self.rectangle_button.setVisible(False)
         self.circle_button.setVisible(False)
         self.triangle_button.setVisible(False)
@@ -772,13 +1432,13 @@ class ImageEditor(QMainWindow):
                 cv2.polylines(self.image, [triangle_points], isClosed=True, color=color, thickness=3)
                 cv2.fillPoly(self.image, [triangle_points], color=color)
 
-            self.add_to_history()
+            self.add_to_history(label="도형")
             self.display_image()
 
     #도형 ROI 선택
     def select_roi_for_shape(self):
         if self.image is not None:
-            roi = cv2.selectROI("Select ROI for Shape", self.image, showCrosshair=True, fromCenter=False)
+            roi = self.select_roi("Select ROI for Shape")
             cv2.destroyWindow("Select ROI for Shape")
 
             if roi[2] > 0 and roi[3] > 0:
@@ -793,101 +1453,55 @@ class ImageEditor(QMainWindow):
 
     #렌즈 왜곡
     def apply_lens_distortion(self, center_x, center_y, distortion_type):
-        h, w, _ = self.image.shape
-
-        # 렌즈 왜곡 파라미터 (강도, 왜곡 범위)
-        exp = 2 
-        scale = 1 
-
-        # 매핑 배열 생성
-        mapy, mapx = np.indices((h, w), dtype=np.float32)
-
-        # 좌상단 기준좌표에서 -1~1로 정규화된 중심점 기준 좌표로 변경
-        mapx = 2 * mapx / (w - 1) - 1
-        mapy = 2 * mapy / (h - 1) - 1
-
-        # 직교좌표를 극 좌표로 변환
-        r, theta = cv2.cartToPolar(mapx, mapy)
-
-        # 왜곡 영역만 중심확대/축소 지수 적용
-        if distortion_type == "convex":  # 볼록 렌즈
-            r[r < scale] = r[r < scale] ** exp
-        elif distortion_type == "concave":  # 오목 렌즈
-            r[r < scale] = r[r < scale] ** (1 / exp)
-
-        # 극 좌표를 직교좌표로 변환
-        mapx, mapy = cv2.polarToCart(r, theta)
-
-        # 중심점 기준에서 좌상단 기준으로 변경
-        mapx = ((mapx + 1) * w - 1) / 2
-        mapy = ((mapy + 1) * h - 1) / 2
-
-        # 재매핑 변환
-        distorted = cv2.remap(self.image, mapx, mapy, cv2.INTER_LINEAR)
-
-        # 왜곡된 이미지를 다시 적용
-        self.image = distorted
+        # 렌즈 영역만 계산해 제자리에 덮어씀 (remap 테이블은 캐시됨)
+        radius = max(1, int(round(self.lens_radius / self.image_label.scale)))
+        x0, y0, patch = imageops.lens_region(self.image, center_x, center_y, distortion_type,
+                                             radius, self.lens_strength)
+        if patch is None:
+            return
+        h, w = patch.shape[:2]
+        self.image[y0:y0 + h, x0:x0 + w] = patch
+        self.image_label.clear_overlay()
 
         # 작업 히스토리 추가
-        self.add_to_history()
-        self.display_image()
+        self.add_to_history(region=(x0, y0, w, h), label="렌즈 왜곡", op=("lens", {
+            "center_x": center_x, "center_y": center_y, "distortion_type": distortion_type,
+            "radius": radius, "exp": self.lens_strength}))
+        self.update_canvas_region(x0, y0, x0 + w - 1, y0 + h - 1)
+
+    def preview_lens_distortion(self, center_x, center_y):
+        # 마우스 위치(화면 좌표)에 볼록 렌즈 미리보기 (화면용 프록시에서 계산, 이미지는 바꾸지 않음)
+        proxy = self.image_label.display_array()
+        h, w = proxy.shape[:2]
+        if not (0 <= center_x < w and 0 <= center_y < h):
+            self.image_label.clear_overlay()
+            return
+        x0, y0, patch = imageops.lens_region(proxy, center_x, center_y, "convex",
+                                             self.lens_radius, self.lens_strength)
+        if patch is not None:
+            self.image_label.set_overlay(x0, y0, patch)
 
     # equalizeHist+CLAHE 자동으로 함수
     def apply_auto_correction(self):
-        if len(self.image.shape) == 3:
-            # 각 채널에 대해 개별적으로 equalizeHist() 적용
-            b, g, r = cv2.split(self.image)
-            b = cv2.equalizeHist(b)
-            g = cv2.equalizeHist(g)
-            r = cv2.equalizeHist(r)
-            self.image = cv2.merge((b, g, r))
-        else:
-            self.image = cv2.equalizeHist(self.image)
-
-        # CLAHE를 사용해 대비 조정 (Automatic Histogram Equalization)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))  # CLAHE 객체 생성
-        if len(self.image.shape) == 3:
-            b, g, r = cv2.split(self.image)
-            b = clahe.apply(b)
-            g = clahe.apply(g)
-            r = clahe.apply(r)
-            self.image = cv2.merge((b, g, r))
-        else:
-            self.image = clahe.apply(self.image)
+        def work(job, image):
+            return imageops.auto_correction(image, progress=job.report)
 
-        canvas_width = self.image_label.width()
-        canvas_height = self.image_label.height()
-        self.image = cv2.resize(self.image, (900, 700),interpolation=cv2.INTER_CUBIC)
+        def done(result):
+            self.image = result
+            self.add_to_history(label="자동보정", op=("auto_correction", {}))
+            self.display_image()
 
-        self.add_to_history()
-        self.display_image()
+        self.start_job("자동보정", work, self.image, on_done=done)
 
     def masking(self, bp, win_name):
-        disc = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        cv2.filter2D(bp, -1, disc, bp)
-        _, mask = cv2.threshold(bp, 1, 255, cv2.THRESH_BINARY)
-        result = cv2.bitwise_and(self.image, self.image, mask=mask)  # self.image 사용
-        return result
+        return imageops.masking(bp, self.image)
 
     def backProject_manual(self, hist_roi, hsv_img):
-        hist_img = cv2.calcHist([hsv_img], [0, 1], None, [180, 256], [0, 180, 0, 256])
-        hist_rate = hist_roi / (hist_img + 1)
-
-        # 비율에 맞는 픽셀 값 매핑
-        h, s, v = cv2.split(hsv_img)
-        bp = hist_rate[h.ravel(), s.ravel()]
-
-        bp = np.minimum(bp, 1)
-        bp = bp.reshape(hsv_img.shape[:2])
-        cv2.normalize(bp, bp, 0, 255, cv2.NORM_MINMAX)
-        bp = bp.astype(np.uint8)
-
-        return self.masking(bp, 'result_manual')
+        return imageops.back_project_manual(hist_roi, hsv_img, self.image)
 
     def backProject_cv(self, hist_roi, hsv_img):
         # 역투영 함수
-        bp = cv2.calcBackProject([hsv_img], [0, 1], hist_roi, [0, 180, 0, 256], 1)
-        return self.masking(bp, 'result_cv')
+        return imageops.back_project_cv(hist_roi, hsv_img, self.image)
 
     # 역투영 진행
     def apply_reprojection(self):
@@ -898,50 +1512,40 @@ class ImageEditor(QMainWindow):
         
         if self.image is not None:
             # ROI 선택 창을 띄움
-            roi = cv2.selectROI("Select ROI for Reprojection", self.image, showCrosshair=True, fromCenter=False)
+            roi = self.select_roi("Select ROI for Reprojection")
             
             if roi[2] == 0 or roi[3] == 0:
                 cv2.destroyWindow("Select ROI for Reprojection")
                 return
             
-            # ROI가 선택된 경우
-            x, y, w, h = roi
-            # ROI 영역 추출
-            roi_image = self.image[y:y+h, x:x+w]
-            
-            # ROI 이미지를 HSV로 변환
-            hsv_roi = cv2.cvtColor(roi_image, cv2.COLOR_BGR2HSV)
-            
-            # H, S 채널에 대한 히스토그램 계산
-            hist_roi = cv2.calcHist([hsv_roi], [0, 1], None, [180, 256], [0, 180, 0, 256])
-            
-            # 전체 이미지에서 H, S 채널을 분리하고 히스토그램을 계산
-            hsv_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)
-            
-            # ROI에서 계산된 히스토그램을 매뉴얼 구현함수와 OpenCV 이용하는 함수에 각각 전달
-            result_manual = self.backProject_manual(hist_roi, hsv_image)
-            
-            self.image = result_manual
-
-            self.add_to_history()
-            self.display_image()
             cv2.destroyWindow("Select ROI for Reprojection")
 
+            # HSV 변환과 전체 히스토그램은 이미지 버전마다 한 번만 계산하고 ROI 마다 조회 표만 새로 만듦
+            def work(job, image, version):
+                self.back_projector.prepare(image, version)
+                job.report(0.5)
+                return self.back_projector.project(image, version, roi)
+
+            def done(result):
+                self.image = result
+                self.add_to_history(label="역투영")
+                self.display_image()
+
+            self.start_job("역투영", work, self.image, self.image_version, on_done=done)
+
     #이미지 합성 하는 함수
     def composite_images(self):
         # 이미지 합성을 위한 두 번째 이미지 선택
         file_path, _ = QFileDialog.getOpenFileName(self, "합성할 이미지 열기", "", "Images (*.png *.jpg *.jpeg *.bmp)")
         if file_path:
-            data = np.fromfile(file_path, dtype=np.uint8)
-            img2 = cv2.imdecode(data, cv2.IMREAD_COLOR)
-            if img2 is None:
+            # 여기서는 미리보기용 축소 이미지만 읽고, 원본 해상도 디코딩은 ROI 를 고르는 동안 캐시가 백그라운드에서 시작
+            preview = read_preview(file_path, max(VIEW_SIZE))
+            if preview is None:
                 QMessageBox.critical(self, "오류", "합성할 이미지를 불러올 수 없습니다.")
                 return
+            self.image_cache.prefetch([file_path])
 
-            # 마스크 생성 (합성할 이미지의 크기와 같은 크기)
-            mask = np.full_like(img2, 255)
-
-            r = cv2.selectROI("ROI 선택", self.image)
+            r = self.select_roi("ROI 선택")
 
             # 선택된 영역의 x, y, width, height 값
             x, y, w, h = r
@@ -950,14 +1554,41 @@ class ImageEditor(QMainWindow):
                 QMessageBox.warning(self, "경고", "유효한 영역이 선택되지 않았습니다.")
                 return
 
-            # 선택한 영역의 중심 좌표 계산
-            center = (x + w // 2, y + h // 2)
-
-            # seamlessClone으로 이미지 합성
-            composite_image = cv2.seamlessClone(img2, self.image, mask, center, cv2.NORMAL_CLONE)
-            self.image = composite_image
-            self.display_image()
-            self.add_to_history()
+            # 화면용 프록시에서 먼저 합성한 미리보기를 띄우고 전체 해상도 합성은 백그라운드에서 진행
+            self.preview_composite(preview, r)
+
+            def work(job, image):
+                # 디코딩이 끝나지 않았으면 기다림. 합성에는 읽기만 하므로 캐시된 배열을 복사하지 않고 사용
+                img2 = self.image_cache.get(file_path, copy=False)
+                if img2 is None:
+                    raise ValueError("합성할 이미지를 불러올 수 없습니다.")
+                job.report(0.3)
+                # 선택 영역 주변 조각만 풀어서 반환 (이미지 전체를 복사하지 않음)
+                return imageops.composite_patch(image, img2, r, progress=lambda f: job.report(0.3 + 0.7 * f))
+
+            def done(result):
+                self.image_label.clear_overlay()
+                patch, rect = result
+                if patch is None:
+                    return
+                x, y, w, h = rect
+                self.image[y:y + h, x:x + w] = patch
+                self.add_to_history(region=rect, label="합성")
+                self.update_canvas_region(x, y, x + w - 1, y + h - 1)
+
+            self.start_job("합성", work, self.image, on_done=done)
+
+    def preview_composite(self, img2, roi):
+        # ROI 를 화면 좌표로 옮겨 프록시에서 합성한 조각을 오버레이로 표시
+        proxy = self.image_label.display_array()
+        if proxy is None:
+            return
+        x, y, w, h = roi
+        dx0, dy0 = self.image_label.map_to_display(x, y)
+        dx1, dy1 = self.image_label.map_to_display(x + w, y + h)
+        patch, (px, py, _, _) = imageops.composite_patch(proxy, img2, (dx0, dy0, dx1 - dx0, dy1 - dy0))
+        if patch is not None:
+            self.image_label.set_overlay(px, py, patch)
 
     #적응형스레시홀드 함수
     def apply_threshold(self):
@@ -965,19 +1596,98 @@ class ImageEditor(QMainWindow):
             QMessageBox.critical(self, "오류", "이미지가 로드되지 않았습니다.")
             return
 
-        adaptive_thresh_mean_c = 10
+        # 슬라이더를 움직이면 화면에 보이는 픽셀만 계산해 오버레이로 미리보기 (이미지는 적용할 때만 바뀜)
+        self.threshold_engine.prepare(self.image, self.image_version)
+        settings = self.threshold_settings
+        dialog = QDialog(self)
+        dialog.setWindowTitle("적응형 스레시홀드")
+        layout = QGridLayout()
+
+        method_combo = QComboBox()
+        method_combo.addItem("평균", "mean")
+        method_combo.addItem("가우시안", "gaussian")
+        method_combo.setCurrentIndex(THRESHOLD_METHODS.index(settings["method"]))
+        layout.addWidget(QLabel("방식"), 0, 0)
+        layout.addWidget(method_combo, 0, 1)
+
+        # 블록 크기는 홀수만 가능하므로 슬라이더 값 k 를 2k + 1 로 사용
+        block_slider = QSlider(Qt.Horizontal)
+        block_slider.setRange(1, MAX_BLOCK // 2)
+        block_slider.setValue(settings["block_size"] // 2)
+        block_label = QLabel()
+        layout.addWidget(QLabel("블록 크기"), 1, 0)
+        layout.addWidget(block_slider, 1, 1)
+        layout.addWidget(block_label, 1, 2)
+
+        c_slider = QSlider(Qt.Horizontal)
+        c_slider.setRange(-50, 50)
+        c_slider.setValue(int(settings["c"]))
+        c_label = QLabel()
+        layout.addWidget(QLabel("C (평균에서 뺄 값)"), 2, 0)
+        layout.addWidget(c_slider, 2, 1)
+        layout.addWidget(c_label, 2, 2)
+
+        ok_button = QPushButton("적용")
+        ok_button.clicked.connect(dialog.accept)
+        cancel_button = QPushButton("취소")
+        cancel_button.clicked.connect(dialog.reject)
+        layout.addWidget(ok_button, 3, 1)
+        layout.addWidget(cancel_button, 3, 2)
+        dialog.setLayout(layout)
 
-        gray_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        def current():
+            return {"block_size": block_slider.value() * 2 + 1, "c": c_slider.value(),
+                    "method": method_combo.currentData()}
+
+        def update_preview():
+            params = current()
+            block_label.setText(f"{params['block_size']}px")
+            c_label.setText(str(params["c"]))
+            self.preview_threshold(params)
+
+        block_slider.valueChanged.connect(update_preview)
+        c_slider.valueChanged.connect(update_preview)
+        method_combo.currentIndexChanged.connect(update_preview)
+        update_preview()
+        if not dialog.exec_():
+            self.image_label.clear_overlay()
+            return
 
-        # adaptiveThreshold 적용
-        threshold_image = cv2.adaptiveThreshold(
-            gray_image, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, adaptive_thresh_mean_c
-        )
+        params = current()
+        self.threshold_settings = params
+        engine = self.threshold_engine
 
-        # 결과 이미지를 캔버스에 띄우기
-        self.image = cv2.cvtColor(threshold_image, cv2.COLOR_GRAY2BGR)  # 결과를 컬러로 변환
-        self.display_image()
-        self.add_to_history()
+        def work(job, image, version):
+            # 적분 영상은 미리보기에서 만든 것을 그대로 쓰고 전체 해상도는 행 띠마다 나눠 계산
+            engine.prepare(image, version)
+            job.report(0.1)
+            result = engine.render(**params, progress=lambda f: job.report(0.1 + 0.8 * f))
+            return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
+
+        def done(result):
+            self.image = result
+            self.display_image()
+            self.add_to_history(label="스레시홀드", op=("threshold", dict(params)))
+
+        self.start_job("스레시홀드", work, self.image, self.image_version, on_done=done)
+
+    def preview_threshold(self, params):
+        # 화면 1px 에 원본 여러 px 이 들어가면 그 간격의 픽셀만 계산해 화면 크기로 맞춤
+        canvas = self.image_label
+        proxy = canvas.display_array()
+        if proxy is None:
+            return
+        view_h, view_w = proxy.shape[:2]
+        h, w = self.image.shape[:2]
+        x0, y0 = canvas.map_to_image(0, 0)
+        x1, y1 = canvas.map_to_image(view_w, view_h)
+        x1, y1 = min(w, max(x1, x0 + 1)), min(h, max(y1, y0 + 1))
+        step = max(1, int(1 / canvas.scale))
+        preview = self.threshold_engine.render(params["block_size"], params["c"], params["method"],
+                                               (x0, y0, x1 - x0, y1 - y0), step)
+        interpolation = cv2.INTER_AREA if preview.shape[1] > view_w else cv2.INTER_NEAREST
+        preview = cv2.resize(preview, (view_w, view_h), interpolation=interpolation)
+        canvas.set_overlay(0, 0, cv2.cvtColor(preview, cv2.COLOR_GRAY2BGR))
 
     #이미지 저장
     def save_image(self):
@@ -987,25 +1697,250 @@ class ImageEditor(QMainWindow):
                 self, 
                 "이미지 저장", 
                 "", 
-                "PNG 파일 (*.png);;JPEG 파일 (*.jpg *.jpeg);;BMP 파일 (*.bmp)"
+                "PNG 파일 (*.png);;JPEG 파일 (*.jpg *.jpeg);;WebP 파일 (*.webp);;TIFF 파일 (*.tif *.tiff);;BMP 파일 (*.bmp)"
             )
             
             if file_path:
                 # 확장자 자동으로 추가
-                if not any(file_path.endswith(ext) for ext in [".png", ".jpg", ".jpeg", ".bmp"]):
+                if not any(file_path.lower().endswith(ext) for ext in
+                           [".png", ".jpg", ".jpeg", ".webp", ".tif", ".tiff", ".bmp"]):
                     if selected_filter == "PNG 파일 (*.png)":
                         file_path += ".png"
                     elif selected_filter == "JPEG 파일 (*.jpg *.jpeg)":
                         file_path += ".jpg"
+                    elif selected_filter == "WebP 파일 (*.webp)":
+                        file_path += ".webp"
+                    elif selected_filter == "TIFF 파일 (*.tif *.tiff)":
+                        file_path += ".tif"
                     elif selected_filter == "BMP 파일 (*.bmp)":
                         file_path += ".bmp"
 
-                success = cv2.imwrite(file_path, self.image)
-                if not success:
-                    QMessageBox.critical(self, "오류", "이미지를 저장할 수 없습니다.")
+                self.export_image([ExportTarget(file_path, self.export_options)])
         else:
             QMessageBox.critical(self, "오류", "저장할 이미지가 없습니다.")
 
+    def export_image(self, targets):
+        # 인코딩과 파일 쓰기는 내보내기 스레드에서 (현재 이미지를 복사해 두므로 바로 다음 편집을 할 수 있음)
+        self.export_queue.submit(self.image, targets, on_result=self.export_finished.emit)
+        self.statusBar().showMessage(f"내보내는 중... ({self.export_queue.pending()}개 남음)")
+
+    def on_export_finished(self, result):
+        if not result.ok:
+            QMessageBox.critical(self, "오류", f"이미지를 저장할 수 없습니다.\n{result.describe()}")
+            return
+        remaining = self.export_queue.pending()
+        self.statusBar().showMessage(f"저장: {result.describe()}" + (f" ({remaining}개 남음)" if remaining else ""),
+                                     5000)
+
+    def export_multiple(self):
+        # 같은 이미지를 여러 형식/크기로 한 번에 내보냄 (대상마다 동시에 인코딩)
+        if self.image is None:
+            QMessageBox.critical(self, "오류", "저장할 이미지가 없습니다.")
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("여러 형식으로 내보내기")
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("형식"))
+        format_checks = {}
+        for fmt, label in [("png", "PNG"), ("jpeg", "JPEG"), ("webp", "WebP"), ("tiff", "TIFF")]:
+            format_checks[fmt] = QCheckBox(label)
+            format_checks[fmt].setChecked(fmt in ("png", "jpeg"))
+            layout.addWidget(format_checks[fmt])
+        layout.addWidget(QLabel("크기"))
+        scale_checks = {}
+        for scale in (1.0, 0.5, 0.25):
+            scale_checks[scale] = QCheckBox(f"{int(scale * 100)}%")
+            scale_checks[scale].setChecked(scale == 1.0)
+            layout.addWidget(scale_checks[scale])
+        ok_button = QPushButton("내보내기")
+        ok_button.clicked.connect(dialog.accept)
+        layout.addWidget(ok_button)
+        dialog.setLayout(layout)
+        if not dialog.exec_():
+            return
+        formats = [fmt for fmt, check in format_checks.items() if check.isChecked()]
+        scales = [scale for scale, check in scale_checks.items() if check.isChecked()]
+        if not formats or not scales:
+            return
+
+        base, _ = QFileDialog.getSaveFileName(self, "내보낼 파일 이름 (확장자는 형식마다 붙음)", "")
+        if not base:
+            return
+        base = os.path.splitext(base)[0]
+        targets = []
+        for scale in scales:
+            suffix = "" if scale == 1.0 else f"_{int(scale * 100)}"
+            for fmt in formats:
+                targets.append(ExportTarget(base + suffix + EXPORT_EXTENSIONS[fmt], self.export_options, scale))
+        self.export_image(targets)
+
+    def show_export_options(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("내보내기 설정")
+        layout = QGridLayout()
+        o = self.export_options
+
+        png_level = QSpinBox()
+        png_level.setRange(0, 9)
+        png_level.setValue(o["png_compression"])
+        layout.addWidget(QLabel("PNG 압축 수준 (0: 빠름 ~ 9: 작음)"), 0, 0)
+        layout.addWidget(png_level, 0, 1)
+        png_strategy = QComboBox()
+        png_strategy.addItems(list(PNG_STRATEGY))
+        png_strategy.setCurrentText(o["png_strategy"])
+        layout.addWidget(QLabel("PNG 압축 전략 (사진: rle)"), 1, 0)
+        layout.addWidget(png_strategy, 1, 1)
+
+        jpeg_quality = QSpinBox()
+        jpeg_quality.setRange(1, 100)
+        jpeg_quality.setValue(o["jpeg_quality"])
+        layout.addWidget(QLabel("JPEG 품질"), 2, 0)
+        layout.addWidget(jpeg_quality, 2, 1)
+        jpeg_progressive = QCheckBox("프로그레시브 JPEG")
+        jpeg_progressive.setChecked(o["jpeg_progressive"])
+        layout.addWidget(jpeg_progressive, 3, 0)
+        jpeg_optimize = QCheckBox("허프만 테이블 최적화")
+        jpeg_optimize.setChecked(o["jpeg_optimize"])
+        layout.addWidget(jpeg_optimize, 3, 1)
+
+        webp_quality = QSpinBox()
+        webp_quality.setRange(1, 101)
+        webp_quality.setValue(o["webp_quality"])
+        layout.addWidget(QLabel("WebP 품질 (101: 무손실)"), 4, 0)
+        layout.addWidget(webp_quality, 4, 1)
+
+        tiff_compression = QComboBox()
+        tiff_compression.addItems(list(TIFF_COMPRESSION))
+        tiff_compression.setCurrentText(o["tiff_compression"])
+        layout.addWidget(QLabel("TIFF 압축"), 5, 0)
+        layout.addWidget(tiff_compression, 5, 1)
+
+        ok_button = QPushButton("확인")
+        ok_button.clicked.connect(dialog.accept)
+        layout.addWidget(ok_button, 6, 1)
+        dialog.setLayout(layout)
+        if dialog.exec_():
+            self.export_options = {
+                "png_compression": png_level.value(),
+                "png_strategy": png_strategy.currentText(),
+                "jpeg_quality": jpeg_quality.value(),
+                "jpeg_progressive": jpeg_progressive.isChecked(),
+                "jpeg_optimize": jpeg_optimize.isChecked(),
+                "webp_quality": webp_quality.value(),
+                "tiff_compression": tiff_compression.currentText(),
+            }
+
+    def show_export_log(self):
+        # 최근 내보내기의 파일 크기와 단계별 시간 (설정별로 시간과 용량을 비교할 때 사용)
+        results = list(self.export_queue.results)[-20:]
+        if not results:
+            QMessageBox.information(self, "내보내기 기록", "내보낸 파일이 없습니다.")
+            return
+        QMessageBox.information(self, "내보내기 기록", "\n".join(r.describe() for r in results))
+
+    def project_meta(self):
+        # 프로젝트 파일에 함께 저장할 편집기 설정
+        return {
+            "image_loaded": self.image_loaded,
+            "brush_color": list(self.brush_color),
+            "brush_size": self.brush_size,
+            "fill_tolerance": self.fill_tolerance,
+            "export_options": self.export_options,
+        }
+
+    def save_project(self, save_as=False):
+        """현재 이미지와 되돌리기 히스토리를 프로젝트 파일로 저장 (같은 파일이면 바뀐 부분만 덧붙임)"""
+        path = None if self.project is None or save_as else self.project.path
+        if path is None:
+            path, _ = QFileDialog.getSaveFileName(self, "프로젝트 저장", "",
+                                                  f"프로젝트 파일 (*{PROJECT_EXTENSION})")
+            if not path:
+                return
+            if not path.endswith(PROJECT_EXTENSION):
+                path += PROJECT_EXTENSION
+        project = self.project if self.project is not None and path == self.project.path else Project()
+        meta = self.project_meta()
+
+        def work(job, image):
+            return project.save(image, self.history, meta, path=path, progress=job.report)
+
+        def done(written):
+            self.project = project
+            self.statusBar().showMessage(f"프로젝트 저장: {path} ({written / 1024 ** 2:.1f}MB 기록)", 3000)
+
+        self.start_job("프로젝트 저장", work, self.image, on_done=done)
+
+    def open_project(self):
+        path, _ = QFileDialog.getOpenFileName(self, "프로젝트 열기", "", f"프로젝트 파일 (*{PROJECT_EXTENSION})")
+        if not path:
+            return
+        try:
+            project = Project.open(path)
+            image = project.image()
+            # 히스토리 타일은 매핑된 파일에서 되돌릴 때 읽으므로 단계가 많아도 바로 열림
+            # 중간에 실패해도 지금 히스토리는 그대로 두도록 새 히스토리에 복원한 뒤 바꿈
+            history = self.history.empty_copy()
+            project.restore_history(history, image)
+        except (OSError, ValueError, KeyError, ProjectError) as e:
+            QMessageBox.critical(self, "오류", f"프로젝트를 열 수 없습니다.\n{e}")
+            return
+        self.history.close()
+        self.history = history
+        self.project = project
+        self.image = image
+        self.image_path = None
+        meta = project.meta()
+        self.image_loaded = meta.get("image_loaded", True)
+        self.perspective_button.setEnabled(self.image_loaded)
+        self.grayscale_button.setEnabled(self.image_loaded)
+        self.brush_color = tuple(meta.get("brush_color", self.brush_color))
+        self.slider.setValue(meta.get("brush_size", self.brush_size))
+        self.fill_tolerance_spinbox.setValue(meta.get("fill_tolerance", self.fill_tolerance))
+        self.export_options = dict(EXPORT_DEFAULTS, **meta.get("export_options", {}))
+        self.restore_graph_head()
+        self.display_image()
+
+    def toggle_profiling(self, _checked=None):
+        PROFILER.disable()
+        if self.profile_action.isChecked():
+            PROFILER.enable(track_memory=self.profile_memory_action.isChecked())
+
+    def toggle_profile_overlay(self, visible):
+        self.profile_overlay.setVisible(visible)
+        if visible:
+            self.update_profile_overlay()
+            self.profile_timer.start()
+        else:
+            self.profile_timer.stop()
+
+    def update_profile_overlay(self):
+        # 합계 시간이 큰 동작과 최근 동작
+        if not PROFILER.enabled:
+            text = "성능 측정이 꺼져 있습니다 (도움말 > 성능 측정 > 측정 켜기)"
+        else:
+            lines = ["동작                        횟수   평균ms   최대ms   할당MB"]
+            for name, count, _, mean, worst, alloc in PROFILER.summary()[:8]:
+                name = name.split(".")[-1][:26]
+                lines.append(f"{name:26s} {count:6d} {mean:8.1f} {worst:8.1f} {alloc / 1024 ** 2:8.1f}")
+            lines.append("최근:")
+            for e in reversed(PROFILER.recent(5)):
+                image = e.get("args", {}).get("image", "")
+                lines.append(f"  {e['name'].split('.')[-1][:26]:26s} {e['dur'] / 1000:8.1f}ms {image}")
+            text = "\n".join(lines)
+        self.profile_overlay.setText(text)
+        self.profile_overlay.adjustSize()
+        self.profile_overlay.move(max(0, self.image_label.width() - self.profile_overlay.width() - 8), 8)
+        self.profile_overlay.raise_()
+
+    def save_profile_trace(self):
+        if not PROFILER.events:
+            QMessageBox.information(self, "성능 측정", "기록된 동작이 없습니다. 먼저 측정을 켜세요.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "트레이스 저장", "trace.json", "Chrome 트레이스 (*.json)")
+        if path:
+            PROFILER.save(path)
+            self.statusBar().showMessage(f"트레이스 저장: {path} (chrome://tracing 또는 Perfetto 에서 열기)", 5000)
+
     def show_about_popup(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("프로그램 정보")
@@ -1032,6 +1967,13 @@ class ImageEditor(QMainWindow):
         dialog.exec_()
 
 
+# 이미지 편집 동작, 화면 갱신, 마우스 처리 구간 측정 (profiling.PROFILER 가 꺼져 있으면 플래그만 확인)
+profiling.instrument(ImageEditor, ["apply_*", "display_image", "update_canvas_region", "add_to_history", "add_text",
+                                   "undo", "redo", "start_action", "draw", "stop_action", "open_image",
+                                   "load_image_file", "set_loaded_image"],
+                     "editor", profiling.image_args)
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     editor = ImageEditor()